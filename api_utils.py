@@ -1,97 +1,409 @@
 import requests
 import time
-from functools import lru_cache
-from typing import Optional, Dict, Any
-import json
+import random
+import threading
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Callable, Iterable, List, Sequence, Tuple
 import os
-from datetime import datetime, timedelta
+from cache_store import SQLiteCache, MemoryCache, CacheEntry, DEFAULT_STALE_TTL, make_cache_key, copy_json
+from metrics import Metrics, REGISTRY, endpoint_label
 
-class TMDBClient:
-    def __init__(self, api_key: str, cache_dir: str = ".cache"):
+# Statuses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Point the clients at a local server (e.g. benchmarks/stub_server.py) with TMDB_BASE_URL
+DEFAULT_BASE_URL = 'https://api.themoviedb.org/3'
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every request a client makes"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available (and any server-imposed pause is over)"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for a while, e.g. after a 429"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Turn a Retry-After header (seconds or HTTP date) into seconds to wait"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class BaseTMDBClient:
+    """Cache, key and retry plumbing shared by the sync and async TMDB clients"""
+
+    def __init__(self, api_key: str, cache_dir: str = ".cache",
+                 cache_max_bytes: int = 256 * 1024 * 1024,
+                 endpoint_ttls: Optional[Dict[str, int]] = None,
+                 memory_max_entries: int = 1024,
+                 memory_max_bytes: int = 32 * 1024 * 1024,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 retry_after_max: float = 300.0,
+                 base_url: Optional[str] = None,
+                 stale_while_revalidate: bool = True,
+                 stale_ttl: int = DEFAULT_STALE_TTL,
+                 metrics: Optional[Metrics] = None):
         self.api_key = api_key
-        self.base_url = 'https://api.themoviedb.org/3'
+        self.base_url = (base_url or os.environ.get('TMDB_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
         self.cache_dir = cache_dir
-        self.session = self._create_session()
-        
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.stale_while_revalidate = stale_while_revalidate
+
         # Ensure cache directory exists
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
 
+        # Single-file cache; picks up any old per-key JSON files in cache_dir once
+        self.cache = SQLiteCache(
+            os.path.join(cache_dir, 'tmdb_cache.sqlite3'),
+            endpoint_ttls=endpoint_ttls,
+            max_bytes=cache_max_bytes,
+            legacy_dir=cache_dir,
+            stale_ttl=stale_ttl
+        )
+        # Parsed responses for repeat lookups, so they skip the disk entirely
+        self.memory_cache = MemoryCache(memory_max_entries, memory_max_bytes)
+        # Request latency per endpoint and outcome, retries and revalidations
+        self.metrics = metrics if metrics is not None else REGISTRY
+
+    def _get_cache_key(self, endpoint: str, params: Dict) -> str:
+        """Generate a unique cache key (the API key is not part of it)"""
+        return make_cache_key(endpoint, params)
+
+    def _lookup_cache(self, cache_key: str) -> Tuple[Optional[Dict], Optional[CacheEntry], Optional[str]]:
+        """Return (fresh data, stale entry, tier) for a key.
+
+        At most one of data and entry is set; tier is 'memory' or 'disk' when
+        the data came from that cache.
+        """
+        data = self.memory_cache.get(cache_key)
+        if data is not None:
+            return data, None, 'memory'
+
+        entry = self.cache.get_entry(cache_key, allow_stale=self.stale_while_revalidate)
+        if entry is None:
+            return None, None, None
+        if entry.expires > time.time():
+            self.memory_cache.put(cache_key, entry.data, entry.expires, entry.size)
+            return entry.data, None, 'disk'
+        return None, entry, None
+
+    def _get_cached_response(self, cache_key: str) -> Optional[Dict]:
+        """Get cached response if it exists and is not expired"""
+        return self._lookup_cache(cache_key)[0]
+
+    def _observe(self, endpoint: str, outcome: str, start: float) -> None:
+        """Record one request's latency under its endpoint and outcome.
+
+        outcome is memory, disk, stale (served expired while revalidating),
+        revalidated (a fresh request answered 304), coalesced (joined an
+        identical in-flight request), network or error.
+        """
+        self.metrics.observe('tmdb_request_seconds', time.perf_counter() - start,
+                             endpoint=endpoint_label(endpoint), outcome=outcome)
+
+    def _count_retry(self, endpoint: str, status: int) -> None:
+        """Count a retried 429/5xx response"""
+        self.metrics.inc('tmdb_retries_total', endpoint=endpoint_label(endpoint), status=str(status))
+
+    def _count_revalidation(self, endpoint: str, result: str) -> None:
+        """Count a background refresh: not_modified, updated or error"""
+        self.metrics.inc('tmdb_revalidations_total', endpoint=endpoint_label(endpoint), result=result)
+
+    def _ttl_for(self, endpoint: str, params: Dict) -> Optional[int]:
+        """TTL for a response with appended sub-resources: the shortest of its parts.
+
+        Returns None (the endpoint's own TTL) when nothing is appended.
+        """
+        appended = params.get('append_to_response')
+        if not appended:
+            return None
+        parts = [endpoint] + [f"{endpoint}/{part}" for part in appended.split(',')]
+        return min(self.cache.ttl_for(part) for part in parts)
+
+    def _cache_response(self, cache_key: str, endpoint: str, params: Dict, data: Dict,
+                        etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Cache the response data along with its validators"""
+        expires, size = self.cache.set(cache_key, endpoint, data, etag=etag,
+                                       last_modified=last_modified,
+                                       ttl=self._ttl_for(endpoint, params))
+        self.memory_cache.put(cache_key, data, expires, size)
+
+    def _mark_revalidated(self, cache_key: str, endpoint: str, params: Dict,
+                          entry: CacheEntry) -> None:
+        """Give a stale entry a fresh TTL after the server answered 304"""
+        expires = self.cache.touch(cache_key, endpoint, ttl=self._ttl_for(endpoint, params))
+        if expires is not None:
+            self.memory_cache.put(cache_key, entry.data, expires, entry.size)
+
+    @staticmethod
+    def _conditional_headers(entry: CacheEntry) -> Dict[str, str]:
+        """Build If-None-Match/If-Modified-Since headers from a cached entry"""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return memory-tier counters and disk cache size"""
+        return {'memory': self.memory_cache.stats(), 'disk': self.cache.stats()}
+
+    def _retry_delay(self, response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying: Retry-After if given, else jittered backoff.
+
+        Returns None (give up) when the server asks for a longer wait than
+        retry_after_max; retrying any earlier would only burn attempts.
+        """
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is not None:
+            if retry_after > self.retry_after_max:
+                return None
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class TMDBClient(BaseTMDBClient):
+    """TMDB API client with a two-tier cache; safe to share across threads.
+
+    Concurrent calls for the same endpoint and params are coalesced into a
+    single HTTP request, and map() fans work out over a thread pool sized to
+    the session's connection pool. Expired entries are served immediately
+    while a background thread revalidates them with a conditional request.
+    """
+
+    pool_maxsize = 20
+
+    def __init__(self, api_key: str, cache_dir: str = ".cache",
+                 requests_per_second: float = 40.0, **kwargs):
+        super().__init__(api_key, cache_dir, **kwargs)
+        self.session = self._create_session()
+        self.rate_limiter = RateLimiter(requests_per_second)
+        # cache_key -> Future for requests currently on the wire
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        # Keys with a background revalidation queued or running
+        self._revalidating = set()
+        self._revalidate_executor = None
+
     def _create_session(self) -> requests.Session:
         """Create a session with connection pooling"""
         session = requests.Session()
         adapter = requests.adapters.HTTPAdapter(
             pool_connections=5,
-            pool_maxsize=20,
-            max_retries=3,
+            pool_maxsize=self.pool_maxsize,
+            # Connection errors only; 429/5xx are retried in _fetch with backoff
+            max_retries=Retry(total=3, read=0, status=0, redirect=False,
+                              respect_retry_after_header=False),
             pool_block=False
         )
         session.mount('http://', adapter)
         session.mount('https://', adapter)
         return session
 
-    def _get_cache_key(self, endpoint: str, params: Dict) -> str:
-        """Generate a unique cache key"""
-        cache_key = f"{endpoint}_{json.dumps(params, sort_keys=True)}"
-        return cache_key.replace('/', '_').replace('?', '_')
+    def request(self, endpoint: str, params: Dict = None, fresh: bool = False) -> Optional[Dict]:
+        """Make a request to TMDB API with caching.
 
-    def _get_cached_response(self, cache_key: str) -> Optional[Dict]:
-        """Get cached response if it exists and is not expired"""
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                cached_data = json.load(f)
-                # Check if cache is still valid (24 hours)
-                if datetime.fromtimestamp(cached_data['timestamp']) > datetime.now() - timedelta(hours=24):
-                    return cached_data['data']
-        return None
+        fresh=True always asks the server, conditionally when a copy is
+        cached, for callers that must not miss a change the TTL would hide.
+        """
+        start = time.perf_counter()
+        data, outcome = self._request(endpoint, params if params is not None else {}, fresh)
+        self._observe(endpoint, outcome, start)
+        return data
 
-    def _cache_response(self, cache_key: str, data: Dict) -> None:
-        """Cache the response data"""
-        cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-        with open(cache_file, 'w') as f:
-            json.dump({
-                'timestamp': datetime.now().timestamp(),
-                'data': data
-            }, f)
-
-    def request(self, endpoint: str, params: Dict = None) -> Optional[Dict]:
-        """Make a request to TMDB API with caching"""
-        if params is None:
-            params = {}
-            
-        # Add API key to params
-        params['api_key'] = self.api_key
-        
+    def _request(self, endpoint: str, params: Dict, fresh: bool = False) -> Tuple[Optional[Dict], str]:
+        """request() without the bookkeeping: returns (data, outcome)"""
         # Check cache first
         cache_key = self._get_cache_key(endpoint, params)
-        cached_response = self._get_cached_response(cache_key)
-        if cached_response:
-            return cached_response
+        if fresh:
+            cached_response, stale_entry, tier = None, self.cache.get_entry(cache_key, allow_stale=True), None
+        else:
+            cached_response, stale_entry, tier = self._lookup_cache(cache_key)
+        if cached_response is not None:
+            return cached_response, tier
 
-        # Make the request if not cached
-        url = f"{self.base_url}{endpoint}"
+        # Serve expired data right away and refresh it behind the caller's back
+        if stale_entry is not None and not fresh:
+            self._schedule_revalidation(cache_key, endpoint, params, stale_entry)
+            return stale_entry.data, 'stale'
+
+        # Join an identical request that is already on the wire, if any
+        with self._inflight_lock:
+            inflight = self._inflight.get(cache_key)
+            if inflight is None:
+                inflight = self._inflight[cache_key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            data = inflight.result()
+            return (copy_json(data) if data is not None else None), 'coalesced'
+
+        data = None
         try:
-            response = self.session.get(url, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Cache the response
-            self._cache_response(cache_key, data)
-            
-            return data
+            # Another leader may have filled the cache while we queued up
+            if not fresh:
+                data = self._get_cached_response(cache_key)
+                if data is not None:
+                    return data, 'coalesced'
+
+            # Make the request if not cached
+            try:
+                if stale_entry is not None:
+                    data, etag, last_modified = self._fetch(
+                        endpoint, params, headers=self._conditional_headers(stale_entry)
+                    )
+                    if data is None:
+                        self._mark_revalidated(cache_key, endpoint, params, stale_entry)
+                        data = stale_entry.data
+                        return data, 'revalidated'
+                else:
+                    data, etag, last_modified = self._fetch(endpoint, params)
+
+                # Cache the response
+                self._cache_response(cache_key, endpoint, params, data, etag, last_modified)
+
+                return data, 'network'
+            except requests.exceptions.RequestException as e:
+                print(f"Error making request to {endpoint}: {e}")
+                return None, 'error'
+        finally:
+            with self._inflight_lock:
+                del self._inflight[cache_key]
+            inflight.set_result(copy_json(data) if data is not None else None)
+
+    def map(self, func: Callable, items: Iterable, max_workers: Optional[int] = None) -> List:
+        """Apply func to every item on a thread pool, returning results in order.
+
+        e.g. client.map(client.search_multi, titles)
+        """
+        items = list(items)
+        if not items:
+            return []
+        workers = min(max_workers or self.pool_maxsize, len(items))
+        if workers == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
+
+    def _schedule_revalidation(self, cache_key: str, endpoint: str, params: Dict,
+                               entry: CacheEntry) -> None:
+        """Queue a background refresh of a stale entry unless one is already pending"""
+        with self._inflight_lock:
+            if cache_key in self._revalidating:
+                return
+            self._revalidating.add(cache_key)
+            if self._revalidate_executor is None:
+                self._revalidate_executor = ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix='tmdb-revalidate'
+                )
+        self._revalidate_executor.submit(self._revalidate, cache_key, endpoint, params, entry)
+
+    def _revalidate(self, cache_key: str, endpoint: str, params: Dict, entry: CacheEntry) -> None:
+        """Refresh a stale entry; a 304 only restarts its TTL"""
+        try:
+            data, etag, last_modified = self._fetch(
+                endpoint, params, headers=self._conditional_headers(entry)
+            )
+            if data is None:
+                self._mark_revalidated(cache_key, endpoint, params, entry)
+                self._count_revalidation(endpoint, 'not_modified')
+            else:
+                self._cache_response(cache_key, endpoint, params, data, etag, last_modified)
+                self._count_revalidation(endpoint, 'updated')
         except requests.exceptions.RequestException as e:
-            print(f"Error making request to {endpoint}: {e}")
-            return None
+            print(f"Error revalidating {endpoint}: {e}")
+            self._count_revalidation(endpoint, 'error')
+        finally:
+            with self._inflight_lock:
+                self._revalidating.discard(cache_key)
+
+    def _fetch(self, endpoint: str, params: Dict,
+               headers: Optional[Dict[str, str]] = None) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+        """GET an endpoint within the rate limit, retrying 429/5xx responses.
+
+        Returns (data, etag, last_modified); data is None on a 304 Not Modified.
+        """
+        url = f"{self.base_url}{endpoint}"
+        query = dict(params, api_key=self.api_key)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            response = self.session.get(url, params=query, headers=headers, timeout=5)
+            delay = None
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._retry_delay(response, attempt)
+            if delay is not None:
+                self._count_retry(endpoint, response.status_code)
+                if response.status_code == 429:
+                    # Everyone sharing this client backs off, not just this caller
+                    self.rate_limiter.pause(delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            response.raise_for_status()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if response.status_code == 304:
+                return None, etag, last_modified
+            return response.json(), etag, last_modified
 
     def search_multi(self, query: str) -> Optional[Dict]:
         """Search for movies and TV shows"""
         return self.request('/search/multi', {'query': query})
 
-    def get_details(self, media_type: str, media_id: int) -> Optional[Dict]:
-        """Get detailed information about a movie or TV show"""
-        return self.request(f'/{media_type}/{media_id}')
+    def get_details(self, media_type: str, media_id: int,
+                    append: Sequence[str] = ()) -> Optional[Dict]:
+        """Get detailed information about a movie or TV show.
+
+        append names sub-resources (e.g. 'watch/providers', 'credits',
+        'videos') that come back in the same response, keyed by name.
+        """
+        params = {'append_to_response': ','.join(append)} if append else None
+        return self.request(f'/{media_type}/{media_id}', params)
 
     def get_watch_providers(self, media_type: str, media_id: int) -> Optional[Dict]:
         """Get streaming platforms for a movie or TV show"""
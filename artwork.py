@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+import m3u
+
+DEFAULT_STORE = "artwork"
+DEFAULT_MAX_MB = 512
+DEFAULT_WORKERS = 16
+DEFAULT_TIMEOUT = 15
+INDEX_NAME = "index.json"
+STORE_VERSION = 1
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class ArtworkStore:
+    """Content-addressed image store with an LRU size cap.
+
+    Each image is saved once as `<sha256>.<ext>`, however many URLs or
+    playlist lines point at it. index.json maps source URLs to blobs and
+    remembers when each blob was last needed, which drives eviction.
+    """
+
+    def __init__(self, directory=DEFAULT_STORE, max_bytes=DEFAULT_MAX_MB * 1024 * 1024,
+                 workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.timeout = timeout
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        os.makedirs(directory, exist_ok=True)
+        self.urls, self.blobs = self._load_index()
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=max(1, workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _load_index(self):
+        """Load url -> blob and blob -> {size, accessed} maps, dropping blobs missing on disk"""
+        try:
+            with open(self.index_path, "r", encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+        if data.get('version') != STORE_VERSION:
+            return {}, {}
+        blobs = {name: info for name, info in data.get('blobs', {}).items()
+                 if os.path.exists(os.path.join(self.directory, name))}
+        urls = {url: name for url, name in data.get('urls', {}).items() if name in blobs}
+        return urls, blobs
+
+    def save_index(self):
+        """Atomically persist the index"""
+        with self._lock:
+            data = {'version': STORE_VERSION, 'urls': self.urls, 'blobs': self.blobs}
+            payload = json.dumps(data, separators=(',', ':'))
+        m3u.atomic_write(self.index_path, [payload])
+
+    def blob_for(self, url):
+        """Return the stored file name for url, or None if it isn't stored"""
+        with self._lock:
+            return self.urls.get(url)
+
+    def _extension(self, url, content_type):
+        """Pick a file extension from the Content-Type, falling back to the URL"""
+        ext = mimetypes.guess_extension((content_type or '').split(';')[0].strip()) or ''
+        if not ext:
+            ext = os.path.splitext(urlsplit(url).path)[1]
+        return {'.jpe': '.jpg', '.jpeg': '.jpg'}.get(ext, ext) or '.img'
+
+    def fetch(self, url):
+        """Download one image into the store; returns (url, blob name or None, error)"""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            return url, None, f"{type(e).__name__}: {e}"
+
+        content = response.content
+        name = hashlib.sha256(content).hexdigest() + self._extension(url, response.headers.get('Content-Type'))
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self.urls[url] = name
+            self.blobs[name] = {'size': len(content), 'accessed': time.time()}
+        return url, name, None
+
+    def prefetch(self, urls):
+        """Store every URL not stored yet, concurrently; returns (fetched, reused, failed)"""
+        now = time.time()
+        missing = []
+        reused = 0
+        for url in dict.fromkeys(urls):
+            name = self.blob_for(url)
+            if name:
+                with self._lock:
+                    self.blobs[name]['accessed'] = now
+                reused += 1
+            else:
+                missing.append(url)
+
+        fetched, failed = 0, {}
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as executor:
+                for url, name, error in executor.map(self.fetch, missing):
+                    if name:
+                        fetched += 1
+                    else:
+                        failed[url] = error
+        return fetched, reused, failed
+
+    def evict(self):
+        """Delete least recently needed blobs until the store is under its cap.
+
+        Evicts down to 90% of the cap so the next run doesn't evict again.
+        Returns (blobs removed, bytes freed).
+        """
+        with self._lock:
+            total = sum(info['size'] for info in self.blobs.values())
+            if total <= self.max_bytes:
+                return 0, 0
+            target = total - int(self.max_bytes * 0.9)
+            victims, freed = [], 0
+            for name, info in sorted(self.blobs.items(), key=lambda item: item[1]['accessed']):
+                victims.append(name)
+                freed += info['size']
+                if freed >= target:
+                    break
+            for name in victims:
+                del self.blobs[name]
+            self.urls = {url: name for url, name in self.urls.items() if name in self.blobs}
+        for name in victims:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        return len(victims), freed
+
+    def stats(self):
+        """Return blob count, stored bytes and known URLs"""
+        with self._lock:
+            return {
+                'blobs': len(self.blobs),
+                'bytes': sum(info['size'] for info in self.blobs.values()),
+                'urls': len(self.urls),
+            }
+
+
+def rewrite_logos(entries, store, base):
+    """Point tvg-logo at base/<blob> for every stored image; others keep their URL"""
+    base = base.rstrip('/')
+    for entry in entries:
+        name = store.blob_for(entry.tvg_logo) if entry.tvg_logo else None
+        if name:
+            entry.tvg_logo = f"{base}/{name}"
+        yield entry
+
+
+def playlist_paths(args):
+    """Resolve the playlists to read from the command line"""
+    if args.dir:
+        return sorted(os.path.join(args.dir, f) for f in os.listdir(args.dir) if f.endswith('.m3u'))
+    return args.playlists or ["all.m3u"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch playlist artwork into a local content-addressed store.")
+    parser.add_argument('playlists', nargs='*', help="playlists to read (default: all.m3u)")
+    parser.add_argument('--dir', help="read every .m3u file in this directory instead")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="image store directory")
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_MB, help="store size cap in MB")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="concurrent downloads")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="per-request timeout in seconds")
+    parser.add_argument('--rewrite', metavar='BASE',
+                        help="also write copies of the playlists with tvg-logo pointing at BASE/<file> "
+                             "(a local path or the URL the store is served from)")
+    parser.add_argument('--rewrite-dir', default="local", help="where rewritten playlists go")
+    args = parser.parse_args()
+
+    paths = playlist_paths(args)
+    playlists = {path: m3u.parse_file(path) for path in paths}
+    urls = [entry.tvg_logo for entries in playlists.values() for entry in entries if entry.tvg_logo]
+    if not urls:
+        print("No artwork found.")
+        sys.exit(1)
+
+    store = ArtworkStore(args.store, int(args.max_mb * 1024 * 1024), args.workers, args.timeout)
+    unique = len(set(urls))
+    print(f"{len(urls)} tvg-logo references, {unique} unique images...")
+    fetched, reused, failed = store.prefetch(urls)
+    removed, freed = store.evict()
+    store.save_index()
+
+    stats = store.stats()
+    print(f"{fetched} downloaded, {reused} already stored, {len(failed)} failed; "
+          f"store holds {stats['blobs']} images ({stats['bytes'] / 1e6:.1f} MB)")
+    if removed:
+        print(f"Evicted {removed} least recently used images ({freed / 1e6:.1f} MB)")
+    for url, error in failed.items():
+        print(f"  failed: {url} ({error})")
+
+    if args.rewrite:
+        os.makedirs(args.rewrite_dir, exist_ok=True)
+        for path, entries in playlists.items():
+            output = os.path.join(args.rewrite_dir, os.path.basename(path))
+            m3u.write_file(output, rewrite_logos(entries, store, args.rewrite))
+        print(f"Rewritten playlists written to {args.rewrite_dir}/")
+
+
+if __name__ == "__main__":
+    main()
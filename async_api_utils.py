@@ -0,0 +1,224 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, Dict, Sequence, Tuple
+from api_utils import BaseTMDBClient, RETRY_STATUSES
+from cache_store import CacheEntry, copy_json
+
+try:
+    import aiohttp
+except ImportError:  # Optional: only needed for the async client
+    aiohttp = None
+
+
+class AsyncRateLimiter:
+    """Token bucket for coroutines sharing one client"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available (and any server-imposed pause is over)"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for a while, e.g. after a 429"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class AsyncTMDBClient(BaseTMDBClient):
+    """asyncio counterpart of TMDBClient with the same methods as coroutines.
+
+    Shares the SQLite/memory cache with TMDBClient, caps in-flight requests
+    with a semaphore and coalesces identical concurrent requests. Expired
+    entries are served at once and revalidated in a background task. Memory
+    hits are answered on the loop; SQLite reads and writes run in worker
+    threads so they never stall other requests. Use it as an async context
+    manager so pending refreshes finish and the aiohttp session gets closed.
+    """
+
+    def __init__(self, api_key: str, cache_dir: str = ".cache",
+                 requests_per_second: float = 40.0, max_concurrency: int = 20, **kwargs):
+        if aiohttp is None:
+            raise ImportError("AsyncTMDBClient needs aiohttp: pip install aiohttp")
+        super().__init__(api_key, cache_dir, **kwargs)
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max_concurrency
+        self.session = None
+        self._semaphore = None
+        self._rate_limiter = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # cache_key -> background revalidation task
+        self._revalidating: Dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self) -> 'AsyncTMDBClient':
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Create the aiohttp session and loop-bound primitives"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=5)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._rate_limiter = AsyncRateLimiter(self.requests_per_second)
+
+    async def close(self) -> None:
+        """Wait for pending revalidations, then close the aiohttp session"""
+        if self._revalidating:
+            await asyncio.gather(*self._revalidating.values(), return_exceptions=True)
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, endpoint: str, params: Dict = None) -> Optional[Dict]:
+        """Make a request to TMDB API with caching"""
+        start = time.perf_counter()
+        data, outcome = await self._request(endpoint, params if params is not None else {})
+        self._observe(endpoint, outcome, start)
+        return data
+
+    async def _request(self, endpoint: str, params: Dict) -> Tuple[Optional[Dict], str]:
+        """request() without the bookkeeping: returns (data, outcome)"""
+        # Check cache first
+        cache_key = self._get_cache_key(endpoint, params)
+        data = self.memory_cache.get(cache_key)
+        if data is not None:
+            return data, 'memory'
+        cached_response, stale_entry, tier = await asyncio.to_thread(self._lookup_cache, cache_key)
+        if cached_response is not None:
+            return cached_response, tier
+
+        # Serve expired data right away and refresh it in the background
+        if stale_entry is not None:
+            if cache_key not in self._revalidating:
+                self._revalidating[cache_key] = asyncio.create_task(
+                    self._revalidate(cache_key, endpoint, params, stale_entry)
+                )
+            return stale_entry.data, 'stale'
+
+        # Join an identical request that is already on the wire, if any
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            data = await asyncio.shield(inflight)
+            return (copy_json(data) if data is not None else None), 'coalesced'
+
+        inflight = self._inflight[cache_key] = asyncio.get_running_loop().create_future()
+        data = None
+        try:
+            # A leader that finished while our disk read was out may have cached it
+            data = self.memory_cache.get(cache_key)
+            if data is not None:
+                return data, 'coalesced'
+
+            data, etag, last_modified = await self._fetch(endpoint, params)
+            await asyncio.to_thread(self._cache_response, cache_key, endpoint, params,
+                                    data, etag, last_modified)
+            return data, 'network'
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error making request to {endpoint}: {e}")
+            return None, 'error'
+        finally:
+            del self._inflight[cache_key]
+            inflight.set_result(copy_json(data) if data is not None else None)
+
+    async def _revalidate(self, cache_key: str, endpoint: str, params: Dict,
+                          entry: CacheEntry) -> None:
+        """Refresh a stale entry; a 304 only restarts its TTL"""
+        try:
+            data, etag, last_modified = await self._fetch(
+                endpoint, params, headers=self._conditional_headers(entry)
+            )
+            if data is None:
+                await asyncio.to_thread(self._mark_revalidated, cache_key, endpoint, params, entry)
+                self._count_revalidation(endpoint, 'not_modified')
+            else:
+                await asyncio.to_thread(self._cache_response, cache_key, endpoint, params,
+                                        data, etag, last_modified)
+                self._count_revalidation(endpoint, 'updated')
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error revalidating {endpoint}: {e}")
+            self._count_revalidation(endpoint, 'error')
+        finally:
+            self._revalidating.pop(cache_key, None)
+
+    async def _fetch(self, endpoint: str, params: Dict,
+                     headers: Optional[Dict[str, str]] = None) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+        """GET an endpoint within the concurrency and rate limits, retrying 429/5xx.
+
+        Returns (data, etag, last_modified); data is None on a 304 Not Modified.
+        """
+        await self.open()
+        url = f"{self.base_url}{endpoint}"
+        query = dict(params, api_key=self.api_key)
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                await self._rate_limiter.acquire()
+                async with self.session.get(url, params=query, headers=headers) as response:
+                    delay = None
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._retry_delay(response, attempt)
+                    if delay is not None:
+                        self._count_retry(endpoint, response.status)
+                        if response.status == 429:
+                            self._rate_limiter.pause(delay)
+                    else:
+                        response.raise_for_status()
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                        if response.status == 304:
+                            return None, etag, last_modified
+                        return await response.json(content_type=None), etag, last_modified
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def search_multi(self, query: str) -> Optional[Dict]:
+        """Search for movies and TV shows"""
+        return await self.request('/search/multi', {'query': query})
+
+    async def get_details(self, media_type: str, media_id: int,
+                          append: Sequence[str] = ()) -> Optional[Dict]:
+        """Get detailed information about a movie or TV show, plus any appended sub-resources"""
+        params = {'append_to_response': ','.join(append)} if append else None
+        return await self.request(f'/{media_type}/{media_id}', params)
+
+    async def get_watch_providers(self, media_type: str, media_id: int) -> Optional[Dict]:
+        """Get streaming platforms for a movie or TV show"""
+        return await self.request(f'/{media_type}/{media_id}/watch/providers')
+
+
+def run_with_client(api_key: str, main: Callable[['AsyncTMDBClient'], Awaitable], **client_kwargs):
+    """Run main(client) on a new event loop from synchronous code and return its result.
+
+    The client is open for the whole coroutine and closed (after any pending
+    revalidations) before this returns, e.g.
+    run_with_client(key, lambda client: client.search_multi('Reacher')).
+    """
+    async def _run():
+        async with AsyncTMDBClient(api_key, **client_kwargs) as client:
+            return await main(client)
+    return asyncio.run(_run())
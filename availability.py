@@ -0,0 +1,198 @@
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+
+import m3u
+from title_index import TitleIndex, DEFAULT_INDEX, normalize_title, playlist_groups, seed
+
+DEFAULT_AVAILABILITY = "availability.json"
+AVAILABILITY_VERSION = 1
+OFFER_TYPES = ('flatrate', 'free', 'ads', 'rent', 'buy')
+
+
+def compact_offers(providers, provider_names):
+    """Reduce a /watch/providers payload to {region: {offer type: [provider ids]}}.
+
+    Provider names are collected into provider_names (id -> name) once
+    instead of being repeated for every title and region.
+    """
+    offers = {}
+    for region, region_data in sorted((providers or {}).get('results', {}).items()):
+        by_type = {}
+        for offer_type in OFFER_TYPES:
+            ids = []
+            for provider in region_data.get(offer_type, []):
+                provider_names[str(provider['provider_id'])] = provider['provider_name']
+                ids.append(provider['provider_id'])
+            if ids:
+                by_type[offer_type] = ids
+        if by_type:
+            offers[region] = by_type
+    return offers
+
+
+def build(client, index, directory="m3u", workers=8):
+    """Fetch watch providers for every title in the playlists.
+
+    Titles the title index doesn't know are seeded first; ambiguous or
+    unknown ones are returned as skipped. Returns (availability, skipped).
+    """
+    seed(index, client, directory, workers)
+    index.save()
+
+    resolved, skipped = [], []
+    for title, media_type in playlist_groups(directory).items():
+        record = index.lookup(title, media_type=media_type)
+        if record:
+            resolved.append((title, record))
+        else:
+            skipped.append(title)
+
+    def fetch(item):
+        _, record = item
+        return client.get_watch_providers(record['media_type'], record['id'])
+
+    provider_names = {}
+    titles = {}
+    for (title, record), providers in zip(resolved, client.map(fetch, resolved, workers)):
+        if providers is None:
+            skipped.append(title)
+            continue
+        titles[title] = {
+            'media_type': record['media_type'],
+            'id': record['id'],
+            'offers': compact_offers(providers, provider_names),
+        }
+
+    availability = {
+        'version': AVAILABILITY_VERSION,
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'providers': dict(sorted(provider_names.items(), key=lambda item: int(item[0]))),
+        'titles': dict(sorted(titles.items())),
+    }
+    return availability, skipped
+
+
+class Availability:
+    """Offline queries over an availability index built by `build`.
+
+    The inverted (provider, region, offer type) -> titles map is built once
+    on load, so both query directions are dictionary lookups.
+    """
+
+    def __init__(self, data):
+        self.providers = {int(pid): name for pid, name in data['providers'].items()}
+        self.titles = data['titles']
+        self.generated = data.get('generated')
+        self._by_provider = defaultdict(list)
+        for title, info in self.titles.items():
+            for region, by_type in info['offers'].items():
+                for offer_type, ids in by_type.items():
+                    for pid in ids:
+                        self._by_provider[pid, region, offer_type].append(title)
+
+    @classmethod
+    def load(cls, path=DEFAULT_AVAILABILITY):
+        """Load an index written by the build command"""
+        with open(path, "r", encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != AVAILABILITY_VERSION:
+            raise ValueError(f"{path} was built by another version; rebuild it")
+        return cls(data)
+
+    def provider_ids(self, name):
+        """Ids of providers whose name matches name exactly, else contains it"""
+        wanted = normalize_title(name)
+        exact = [pid for pid, pname in self.providers.items() if normalize_title(pname) == wanted]
+        return exact or [pid for pid, pname in self.providers.items() if wanted in normalize_title(pname)]
+
+    def on_provider(self, name, region="US", offer_types=('flatrate',)):
+        """Titles offered by a provider in a region, as {title: [offer types]}"""
+        found = defaultdict(list)
+        for pid in self.provider_ids(name):
+            for offer_type in offer_types:
+                for title in self._by_provider.get((pid, region, offer_type), ()):
+                    if offer_type not in found[title]:
+                        found[title].append(offer_type)
+        return dict(sorted(found.items()))
+
+    def where(self, title, region=None):
+        """Where a title can be watched, as {region: {offer type: [provider names]}}"""
+        info = self.titles.get(title)
+        if info is None:
+            wanted = normalize_title(title)
+            info = next((i for t, i in self.titles.items() if normalize_title(t) == wanted), None)
+        if info is None:
+            return None
+        return {
+            offer_region: {offer_type: [self.providers[pid] for pid in ids]
+                           for offer_type, ids in by_type.items()}
+            for offer_region, by_type in info['offers'].items()
+            if region is None or offer_region == region
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query a streaming availability index for the library.")
+    parser.add_argument('--availability', default=DEFAULT_AVAILABILITY, help="availability index file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help="fetch providers for every title in the playlists")
+    build_parser.add_argument('--dir', default="m3u", help="playlist directory")
+    build_parser.add_argument('--index', default=DEFAULT_INDEX, help="title index file")
+    build_parser.add_argument('--workers', type=int, default=8, help="concurrent requests")
+
+    on_parser = commands.add_parser('on', help="titles available on a provider")
+    on_parser.add_argument('provider')
+    on_parser.add_argument('--region', default="US")
+    on_parser.add_argument('--type', dest='offer_types', action='append', choices=OFFER_TYPES,
+                           help="offer type (repeatable, default flatrate)")
+
+    where_parser = commands.add_parser('where', help="where a title can be watched")
+    where_parser.add_argument('title')
+    where_parser.add_argument('--region', help="only this region")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from api_utils import TMDBClient
+        from config import APIConfig
+        client = TMDBClient(APIConfig().tmdb_key)
+        availability, skipped = build(client, TitleIndex(args.index), args.dir, args.workers)
+        m3u.atomic_write(args.availability, [json.dumps(availability, separators=(',', ':'))])
+        print(f"{len(availability['titles'])} titles, {len(availability['providers'])} providers "
+              f"written to {args.availability}")
+        for title in skipped:
+            print(f"  skipped: {title} (unknown or ambiguous; see title_index.py)")
+        return
+
+    try:
+        availability = Availability.load(args.availability)
+    except (OSError, ValueError) as e:
+        print(f"Could not load {args.availability}: {e} (run: python availability.py build)")
+        sys.exit(1)
+
+    if args.command == 'on':
+        titles = availability.on_provider(args.provider, args.region, args.offer_types or ('flatrate',))
+        if not titles:
+            print(f"Nothing on '{args.provider}' in {args.region}.")
+            return
+        for title, offer_types in titles.items():
+            print(f"{title} ({', '.join(offer_types)})")
+
+    elif args.command == 'where':
+        offers = availability.where(args.title, args.region)
+        if offers is None:
+            print(f"'{args.title}' is not in the index.")
+            sys.exit(1)
+        if not offers:
+            print("Not available.")
+            return
+        for region, by_type in offers.items():
+            summary = '; '.join(f"{offer_type}: {', '.join(names)}" for offer_type, names in by_type.items())
+            print(f"{region}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Parse/serialize benchmark for m3u.py on a synthetic playlist.
+
+    python benchmarks/bench_m3u.py [--entries 100000] [--repeat 3] [--json]
+
+Compares the old two-lines-per-entry pairing with an uncompiled
+re.search sort key against m3u.iter_entries + sort + iter_lines.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import m3u  # noqa: E402
+
+
+def synthetic_playlist(entries, seed=0):
+    """Build playlist lines shaped like ours: series episodes sharing one poster."""
+    rng = random.Random(seed)
+    lines = ["#EXTM3U\n"]
+    series_count = max(1, entries // 20)
+    for i in range(entries):
+        series = f"Series {rng.randrange(series_count):05d}"
+        poster = f"https://image.tmdb.org/t/p/w500/{hash(series) & 0xffffffff:08x}.jpg"
+        season, episode = divmod(i % 40, 10)
+        lines.append(
+            f'#EXTINF:-1 group-title="{series}" tvg-logo="{poster}", '
+            f'{series} | S{season + 1}.E{episode + 1} - Episode {episode + 1}\n'
+        )
+        if i % 50 == 0:
+            lines.append("#EXTVLCOPT:http-user-agent=Mozilla/5.0\n")
+        lines.append(f"https://mirror{i % 7}.example.com/watch/{i}?hash=AgAD{i:05d}\n")
+    return lines
+
+
+def legacy_sort(lines):
+    """The old combine path: pair lines two by two, sort with re.search per entry."""
+    content = [line.strip() + '\n' for line in lines if line.strip() and line.strip() != "#EXTM3U"]
+    entries = [content[i:i + 2] for i in range(0, len(content), 2)]
+
+    def key(entry):
+        match = re.search(r'group-title="([^"]+)"', entry[0])
+        return match.group(1) if match else ""
+
+    entries.sort(key=key)
+    out = []
+    for entry in entries:
+        out.extend(entry)
+    return out
+
+
+def m3u_sort(lines):
+    """The m3u module path: single-pass parse, sort on the parsed group-title, serialize."""
+    entries = sorted(m3u.iter_entries(lines), key=lambda entry: entry.sort_key)
+    return list(m3u.iter_lines(entries))
+
+
+def timed(func, *args, repeat=3):
+    """Best wall time over `repeat` runs, plus the peak traced memory of one run."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    lines = synthetic_playlist(args.entries)
+    text = ''.join(lines)
+    parsed = list(m3u.iter_entries(lines))
+
+    results = {'entries': args.entries, 'lines': len(lines), 'cases': {}}
+    cases = {
+        'parse': (lambda: list(m3u.iter_entries(lines)),),
+        'serialize': (lambda: m3u.dumps(parsed),),
+        'roundtrip_sort_m3u': (lambda: m3u_sort(lines),),
+        'roundtrip_sort_legacy': (lambda: legacy_sort(lines),),
+    }
+    for name, (func,) in cases.items():
+        seconds, peak = timed(func, repeat=args.repeat)
+        results['cases'][name] = {
+            'seconds': round(seconds, 4),
+            'entries_per_second': round(args.entries / seconds) if seconds else None,
+            'peak_bytes': peak,
+        }
+
+    # The parsed form must serialize back to the synthetic input
+    results['roundtrip_ok'] = m3u.dumps(parsed) == text
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.entries} entries ({len(lines)} lines), best of {args.repeat}:")
+    for name, case in results['cases'].items():
+        print(f"  {name:<24} {case['seconds']:>8.3f}s  {case['entries_per_second']:>10,}/s  "
+              f"peak {case['peak_bytes'] / 1e6:.1f} MB")
+    print(f"  round-trip identical: {results['roundtrip_ok']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Startup cost of each cli.py command, measured with `python -X importtime`.
+
+    python benchmarks/bench_startup.py [--repeat 5] [--budget-ms combine=60] [--json]
+
+For every command, imports its module in a fresh interpreter and reports the
+cumulative import time of the module and its heaviest imports, plus the wall
+time of `cli.py <command> --help`. Commands over their budget make the run
+exit non-zero, so it can guard cron boxes against import-time regressions.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cli import COMMANDS  # noqa: E402
+
+# import time:       self [us] |   cumulative | imported package
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+# Only the light commands get a default budget; the API tools pay for their clients
+DEFAULT_BUDGETS_MS = {'combine': 60, 'linkcheck': 250, 'index': 60}
+
+
+def import_profile(module):
+    """Import module in a fresh interpreter; return (cumulative ms, {direct import: ms})"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    # Children are printed before their parent, one indent level deeper
+    children = {}
+    for match in IMPORTTIME_RE.finditer(result.stderr):
+        _, cumulative, indent, name = match.groups()
+        ms = int(cumulative) / 1000
+        if not indent:
+            if name == module:
+                return ms, children
+            children = {}
+        elif len(indent) == 2:
+            children[name] = ms
+    return 0.0, {}
+
+
+def help_wall_time(command, repeat):
+    """Best wall time in ms of `python cli.py <command> --help`"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'cli.py', command, '--help'], cwd=ROOT,
+                       capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def parse_budgets(values):
+    """Turn ['combine=60', ...] into {'combine': 60.0}"""
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for value in values or []:
+        command, _, ms = value.partition('=')
+        budgets[command] = float(ms)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('commands', nargs='*', help="commands to measure (default: all)")
+    parser.add_argument('--repeat', type=int, default=5, help="--help runs per command")
+    parser.add_argument('--budget-ms', action='append', metavar='COMMAND=MS',
+                        help="cumulative import budget for a command (repeatable)")
+    parser.add_argument('--top', type=int, default=5, help="heaviest imports to list")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    budgets = parse_budgets(args.budget_ms)
+    results = {'python': sys.version.split()[0], 'commands': {}}
+    over_budget = []
+    for command in args.commands or COMMANDS:
+        module = COMMANDS[command][0]
+        try:
+            import_ms, children = import_profile(module)
+        except RuntimeError as e:
+            results['commands'][command] = {'module': module, 'error': str(e)}
+            continue
+        heaviest = sorted(children.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        case = {
+            'module': module,
+            'import_ms': round(import_ms, 2),
+            'help_wall_ms': round(help_wall_time(command, args.repeat), 1),
+            'heaviest_imports': {name: round(ms, 2) for name, ms in heaviest},
+            'budget_ms': budgets.get(command),
+        }
+        if case['budget_ms'] is not None and case['import_ms'] > case['budget_ms']:
+            over_budget.append(command)
+        results['commands'][command] = case
+    results['over_budget'] = over_budget
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"Python {results['python']}; import time of each command's module:")
+        for command, case in results['commands'].items():
+            if 'error' in case:
+                print(f"  {command:<13} {case['error']}")
+                continue
+            budget = f" (budget {case['budget_ms']:g} ms)" if case['budget_ms'] is not None else ""
+            flag = "  OVER BUDGET" if command in over_budget else ""
+            print(f"  {command:<13} import {case['import_ms']:>7.1f} ms   --help {case['help_wall_ms']:>6.1f} ms"
+                  f"{budget}{flag}")
+            for name, ms in case['heaviest_imports'].items():
+                print(f"      {name:<28} {ms:>7.1f} ms")
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""Offline benchmark suite for the TMDB client, movie_info, combine and IMDb paths.
+
+    python benchmarks/bench_suite.py [--latency-ms 20] [--sizes 1000,10000,100000]
+                                     [--output results.json] [--compare previous.json]
+
+Starts benchmarks/stub_server.py in a subprocess, points the tools at it and
+times each path; results are JSON so two runs on one machine can be compared
+(--compare prints the change per case).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_utils import TMDBClient  # noqa: E402
+import imdb  # noqa: E402
+import movie_info  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SERIES_ID = 108978  # id in the season fixtures; any id is served the same body
+ENTRIES_PER_FILE = 200
+DUPLICATE_RATE = 0.02  # share of synthetic library entries that mirror another file's
+
+
+@contextlib.contextmanager
+def stub_server(latency_ms, jitter_ms):
+    """Run the stub server in its own process and yield its base URL"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_server.py'),
+         '--port', '0', '--latency-ms', str(latency_ms), '--jitter-ms', str(jitter_ms)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        line = process.stdout.readline()
+        if not line.startswith('listening on '):
+            raise RuntimeError("stub server failed to start")
+        yield f"http://127.0.0.1:{line.split()[-1]}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def case(seconds, operations, unit):
+    """Result record: wall time plus throughput in `unit`/s"""
+    return {
+        'seconds': round(seconds, 4),
+        'operations': operations,
+        f'{unit}_per_second': round(operations / seconds, 1) if seconds else None,
+    }
+
+
+def timed(func, *args):
+    """Run func once, returning (seconds, result)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def new_client(base_url, cache_dir):
+    """A TMDB client against the stub with the rate limit switched off"""
+    return TMDBClient('bench', cache_dir=cache_dir, base_url=f"{base_url}/3", requests_per_second=0)
+
+
+def bench_tmdb(base_url, requests, workers):
+    """Throughput of TMDBClient.request with a cold cache, then warm from memory and from disk"""
+    endpoints = [f'/movie/{i}' for i in range(requests)]
+    cache_dir = tempfile.mkdtemp(prefix='bench-tmdb-')
+    try:
+        client = new_client(base_url, cache_dir)
+        cold, _ = timed(client.map, client.request, endpoints, workers)
+        warm_memory, _ = timed(client.map, client.request, endpoints, workers)
+        # A fresh client on the same directory only has the SQLite cache to go on
+        disk_client = new_client(base_url, cache_dir)
+        warm_disk, _ = timed(disk_client.map, disk_client.request, endpoints, workers)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        'tmdb_request_cold': case(cold, requests, 'requests'),
+        'tmdb_request_warm_memory': case(warm_memory, requests, 'requests'),
+        'tmdb_request_warm_disk': case(warm_disk, requests, 'requests'),
+    }
+
+
+def bench_episodes(base_url, seasons):
+    """movie_info.process_episodes for whole seasons, cold and warm"""
+    cache_dir = tempfile.mkdtemp(prefix='bench-episodes-')
+    previous = movie_info.tmdb_client
+    try:
+        movie_info.tmdb_client = new_client(base_url, cache_dir)
+
+        def generate():
+            with contextlib.redirect_stdout(io.StringIO()):
+                for season in range(1, seasons + 1):
+                    movie_info.process_episodes(SERIES_ID, 'Reacher', season, 1, None)
+
+        with open(os.path.join(FIXTURES, 'tmdb_season.json'), encoding='utf-8') as f:
+            episodes = seasons * len(json.load(f)['episodes'])
+        cold, _ = timed(generate)
+        warm, _ = timed(generate)
+    finally:
+        movie_info.tmdb_client = previous
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        'process_episodes_cold': case(cold, episodes, 'episodes'),
+        'process_episodes_warm': case(warm, episodes, 'episodes'),
+    }
+
+
+def library_playlist(index, count, duplicate_rate):
+    """Lines of playlist `index`: ten series of its own, a quarter of them signed links.
+
+    About duplicate_rate of the entries are mirrors of the previous file's
+    entry at the same position (same series, title and link, another
+    ?hash=), so de-duplication has a known amount of work to do.
+    """
+    rng = random.Random(index)
+    lines = []
+    for i in range(count):
+        source = index - 1 if index and rng.random() < duplicate_rate else index
+        number = source * ENTRIES_PER_FILE + i
+        series = f"Series {source:05d}-{i // 20}"
+        poster = f"https://image.tmdb.org/t/p/w500/{source:05d}{i // 20}.jpg"
+        season, episode = divmod(i % 20, 10)
+        lines.append(f'#EXTINF:-1 group-title="{series}" tvg-logo="{poster}", '
+                     f'{series} | S{season + 1}.E{episode + 1} - Episode {episode + 1}\n')
+        if i % 4 == 0:
+            lines.append(f"https://cdn.example.com/{number}.mp4?Expires={4102444800 + number}&Signature=s{index}\n")
+        else:
+            lines.append(f"https://mirror{number % 7}.example.com/watch/{number}?hash=AgAD{index:05d}\n")
+    return lines
+
+
+def write_library(directory, entries, duplicate_rate):
+    """Write a synthetic m3u/ library of `entries` entries split into files"""
+    os.makedirs(directory)
+    for index, start in enumerate(range(0, entries, ENTRIES_PER_FILE)):
+        lines = library_playlist(index, min(ENTRIES_PER_FILE, entries - start), duplicate_rate)
+        with open(os.path.join(directory, f"playlist{index:05d}.m3u"), 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+
+
+def edit_one_file(directory, generation):
+    """Point one link of the first playlist elsewhere, as fixing a dead mirror would"""
+    path = os.path.join(directory, "playlist00000.m3u")
+    with open(path, encoding='utf-8') as f:
+        lines = f.readlines()
+    lines[1] = f"https://mirror0.example.com/watch/fixed-{generation}\n"
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+
+def count_entries(path):
+    """Number of entries in a combined playlist"""
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for line in f if line.startswith('#EXTINF'))
+
+
+def bench_combine(sizes, repeat, duplicate_rate):
+    """combine_all_m3u.py end to end: full rebuild, incremental runs (no change, one file edited) and --stream"""
+    results = {}
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix='bench-combine-')
+        try:
+            library = os.path.join(workdir, 'm3u')
+            output = os.path.join(workdir, 'all.m3u')
+            write_library(library, size, duplicate_rate)
+            base = [sys.executable, os.path.join(ROOT, 'combine_all_m3u.py'), '--dir', library,
+                    '--output', output, '--manifest', os.path.join(workdir, 'manifest.json')]
+            # (case, extra arguments, change made to the library before each run)
+            modes = [
+                ('full', ['--full'], None),
+                ('incremental', [], None),
+                ('incremental_one_file', [], edit_one_file),
+                ('stream', ['--stream'], None),
+            ]
+            generation = 0
+            for mode, extra, prepare in modes:
+                best = float('inf')
+                for _ in range(repeat):
+                    if prepare:
+                        generation += 1
+                        prepare(library, generation)
+                    start = time.perf_counter()
+                    subprocess.run(base + extra, check=True, stdout=subprocess.DEVNULL)
+                    seconds = time.perf_counter() - start
+                    best = min(best, seconds)
+                results[f'combine_{mode}_{size}'] = case(best, size, 'entries')
+                results[f'combine_{mode}_{size}']['output_entries'] = count_entries(output)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def bench_imdb(base_url, items, workers, repeat):
+    """IMDb batch extraction over HTTP, and the regex extraction alone"""
+    client = imdb.IMDbClient(base_url, cache_path='', workers=workers)
+    titles = [f"Sinners {i}" for i in range(items)]
+    pipeline, results = timed(client.resolve_many, titles)
+    failures = sum(1 for result in results if not result['m3u8'])
+
+    pages = {}
+    for name in ('imdb_find.html', 'imdb_title.html', 'imdb_video.html'):
+        with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+            pages[name] = f.read()
+
+    def extract():
+        for _ in range(items):
+            imdb.parse_search_results(pages['imdb_find.html'])
+            imdb.VIDEO_RE.search(pages['imdb_title.html'])
+            imdb.best_m3u_link(pages['imdb_video.html'])
+
+    parse = min(timed(extract)[0] for _ in range(repeat))
+    pipeline_case = case(pipeline, items, 'titles')
+    pipeline_case['failures'] = failures
+    return {
+        'imdb_pipeline': pipeline_case,
+        'imdb_extract_only': case(parse, items, 'titles'),
+    }
+
+
+def compare(results, previous_path):
+    """Print each case's time change against an earlier results file"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)['cases']
+    print(f"Change vs {previous_path} (negative is faster):")
+    for name, current in results['cases'].items():
+        before = previous.get(name)
+        if not before or not before['seconds']:
+            print(f"  {name:<32} new")
+            continue
+        change = (current['seconds'] - before['seconds']) / before['seconds'] * 100
+        print(f"  {name:<32} {before['seconds']:>9.3f}s -> {current['seconds']:>9.3f}s  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="stub server delay per response")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="uniform +/- jitter on that delay")
+    parser.add_argument('--requests', type=int, default=500, help="distinct TMDB requests")
+    parser.add_argument('--workers', type=int, default=20, help="client concurrency")
+    parser.add_argument('--seasons', type=int, default=5, help="seasons generated by process_episodes")
+    parser.add_argument('--sizes', default="1000,10000,100000", help="combine library sizes (entries)")
+    parser.add_argument('--duplicate-rate', type=float, default=DUPLICATE_RATE,
+                        help="share of combine library entries that duplicate another file's")
+    parser.add_argument('--imdb-items', type=int, default=50, help="titles run through the IMDb pipeline")
+    parser.add_argument('--repeat', type=int, default=3, help="best-of runs for the offline cases")
+    parser.add_argument('--only', action='append', choices=['tmdb', 'episodes', 'combine', 'imdb'],
+                        help="run only these groups (repeatable)")
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--compare', metavar='PREVIOUS', help="print the change against an earlier results file")
+    args = parser.parse_args()
+
+    groups = args.only or ['tmdb', 'episodes', 'combine', 'imdb']
+    results = {
+        'machine': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'cases': {},
+    }
+    with stub_server(args.latency_ms, args.jitter_ms) as base_url:
+        if 'tmdb' in groups:
+            results['cases'].update(bench_tmdb(base_url, args.requests, args.workers))
+        if 'episodes' in groups:
+            results['cases'].update(bench_episodes(base_url, args.seasons))
+        if 'imdb' in groups:
+            results['cases'].update(bench_imdb(base_url, args.imdb_items, args.workers, args.repeat))
+    if 'combine' in groups:
+        sizes = [int(size) for size in args.sizes.split(',') if size]
+        results['cases'].update(bench_combine(sizes, args.repeat, args.duplicate_rate))
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Local stand-in for TMDB, IMDb and YouTube that replays fixtures with latency.
+
+    python benchmarks/stub_server.py [--port 8800] [--latency-ms 20] [--jitter-ms 5]
+                                     [--latency tmdb=30 --latency imdb=80]
+
+Point the tools at it with base_url=http://127.0.0.1:PORT/3 (TMDBClient),
+--base-url http://127.0.0.1:PORT (imdb.py) or /youtube/v3/search. Responses
+come from benchmarks/fixtures/ and only depend on the path, so every id or
+query gets the same recorded body; each carries an ETag and a matching
+If-None-Match gets a 304. Prints `listening on PORT` once ready.
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# (service, path pattern, fixture); the first match wins
+ROUTES = [
+    ('tmdb', re.compile(r'/3/search/movie'), 'tmdb_search_movie.json'),
+    ('tmdb', re.compile(r'/3/search/tv'), 'tmdb_search_tv.json'),
+    ('tmdb', re.compile(r'/3/search/multi'), 'tmdb_search_multi.json'),
+    ('tmdb', re.compile(r'/3/(movie|tv)/\d+/watch/providers'), 'tmdb_providers.json'),
+    ('tmdb', re.compile(r'/3/tv/\d+/season/\d+/episode/\d+'), 'tmdb_episode.json'),
+    ('tmdb', re.compile(r'/3/tv/\d+/season/\d+'), 'tmdb_season.json'),
+    ('tmdb', re.compile(r'/3/tv/\d+'), 'tmdb_tv.json'),
+    ('tmdb', re.compile(r'/3/movie/\d+'), 'tmdb_movie.json'),
+    ('imdb', re.compile(r'/find'), 'imdb_find.html'),
+    ('imdb', re.compile(r'/title/tt\d+/?'), 'imdb_title.html'),
+    ('imdb', re.compile(r'/video/vi\d+/?'), 'imdb_video.html'),
+    ('youtube', re.compile(r'/youtube/v3/search'), 'youtube_search.json'),
+]
+CONTENT_TYPES = {'.json': 'application/json; charset=utf-8', '.html': 'text/html; charset=utf-8'}
+
+
+def load_fixtures():
+    """Read every routed fixture once: name -> bytes"""
+    fixtures = {}
+    for _, _, name in ROUTES:
+        with open(os.path.join(FIXTURES, name), 'rb') as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+def make_server(port=0, latency_ms=0.0, jitter_ms=0.0, service_latency_ms=None, seed=0):
+    """Build (not start) a threaded stub server; port 0 picks a free one.
+
+    server.fixtures (name -> bytes) can be edited to change what is served.
+    """
+    fixtures = load_fixtures()
+    service_latency_ms = service_latency_ms or {}
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    stats = {'requests': 0, 'not_found': 0, 'not_modified': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            for service, pattern, name in ROUTES:
+                if pattern.fullmatch(path):
+                    break
+            else:
+                stats['not_found'] += 1
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            delay = service_latency_ms.get(service, latency_ms)
+            if jitter_ms:
+                with rng_lock:
+                    delay += rng.uniform(-jitter_ms, jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            body = fixtures[name]
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            stats['requests'] += 1
+            if self.headers.get('If-None-Match') == etag:
+                stats['not_modified'] += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPES[os.path.splitext(name)[1]])
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.stats = stats
+    server.fixtures = fixtures
+    return server
+
+
+def parse_service_latency(values):
+    """Turn ['tmdb=30', 'imdb=80'] into {'tmdb': 30.0, 'imdb': 80.0}"""
+    latencies = {}
+    for value in values or []:
+        service, _, ms = value.partition('=')
+        latencies[service] = float(ms)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8800, help="port to listen on (0 picks a free one)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="delay added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="uniform +/- jitter on the delay")
+    parser.add_argument('--latency', action='append', metavar='SERVICE=MS',
+                        help="per-service delay for tmdb, imdb or youtube (repeatable)")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency_ms, args.jitter_ms, parse_service_latency(args.latency))
+    print(f"listening on {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"served {server.stats['requests']} requests ({server.stats['not_found']} not found)",
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Optional, Dict, Any, Tuple
+
+# Default TTLs in seconds; the first pattern matching the endpoint wins
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_ENDPOINT_TTLS = {
+    '*/watch/providers': 12 * 60 * 60,
+    '/search/*': 24 * 60 * 60,
+}
+
+# How long past its TTL an entry is kept around to serve while it revalidates
+DEFAULT_STALE_TTL = 7 * 24 * 60 * 60
+
+# LRU access times are only rewritten when older than this, so reads rarely write
+ACCESS_RESOLUTION = 60
+
+# Request parameters that never belong in a cache key
+IGNORED_PARAMS = ('api_key',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Columns added after the first release of the schema, with their types
+LATER_COLUMNS = {'etag': 'TEXT', 'last_modified': 'TEXT'}
+
+CacheEntry = namedtuple('CacheEntry', 'data expires size etag last_modified')
+
+
+def make_cache_key(endpoint: str, params: Optional[Dict] = None) -> str:
+    """Hash an endpoint and its params (minus credentials) into a cache key"""
+    params = {k: v for k, v in (params or {}).items() if k not in IGNORED_PARAMS}
+    raw = json.dumps([endpoint, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SQLiteCache:
+    """Single-file response cache with per-endpoint TTLs and LRU eviction.
+
+    SQLite in WAL mode handles locking, so several processes (and threads,
+    each with their own connection) can share one cache file safely.
+    """
+
+    def __init__(self, path: str, default_ttl: int = DEFAULT_TTL,
+                 endpoint_ttls: Optional[Dict[str, int]] = None,
+                 max_bytes: int = 256 * 1024 * 1024,
+                 legacy_dir: Optional[str] = None,
+                 stale_ttl: int = DEFAULT_STALE_TTL):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.endpoint_ttls = DEFAULT_ENDPOINT_TTLS if endpoint_ttls is None else endpoint_ttls
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(entries)')}
+        for name, column_type in LATER_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f'ALTER TABLE entries ADD COLUMN {name} {column_type}')
+        self.purge_expired()
+
+        if legacy_dir:
+            self.migrate_legacy_dir(legacy_dir)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """Open a write transaction that takes the database lock up front"""
+        return _Transaction(self._connection())
+
+    def ttl_for(self, endpoint: str) -> int:
+        """Return the TTL that applies to an endpoint"""
+        for pattern, ttl in self.endpoint_ttls.items():
+            if fnmatch.fnmatchcase(endpoint, pattern):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached data for a key, or None if missing or expired"""
+        entry = self.get_entry(key)
+        return entry.data if entry else None
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+        """Return the CacheEntry for a key, or None.
+
+        With allow_stale, entries past their TTL (but still inside the stale
+        window) are returned too; check entry.expires to tell them apart.
+        The access time used for eviction is refreshed at most once per
+        ACCESS_RESOLUTION seconds, keeping hot reads off the write lock.
+        """
+        conn = self._connection()
+        now = time.time()
+        oldest = now - self.stale_ttl if allow_stale else now
+        row = conn.execute(
+            'SELECT data, expires, size, etag, last_modified, accessed FROM entries '
+            'WHERE key = ? AND expires > ?', (key, oldest)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[5] > ACCESS_RESOLUTION:
+            conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return CacheEntry(json.loads(row[0]), row[1], row[2], row[3], row[4])
+
+    def set(self, key: str, endpoint: str, data: Any, created: Optional[float] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None,
+            ttl: Optional[int] = None) -> Tuple[float, int]:
+        """Store data under a key and evict least recently used entries if over the cap.
+
+        ttl overrides the endpoint's TTL. Returns (expires, size) so callers
+        can mirror the entry in memory.
+        """
+        now = time.time()
+        created = now if created is None else created
+        expires = created + (self.ttl_for(endpoint) if ttl is None else ttl)
+        payload = json.dumps(data, separators=(',', ':'))
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries '
+                '(key, endpoint, data, size, created, expires, accessed, etag, last_modified) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, endpoint, payload, len(payload), created, expires, now,
+                 etag, last_modified)
+            )
+            self._evict(conn)
+        return expires, len(payload)
+
+    def touch(self, key: str, endpoint: str, ttl: Optional[int] = None) -> Optional[float]:
+        """Restart an entry's TTL after the server confirmed it unchanged (304).
+
+        Returns the new expiry, or None if the entry is gone.
+        """
+        now = time.time()
+        expires = now + (self.ttl_for(endpoint) if ttl is None else ttl)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE entries SET created = ?, expires = ?, accessed = ? WHERE key = ?',
+                (now, expires, now, key)
+            )
+        return expires if cursor.rowcount else None
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop entries past the stale window, then the least recently used ones until under max_bytes"""
+        conn.execute('DELETE FROM entries WHERE expires <= ?', (time.time() - self.stale_ttl,))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of the cap so we don't evict on every write
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+
+    def purge_expired(self) -> int:
+        """Delete every entry past the stale window and return how many were removed"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'DELETE FROM entries WHERE expires <= ?', (time.time() - self.stale_ttl,)
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Return entry count and total payload size"""
+        count, size = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+        ).fetchone()
+        return {'entries': count, 'bytes': size}
+
+    def migrate_legacy_dir(self, legacy_dir: str) -> int:
+        """Import the old one-JSON-file-per-key cache once and delete the files"""
+        if not os.path.isdir(legacy_dir):
+            return 0
+
+        with self._transaction() as conn:
+            done = conn.execute(
+                "SELECT value FROM meta WHERE name = 'legacy_migrated'"
+            ).fetchone()
+            if done:
+                return 0
+
+            imported = 0
+            migrated_files = []
+            for filename in os.listdir(legacy_dir):
+                parsed = _parse_legacy_filename(filename)
+                if parsed is None:
+                    continue
+                file_path = os.path.join(legacy_dir, filename)
+                try:
+                    with open(file_path, 'r') as f:
+                        cached_data = json.load(f)
+                    endpoint, params = parsed
+                    created = float(cached_data['timestamp'])
+                    data = cached_data['data']
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+
+                migrated_files.append(file_path)
+                expires = created + self.ttl_for(endpoint)
+                if expires <= time.time() - self.stale_ttl:
+                    continue
+                payload = json.dumps(data, separators=(',', ':'))
+                conn.execute(
+                    'INSERT OR IGNORE INTO entries '
+                    '(key, endpoint, data, size, created, expires, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (make_cache_key(endpoint, params), endpoint, payload,
+                     len(payload), created, expires, created)
+                )
+                imported += 1
+
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('legacy_migrated', ?)",
+                (str(time.time()),)
+            )
+            self._evict(conn)
+
+        for file_path in migrated_files:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        return imported
+
+
+class MemoryCache:
+    """Bounded in-process LRU of parsed responses that sits in front of the disk cache.
+
+    Entries keep their disk expiry time, and callers always get a copy so
+    the cached object can't be mutated behind our back.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()  # key -> (data, expires, size)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached data, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            data, expires, size = entry
+            if expires <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy_json(data)
+
+    def put(self, key: str, data: Any, expires: float, size: int) -> None:
+        """Store parsed data, evicting least recently used entries past either limit"""
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        data = copy_json(data)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (data, expires, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+def copy_json(data: Any) -> Any:
+    """Copy JSON-shaped data (dicts, lists, scalars) faster than copy.deepcopy"""
+    if isinstance(data, dict):
+        return {k: copy_json(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [copy_json(v) for v in data]
+    return data
+
+
+class _Transaction:
+    """Context manager for a BEGIN IMMEDIATE ... COMMIT/ROLLBACK block"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+
+
+def _parse_legacy_filename(filename: str):
+    """Recover (endpoint, params) from an old `<endpoint>_<json params>.json` name.
+
+    Returns None when the name can't be read back unambiguously.
+    """
+    if not filename.endswith('.json') or '_{' not in filename:
+        return None
+    name = filename[:-len('.json')]
+    endpoint_part, _, params_part = name.partition('_{')
+    # The old key replaced every '/' and '?' with '_'; endpoints never contain '_' themselves
+    endpoint = endpoint_part.replace('_', '/')
+    try:
+        params = json.loads('{' + params_part)
+    except ValueError:
+        return None
+    if not isinstance(params, dict):
+        return None
+    # Param names are plain identifiers, but a '_' in a value may have been any
+    # of the three (e.g. a query for "AC/DC"); guessing would file the entry
+    # under a key that is never looked up
+    if any('_' in str(value) for name, value in params.items() if name not in IGNORED_PARAMS):
+        return None
+    return endpoint, params
@@ -0,0 +1,50 @@
+"""One entry point for every tool: python cli.py <command> [options].
+
+Only the module behind the chosen command is imported, and the tools build
+their API clients on first use, so `cli.py combine` never loads requests,
+googleapiclient or dotenv.
+"""
+import sys
+from importlib import import_module
+
+# command -> (module, description); each module exposes main()
+COMMANDS = {
+    'info': ('info', "show details and streaming platforms for titles"),
+    'movie': ('movie_info', "generate M3U entries for movies and series (--batch for manifests)"),
+    'combine': ('combine_all_m3u', "combine m3u/*.m3u into all.m3u"),
+    'linkcheck': ('linkcheck', "check every link in one or more playlists"),
+    'index': ('title_index', "manage the title -> TMDB id index"),
+    'availability': ('availability', "build and query the streaming availability index"),
+    'imdb': ('imdb', "find IMDb trailer playlists"),
+    'trailers': ('ytsearch', "search YouTube for official trailers"),
+    'artwork': ('artwork', "prefetch playlist artwork into a local store"),
+}
+
+
+def usage():
+    """Return the command overview printed for --help or a bad command"""
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: cli.py <command> [options]", "", "commands:"]
+    lines += [f"  {name:<{width}}  {description}" for name, (_, description) in COMMANDS.items()]
+    lines += ["", "Run 'cli.py <command> --help' for a command's options."]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"cli.py: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    module = import_module(COMMANDS[command][0])
+    # The tools parse sys.argv themselves; make their usage lines read 'cli.py <command>'
+    sys.argv = [f"cli.py {command}"] + args
+    module.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,119 +1,759 @@
 import os
 import sys
-import re
+import json
+import heapq
+import itertools
+import hashlib
+import argparse
+import tempfile
+import time
+import m3u
+import metrics
+import profiling
+from metrics import REGISTRY
+
+DEFAULT_DIRECTORY = "m3u"  # Directory containing .m3u files
+DEFAULT_OUTPUT = "all.m3u"  # Output file name
+DEFAULT_MANIFEST = ".combine_manifest.json"  # Per-file state for incremental rebuilds
+MANIFEST_VERSION = 6
+MAX_OPEN_RUNS = 256  # Sorted runs merged at once in --stream mode
+SPILL_LIMIT = 10000  # Report records --stream keeps in memory before moving them to disk
+EXPIRY_ACTIONS = ('keep', 'report', 'drop', 'demote')  # What to do with expired signed URLs
 
 def extract_group_title(line):
     """Extract group-title from EXTINF line."""
-    match = re.search(r'group-title="([^"]+)"', line)
-    return match.group(1) if match else ""
+    return m3u.extract_group_title(line)
 
 def sort_playlist_entries(content):
     """Sort playlist entries by group-title."""
     if not content:
         return []
-    
-    # Initialize variables
-    entries = []
-    current_entry = []
-    
-    # Group lines into entries (EXTINF line + URL line)
-    for line in content:
-        current_entry.append(line)
-        if len(current_entry) == 2:  # We have a complete entry
-            entries.append(current_entry)
-            current_entry = []
-    
-    # If there's a leftover line, add it
-    if current_entry:
-        entries.append(current_entry)
-    
-    # Sort entries based on group-title
-    entries.sort(key=lambda x: extract_group_title(x[0]))
-    
-    # Flatten the entries back into lines
-    sorted_content = []
+
+    # Parse into entries (EXTINF, any directives, URL) and sort on group-title
+    entries = sorted(m3u.iter_entries(content), key=lambda entry: entry.sort_key)
+    return list(m3u.iter_lines(entries, header=False))
+
+def read_playlist(file_path):
+    """Read a playlist, returning its non-empty lines (minus #EXTM3U) and content hash."""
+    with REGISTRY.timer('combine_stage_seconds', stage='read'):
+        with open(file_path, "rb") as infile:
+            raw = infile.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        content = [line.strip() + '\n' for line in raw.decode('utf-8').splitlines()
+                   if line.strip() and line.strip() != "#EXTM3U"]
+    return content, digest
+
+def parse_file_entries(content, skipped=None):
+    """Parse a file's lines into entries and sort them by group-title.
+
+    Returns [group_title, lines, expires, url_key, title] records, where
+    expires is the signed URL's Expires= timestamp (or None) and url_key the
+    normalized URL used for de-duplication; the sort is stable, so entries
+    of one group keep their order within the file. An #EXTINF without a URL
+    would leave the combined playlist with a dangling line, so it is left
+    out (and its title added to skipped, if given).
+    """
+    with REGISTRY.timer('combine_stage_seconds', stage='parse'):
+        entries = []
+        for entry in m3u.iter_entries(content):
+            if entry.url is None:
+                if skipped is not None:
+                    skipped.append(entry.title)
+                continue
+            entries.append([entry.sort_key, entry.to_lines(), m3u.url_expiry(entry.url),
+                            m3u.normalize_url(entry.url), entry.title])
+    with REGISTRY.timer('combine_stage_seconds', stage='sort'):
+        entries.sort(key=lambda entry: entry[0])
+    return entries
+
+def report_skipped(filename, skipped):
+    """Warn about a file's entries that were left out for lacking a URL."""
+    if skipped:
+        print(f"Warning: {filename}: skipped {len(skipped)} entr{'y' if len(skipped) == 1 else 'ies'} "
+              f"without a URL (first: {skipped[0]})")
+
+def merge_entries(per_file_entries):
+    """Merge already-sorted per-file entries into one sorted stream of entries.
+
+    Ties on group-title keep file order, then in-file order, which matches a
+    stable sort of the files concatenated in that order.
+    """
+    return heapq.merge(*per_file_entries, key=lambda entry: entry[0])
+
+def entry_lines(entries):
+    """Flatten a stream of entries into playlist lines."""
+    for entry in entries:
+        yield from entry[1]
+
+def iter_groups(entries):
+    """Split a group-sorted entry stream into lists of one group-title each."""
+    group = None
+    buffered = []
+    for entry in entries:
+        if entry[0] != group and buffered:
+            yield buffered
+            buffered = []
+        group = entry[0]
+        buffered.append(entry)
+    if buffered:
+        yield buffered
+
+def dedupe_entries(entries, removed, shared):
+    """Collapse duplicate mirrors within each group of a group-sorted stream.
+
+    Uses two per-group indexes: (display title without its ALT suffix,
+    normalized URL) finds duplicates, so `?hash=` or re-signed variants of
+    one file under one title collapse. The copy whose signature expires
+    last wins (unsigned counts as never expiring, ties keep the first) and
+    takes the place of the first copy; the others are appended to removed
+    as (group_title, title, kept_title, url) records. Normalized URL alone
+    finds one file listed under different titles, which is likely a
+    copy-paste slip. Those are only appended to shared for review, as
+    (group_title, title, other_title) records.
+
+    When a title loses a mirror, its survivors are relabelled in their
+    original order as primary, `- ALT`, `- ALT2`, ... so the sequence has no
+    gaps. Titles that lose nothing are left exactly as they were.
+    """
+    for group in iter_groups(entries):
+        by_title_url = {}
+        by_url = {}
+        kept = []
+        touched_titles = set()
+        for entry in group:
+            base, _ = m3u.split_alt_title(entry[4])
+            url_key = entry[3]
+            if url_key is not None:
+                slot = by_title_url.get((base, url_key))
+                if slot is not None:
+                    duplicate = kept[slot]
+                    touched_titles.add(base)
+                    if _expiry_rank(entry) > _expiry_rank(duplicate):
+                        # A fresher signature of the same file replaces the stale copy
+                        kept[slot] = entry
+                        removed.append(_removed_record(duplicate, entry))
+                        if by_url[url_key] is duplicate:
+                            by_url[url_key] = entry
+                    else:
+                        removed.append(_removed_record(entry, duplicate))
+                    continue
+                by_title_url[(base, url_key)] = len(kept)
+                other = by_url.setdefault(url_key, entry)
+                if other is not entry:
+                    shared.append((entry[0], entry[4], other[4]))
+            kept.append(entry)
+
+        mirrors = {}
+        for entry in kept:
+            base, _ = m3u.split_alt_title(entry[4])
+            if entry[4] is not None and base in touched_titles:
+                position = mirrors.get(base, 0)
+                mirrors[base] = position + 1
+                entry = _relabel(entry, base, position)
+            yield entry
+
+def _removed_record(entry, kept):
+    """Compact report record for an entry dropped as a duplicate of kept."""
+    return (entry[0], entry[4], kept[4], entry[1][-1].strip())
+
+def _expiry_rank(entry):
+    """Sort key for how long an entry's link stays valid; unsigned links never expire."""
+    return float('inf') if entry[2] is None else entry[2]
+
+def _relabel(entry, base, position):
+    """Give an entry the title of the position-th mirror of base (0 = primary)."""
+    title = base if position == 0 else f"{base} - ALT" + (str(position) if position > 1 else "")
+    if title == entry[4]:
+        return entry
+    parsed = m3u.parse_extinf(entry[1][0].strip())
+    parsed.title = title
+    return [entry[0], [parsed.extinf() + '\n'] + entry[1][1:], entry[2], entry[3], title]
+
+def report_dedupe(removed, shared, total=None):
+    """Print every entry dropped as a duplicate, and URLs shared by different titles.
+
+    total is the number of duplicates in the whole output when removed only
+    holds those of the groups rebuilt this time.
+    """
+    if total is None or total == len(removed):
+        print(f"\nDuplicates removed: {len(removed)}")
+    else:
+        print(f"\nDuplicates removed: {total} ({len(removed)} in the groups rebuilt now)")
+    for group_title, title, kept_title, url in removed:
+        print(f"- [{group_title}] {title} duplicates {kept_title}: {url}")
+    if shared:
+        print(f"\nWarning: {len(shared)} URL(s) listed under more than one title (kept):")
+        for group_title, title, other_title in shared:
+            print(f"- [{group_title}] {title} has the same link as {other_title}")
+
+def expiry_status(expires, now, window):
+    """Classify a signed URL as 'expired', 'expiring' (within window seconds) or 'valid'."""
+    if expires is None:
+        return None
+    if expires <= now:
+        return 'expired'
+    if expires <= now + window:
+        return 'expiring'
+    return 'valid'
+
+def apply_expiry(entries, action, now, window, index):
+    """Drop or demote expired/expiring entries in a group-sorted stream.
+
+    Every signed entry seen is appended to index as a compact
+    (expires, status, group_title, title, url) record. 'demote' moves a
+    group's dead entries after its live mirrors, so only one group is ever
+    buffered; 'keep' and 'report' pass everything through.
+    """
+    group = None
+    demoted = []
     for entry in entries:
-        sorted_content.extend(entry)
-    
-    return sorted_content
-
-directory = "m3u"  # Directory containing .m3u files
-output_file = "all.m3u"  # Output file name
-
-print(f"\nStarting script...")
-print(f"Looking for .m3u files in directory: {os.path.abspath(directory)}")
-
-# Check if directory exists
-if not os.path.exists(directory):
-    print(f"Error: Directory '{directory}' does not exist")
-    sys.exit(1)
-
-# Get list of .m3u files, excluding the output file
-m3u_files = [f for f in os.listdir(directory) if f.endswith('.m3u') and f != output_file]
-
-if not m3u_files:
-    print(f"Error: No .m3u files found in directory '{directory}'")
-    sys.exit(1)
-
-print(f"\nFound {len(m3u_files)} .m3u files:")
-for file in m3u_files:
-    print(f"- {file}")
-
-# Collect all content first
-all_content = []
-print("\nReading all files...")
-for idx, filename in enumerate(m3u_files, 1):
-    file_path = os.path.join(directory, filename)
-    print(f"\nProcessing file {idx}/{len(m3u_files)}: {filename}")
-    
+        if entry[0] != group:
+            yield from demoted
+            demoted = []
+            group = entry[0]
+
+        status = expiry_status(entry[2], now, window)
+        if status is not None:
+            index.append((entry[2], status, entry[0], entry[4], entry[1][-1].strip()))
+        if status in ('expired', 'expiring'):
+            if action == 'drop':
+                continue
+            if action == 'demote':
+                demoted.append(entry)
+                continue
+        yield entry
+    yield from demoted
+
+def write_expiry_index(path, index, now, window):
+    """Write the sidecar listing every signed entry by expiry time, one entry per line.
+
+    index holds (expires, status, group_title, title, url) records sorted by
+    expiry; it is read twice, once for the summary and once for the entries.
+    """
+    counts = {status: 0 for status in ('expired', 'expiring', 'valid')}
+    for record in index:
+        counts[record[1]] += 1
+    header = json.dumps({
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now)),
+        'window_hours': window / 3600,
+        'summary': counts,
+    }, ensure_ascii=False)
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+
+    # indent= would switch json to its slow pure-Python encoder, so lay the
+    # entries out one per line by hand
+    def chunks():
+        yield header[:-1] + ', "entries": ['
+        separator = '\n'
+        for expires, status, group_title, title, url in index:
+            yield separator + encode({
+                'expires': expires,
+                'expires_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(expires)),
+                'status': status,
+                'group_title': group_title,
+                'title': title,
+                'url': url,
+            })
+            separator = ',\n'
+        yield '\n]}\n'
+
+    m3u.atomic_write(path, chunks())
+    return counts
+
+def report_expiry(index, action, window):
+    """Print how many signed entries are dead or about to be, listing them for 'report'.
+
+    index holds (expires, status, group_title, title, url) records sorted by expiry.
+    """
+    counts = {status: 0 for status in ('expired', 'expiring', 'valid')}
+    for record in index:
+        counts[record[1]] += 1
+    dead = counts['expired'] + counts['expiring']
+    print(f"\nSigned URLs: {len(index)} total, "
+          f"{counts['expired']} expired, "
+          f"{counts['expiring']} expiring within {window / 3600:g}h"
+          + (f" ({action})" if dead and action in ('drop', 'demote') else ""))
+    if action == 'report':
+        for expires, status, group_title, title, _ in index:
+            if status != 'valid':
+                print(f"- {status}: {time.strftime('%Y-%m-%d %H:%M', time.gmtime(expires))} UTC "
+                      f"[{group_title}] {title}")
+
+def render_groups(entries, action, now, window, index, dedupe=True, removed=None, shared=None):
+    """De-duplicate and apply the expiry policy to a sorted entry stream, one group at a time.
+
+    Yields (group_title, text, signed) per group, where text is the group's
+    playlist lines joined (empty if the policy dropped them all) and signed
+    the records it added to index.
+    """
+    if dedupe:
+        entries = dedupe_entries(entries, removed, shared)
+    for group in iter_groups(entries):
+        signed = []
+        text = ''.join(entry_lines(apply_expiry(group, action, now, window, signed)))
+        index.extend(signed)
+        yield group[0][0], text, signed
+
+def write_groups(output_file, groups, previous=None):
+    """Atomically write (group_title, chunk) pairs after the header; returns the layout.
+
+    A chunk is the group's text, or the (offset, length) span of its bytes
+    in previous, the output being replaced, to copy them as they are. The
+    layout maps each group_title to the [offset, length] of its bytes.
+    """
+    layout = {}
+
+    def chunks():
+        offset = len(m3u.HEADER) + 1
+        yield m3u.HEADER + '\n'
+        source = open(previous, 'rb') if previous else None
+        try:
+            for group_title, chunk in groups:
+                if isinstance(chunk, str):
+                    length = len(chunk) if chunk.isascii() else len(chunk.encode('utf-8'))
+                else:
+                    source.seek(chunk[0])
+                    length = chunk[1]
+                    chunk = source.read(length).decode('utf-8')
+                layout[group_title] = [offset, length]
+                offset += length
+                yield chunk
+        finally:
+            if source is not None:
+                source.close()
+
+    with REGISTRY.timer('combine_stage_seconds', stage='write'):
+        m3u.atomic_write(output_file, chunks())
+    return layout
+
+def write_output(output_file, entries, expiry, dedupe=True, spill_dir=None):
+    """De-duplicate and apply the expiry policy to a sorted entry stream, then atomically write it.
+
+    expiry is (action, window_seconds, index_path or None). The stream is
+    usually a lazy k-way merge, so its merge time is part of the write stage.
+    With spill_dir, the expiry index and dedupe report records go to files
+    there once they outgrow SPILL_LIMIT, so memory stays flat.
+    """
+    action, window, index_path = expiry
+    now = time.time()
+    if spill_dir:
+        index = SpillList(spill_dir, key=_expires_key)
+        removed = SpillList(spill_dir)
+        shared = SpillList(spill_dir)
+    else:
+        index = []
+        removed = []
+        shared = []
+    rendered = render_groups(entries, action, now, window, index, dedupe, removed, shared)
+    write_groups(output_file, ((group_title, text) for group_title, text, _ in rendered))
+    if not spill_dir:
+        index.sort(key=_expires_key)
+    if dedupe:
+        report_dedupe(removed, shared)
+    report_expiry(index, action, window)
+    if index_path:
+        write_expiry_index(index_path, index, now, window)
+        print(f"Expiry index written to {index_path}")
+
+def _expires_key(record):
+    """Sort key of an expiry index record: its expiry time."""
+    return record[0]
+
+class SpillList:
+    """Append-only list that moves its items to run files once it holds `limit`.
+
+    Iterating yields every item, JSON round-tripped (tuples come back as
+    lists), in key order if a key is given, otherwise in append order.
+    Each run is sorted before it is written, so that is a k-way merge.
+    """
+
+    def __init__(self, directory, key=None, limit=None):
+        self.directory = directory
+        self.key = key
+        self.limit = limit or SPILL_LIMIT
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def append(self, item):
+        self.buffer.append(item)
+        self.count += 1
+        if len(self.buffer) >= self.limit:
+            if self.key is not None:
+                self.buffer.sort(key=self.key)
+            run_path = os.path.join(self.directory, f"spill-{id(self):x}-{len(self.runs)}.jsonl")
+            write_run(run_path, self.buffer)
+            self.runs.append(run_path)
+            self.buffer = []
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        runs = [iter_run(run_path) for run_path in self.runs]
+        if self.key is None:
+            return itertools.chain(*runs, self.buffer)
+        return heapq.merge(*runs, sorted(self.buffer, key=self.key), key=self.key)
+
+def write_run(run_path, entries):
+    """Write sorted entries to a run file, one JSON entry record per line."""
+    with open(run_path, "w", encoding='utf-8') as run_file:
+        for entry in entries:
+            run_file.write(json.dumps(entry, ensure_ascii=False))
+            run_file.write('\n')
+
+def iter_run(run_path):
+    """Lazily read entries back from a run file."""
+    with open(run_path, "r", encoding='utf-8') as run_file:
+        for line in run_file:
+            yield json.loads(line)
+
+def stream_combine(directory=DEFAULT_DIRECTORY, output_file=DEFAULT_OUTPUT,
+                   expiry=('keep', 0, None), dedupe=True):
+    """Combine playlists with bounded memory via sorted runs and a k-way merge.
+
+    Each playlist is sorted on its own and spilled to a temporary run file;
+    the runs are then heap-merged straight into output_file, so only one
+    source file plus one buffered entry per run is held in memory. The
+    dedupe report and expiry index records spill next to the runs.
+    """
+    print(f"Looking for .m3u files in directory: {os.path.abspath(directory)}")
+    if not os.path.exists(directory):
+        print(f"Error: Directory '{directory}' does not exist")
+        sys.exit(1)
+
+    m3u_files = sorted(f for f in os.listdir(directory) if f.endswith('.m3u') and f != output_file)
+    if not m3u_files:
+        print(f"Error: No .m3u files found in directory '{directory}'")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory(prefix="m3u-runs-") as run_dir:
+        runs = []
+        print(f"\nSorting {len(m3u_files)} .m3u files into runs...")
+        with profiling.phase('runs'):
+            for idx, filename in enumerate(m3u_files, 1):
+                try:
+                    content, _ = read_playlist(os.path.join(directory, filename))
+                except Exception as e:
+                    print(f"Error processing {filename}: {str(e)}")
+                    continue
+                if not content:
+                    print(f"Warning: {filename} is empty or contains only empty lines")
+                    continue
+                run_path = os.path.join(run_dir, f"run-{idx}.jsonl")
+                skipped = []
+                write_run(run_path, parse_file_entries(content, skipped))
+                report_skipped(filename, skipped)
+                runs.append(run_path)
+
+        with profiling.phase('merge'):
+            # Too many runs to hold open at once: merge neighbours until they fit
+            generation = 0
+            while len(runs) > MAX_OPEN_RUNS:
+                generation += 1
+                merged = []
+                for i in range(0, len(runs), MAX_OPEN_RUNS):
+                    batch = runs[i:i + MAX_OPEN_RUNS]
+                    run_path = os.path.join(run_dir, f"merge-{generation}-{i}.jsonl")
+                    with REGISTRY.timer('combine_stage_seconds', stage='sort'):
+                        write_run(run_path, merge_entries([iter_run(p) for p in batch]))
+                    merged.append(run_path)
+                runs = merged
+
+            print(f"\nMerging {len(runs)} runs into {output_file}")
+            try:
+                write_output(output_file, merge_entries([iter_run(p) for p in runs]), expiry, dedupe, run_dir)
+                verify_output(output_file)
+            except Exception as e:
+                print(f"Error writing to output file: {str(e)}")
+                sys.exit(1)
+
+def load_manifest(manifest_path):
+    """Load the incremental-build manifest, or an empty one if missing or stale."""
     try:
-        with open(file_path, "r", encoding='utf-8') as infile:
-            # Read all lines and filter out empty ones and #EXTM3U
-            content = [line.strip() + '\n' for line in infile.readlines() 
-                      if line.strip() and line.strip() != "#EXTM3U"]
+        with open(manifest_path, "r", encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+def save_manifest(manifest_path, manifest):
+    """Atomically write the manifest."""
+    m3u.atomic_write(manifest_path, [json.dumps(manifest, separators=(',', ':'), ensure_ascii=False)])
+
+def scan_library(directory, output_file, manifest):
+    """Stat every playlist and re-parse only files that changed since the manifest.
+
+    Returns (files, changes, parsed) where files maps filename -> manifest
+    record (mtime, size, sha256 and the group-titles it has entries in),
+    changes lists added/changed/removed files and counts unchanged ones,
+    and parsed maps the files read this time to their entries.
+    """
+    old_files = manifest.get('files', {})
+    files = {}
+    parsed = {}
+    changes = {'added': [], 'changed': [], 'removed': [], 'unchanged': 0}
+
+    m3u_files = sorted(f for f in os.listdir(directory) if f.endswith('.m3u') and f != output_file)
+    for idx, filename in enumerate(m3u_files, 1):
+        file_path = os.path.join(directory, filename)
+        try:
+            stat = os.stat(file_path)
+            old = old_files.get(filename)
+            if old and old['mtime'] == stat.st_mtime and old['size'] == stat.st_size:
+                files[filename] = old
+                changes['unchanged'] += 1
+                continue
+
+            print(f"\nProcessing file {idx}/{len(m3u_files)}: {filename}")
+            content, digest = read_playlist(file_path)
             print(f"Read {len(content)} non-empty lines from {filename}")
-            
-            if content:
-                all_content.extend(content)
-            else:
+            if not content:
                 print(f"Warning: {filename} is empty or contains only empty lines")
-                
-    except Exception as e:
-        print(f"Error processing {filename}: {str(e)}")
-        continue
-
-# Sort all content
-print("\nSorting playlist entries...")
-sorted_content = sort_playlist_entries(all_content)
-
-# Write sorted content to output file
-print(f"\nWriting sorted content to {output_file}")
-try:
-    with open(output_file, "w", encoding='utf-8') as outfile:
-        # Write header
-        outfile.write("#EXTM3U\n")
-        
-        # Write sorted content
-        for line in sorted_content:
-            outfile.write(line)
-    
-    # Verify the output file
+
+            if old and old['sha256'] == digest:
+                # Touched but identical: its groups are what they were
+                groups = old['groups']
+                changes['unchanged'] += 1
+            else:
+                skipped = []
+                parsed[filename] = parse_file_entries(content, skipped)
+                report_skipped(filename, skipped)
+                groups = list(dict.fromkeys(entry[0] for entry in parsed[filename]))
+                changes['changed' if old else 'added'].append(filename)
+
+            files[filename] = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'sha256': digest,
+                'groups': groups,
+            }
+        except Exception as e:
+            print(f"Error processing {filename}: {str(e)}")
+            continue
+
+    changes['removed'] = sorted(set(old_files) - set(files))
+    return files, changes, parsed
+
+def previous_layout(manifest, output_file, dedupe, action, window):
+    """The group layout of the last build, or None if output_file can't be patched.
+
+    It can't when the build used other settings, or when the output was
+    changed or removed since.
+    """
+    if (manifest.get('output') != output_file or manifest.get('dedupe') != dedupe
+            or manifest.get('expired') != action or manifest.get('window') != window):
+        return None
+    try:
+        stat = os.stat(output_file)
+    except OSError:
+        return None
+    groups = manifest.get('groups')
+    if groups is None or [stat.st_size, stat.st_mtime] != manifest.get('output_stat'):
+        return None
+    # Spans are only valid if the file holds exactly the bytes written, e.g. no \r\n translation
+    if len(m3u.HEADER) + 1 + sum(record[1] for record in groups.values()) != stat.st_size:
+        return None
+    return groups
+
+def dirty_groups(manifest, files, changes, layout, action, window, now):
+    """Group-titles whose output has to be rebuilt since the build in manifest.
+
+    Those are the groups changed files had entries in before or have now,
+    and for 'drop'/'demote' the groups where a signed link has expired (or
+    come inside the window) since that build.
+    """
+    old_files = manifest['files']
+    dirty = set()
+    for filename in changes['changed'] + changes['removed']:
+        dirty.update(old_files[filename]['groups'])
+    for filename in changes['added'] + changes['changed']:
+        dirty.update(files[filename]['groups'])
+    if action in ('drop', 'demote'):
+        built = manifest['built']
+        for group_title, (_, _, _, signed) in layout.items():
+            if any(built + window < expires <= now + window for expires, _, _ in signed):
+                dirty.add(group_title)
+    return dirty
+
+def verify_output(output_file):
+    """Print the output size and first few lines as a sanity check."""
     output_size = os.path.getsize(output_file)
     print(f"\nOutput file size: {output_size} bytes")
-    
+
     if output_size <= 8:  # "#EXTM3U\n" is 8 bytes
         print("Warning: Output file appears to be empty (contains only header)")
     else:
         # Read and print the first few lines of the output file to verify content
         print("\nVerifying output file content:")
         with open(output_file, "r", encoding='utf-8') as f:
-            first_few_lines = [next(f) for _ in range(min(10, len(sorted_content) + 1))]
+            first_few_lines = [line for _, line in zip(range(10), f)]
             print("First few lines of output file:")
             for line in first_few_lines:
                 print(f"> {line.strip()}")
-    
-except Exception as e:
-    print(f"Error writing to output file: {str(e)}")
-    sys.exit(1)
 
-print("\nScript completed!")
+def combine(directory=DEFAULT_DIRECTORY, output_file=DEFAULT_OUTPUT,
+            manifest_path=DEFAULT_MANIFEST, full=False, expiry=('keep', 0, None), dedupe=True):
+    """Rebuild output_file from the playlists in directory, incrementally by default.
+
+    The manifest keeps each playlist's group-titles and where each group
+    sits in output_file, so a run only re-parses the files sharing a group
+    with a changed file, renders those groups and copies the rest of the
+    previous output as it is.
+    """
+    print(f"Looking for .m3u files in directory: {os.path.abspath(directory)}")
+
+    # Check if directory exists
+    if not os.path.exists(directory):
+        print(f"Error: Directory '{directory}' does not exist")
+        sys.exit(1)
+
+    action, window, index_path = expiry
+    now = time.time()
+    with profiling.phase('scan'):
+        manifest = {'version': MANIFEST_VERSION, 'files': {}} if full else load_manifest(manifest_path)
+        files, changes, parsed = scan_library(directory, output_file, manifest)
+
+    if not files:
+        print(f"Error: No .m3u files found in directory '{directory}'")
+        sys.exit(1)
+
+    print(f"\nFound {len(files)} .m3u files: "
+          f"{len(changes['added'])} added, {len(changes['changed'])} changed, "
+          f"{len(changes['removed'])} removed, {changes['unchanged']} unchanged")
+    for label in ('added', 'changed', 'removed'):
+        for filename in changes[label]:
+            print(f"- {label}: {filename}")
+
+    layout = previous_layout(manifest, output_file, dedupe, action, window)
+    rebuild = layout is None
+    if rebuild:
+        layout = {}
+        dirty = {group_title for record in files.values() for group_title in record['groups']}
+    else:
+        dirty = dirty_groups(manifest, files, changes, layout, action, window, now)
+
+    removed = []
+    shared = []
+    if not dirty and not rebuild:
+        print(f"\n{output_file} is up to date")
+        groups = layout
+    else:
+        # Every file with an entry in a dirty group has to be read
+        sources = [name for name in sorted(files) if dirty.intersection(files[name]['groups'])]
+        print(f"\nWriting sorted content to {output_file} "
+              f"({len(dirty)} group(s) from {len(sources)} file(s) rebuilt)")
+        with profiling.phase('write'):
+            per_file_entries = []
+            for name in sources:
+                if name not in parsed:
+                    content, _ = read_playlist(os.path.join(directory, name))
+                    parsed[name] = parse_file_entries(content)
+                if rebuild:
+                    per_file_entries.append(parsed[name])
+                else:
+                    per_file_entries.append([entry for entry in parsed[name] if entry[0] in dirty])
+
+            signed = {}
+
+            def fresh():
+                for group_title, text, records in render_groups(merge_entries(per_file_entries), action,
+                                                                now, window, [], dedupe, removed, shared):
+                    signed[group_title] = records
+                    yield group_title, text
+
+            kept = ((group_title, tuple(layout[group_title][:2]))
+                    for group_title in sorted(set(layout) - dirty))
+            try:
+                spans = write_groups(output_file, heapq.merge(kept, fresh(), key=lambda pair: pair[0]),
+                                     output_file if layout else None)
+                verify_output(output_file)
+            except Exception as e:
+                print(f"Error writing to output file: {str(e)}")
+                sys.exit(1)
+
+        duplicates = {}
+        for group_title, _, _, _ in removed:
+            duplicates[group_title] = duplicates.get(group_title, 0) + 1
+        groups = {}
+        for group_title, span in spans.items():
+            if group_title in signed:
+                groups[group_title] = span + [duplicates.get(group_title, 0),
+                                              [[expires, title, url] for expires, _, _, title, url
+                                               in signed[group_title]]]
+            else:
+                groups[group_title] = span + layout[group_title][2:]
+
+    if dedupe:
+        report_dedupe(removed, shared, sum(record[2] for record in groups.values()))
+    with profiling.phase('expiry'):
+        index = [(expires, expiry_status(expires, now, window), group_title, title, url)
+                 for group_title, record in groups.items() for expires, title, url in record[3]]
+        index.sort(key=_expires_key)
+        report_expiry(index, action, window)
+        if index_path:
+            write_expiry_index(index_path, index, now, window)
+            print(f"Expiry index written to {index_path}")
+
+    stat = os.stat(output_file)
+    save_manifest(manifest_path, {
+        'version': MANIFEST_VERSION,
+        'output': output_file,
+        'output_stat': [stat.st_size, stat.st_mtime],
+        'dedupe': dedupe,
+        'expired': action,
+        'window': window,
+        # Groups left alone had no link expire since the last build, so all are as of now
+        'built': now,
+        'files': files,
+        # group-title -> [offset, length, duplicates removed, [[expires, title, url], ...]]
+        'groups': groups,
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine all playlists in a directory into one sorted M3U file.")
+    parser.add_argument('--dir', default=DEFAULT_DIRECTORY, help="directory containing .m3u files")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="combined playlist to write")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help="incremental build manifest")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--full', action='store_true', help="ignore the manifest and re-parse every file")
+    mode.add_argument('--stream', action='store_true',
+                      help="bounded-memory k-way merge of per-file sorted runs (no manifest)")
+    parser.add_argument('--expired', choices=EXPIRY_ACTIONS, default='keep',
+                        help="what to do with signed URLs past their Expires= time (or inside --expiry-window)")
+    parser.add_argument('--expiry-window', type=float, default=0, metavar='HOURS',
+                        help="treat signed URLs expiring within this many hours as expired")
+    parser.add_argument('--expiry-index', metavar='PATH',
+                        help="sidecar listing signed entries by expiry (default: <output>.expiry.json)")
+    parser.add_argument('--no-expiry-index', action='store_true', help="don't write the expiry sidecar")
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help="keep duplicate mirrors (same group-title and normalized URL)")
+    metrics.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    index_path = None if args.no_expiry_index else (
+        args.expiry_index or os.path.splitext(args.output)[0] + '.expiry.json'
+    )
+    expiry = (args.expired, args.expiry_window * 3600, index_path)
+
+    print("\nStarting script...")
+    profiling.start(args, os.path.splitext(args.output)[0] + '.profile')
+    try:
+        if args.stream:
+            stream_combine(args.dir, args.output, expiry, not args.no_dedupe)
+        else:
+            combine(args.dir, args.output, args.manifest, args.full, expiry, not args.no_dedupe)
+    finally:
+        profiling.finish()
+        metrics.emit(args)
+    print("\nScript completed!")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 import os
 from typing import Optional
-from dotenv import load_dotenv
-load_dotenv()  # Load environment variables from .env file
+
+_env_loaded = False
+
+def load_env() -> None:
+    """Load variables from a .env file once, the first time a key is needed"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()  # Load environment variables from .env file
+        _env_loaded = True
 
 class APIConfig:
     @staticmethod
     def get_key(key_name: str) -> Optional[str]:
+        load_env()
         value = os.environ.get(key_name, '').strip()
         if not value:
             raise ValueError(f"No API key found. {key_name} must be set in environment")
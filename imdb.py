@@ -1,8 +1,37 @@
-import requests
-from bs4 import BeautifulSoup
+import os
 import re
+import sys
+import json
+import html
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
+import requests
+
+import m3u
+import profiling
+from cache_store import SQLiteCache, make_cache_key
+
+# Point at a local server (e.g. saved HTML fixtures) with IMDB_BASE_URL or --base-url
+IMDB_BASE_URL = os.environ.get('IMDB_BASE_URL', 'https://www.imdb.com').rstrip('/')
+IMDB_CACHE = os.path.join(".cache", "imdb_cache.sqlite3")
+IMDB_CACHE_TTL = 7 * 24 * 60 * 60  # search results and trailer links barely change
+DEFAULT_WORKERS = 8
+
+# Search results: each item carries this class; the title anchor and year live inside it.
+# Classes are matched as whole tokens anywhere in the class attribute, in any attribute order.
+CLASS_TOKEN = r'''class\s*=\s*["'](?:[^"']*\s)?{}(?=["'\s])'''
+RESULT_ITEM_RE = re.compile(CLASS_TOKEN.format('ipc-metadata-list-summary-item'))
+RESULT_ANCHOR_RE = re.compile(r'<a\s([^>]*' + CLASS_TOKEN.format('ipc-metadata-list-summary-item__t') + r'[^>]*)>(.*?)</a>', re.S)
+RESULT_YEAR_RE = re.compile(CLASS_TOKEN.format('ipc-metadata-list-summary-item__li') + r'[^>]*>([^<]*)<')
+HREF_RE = re.compile(r'''href\s*=\s*["']([^"']+)["']''')
+TAG_RE = re.compile(r'<[^>]+>')
+# First trailer/video linked from a title page
+VIDEO_RE = re.compile(r'/video/(vi\d+)')
+M3U8_RE = re.compile(r'https?://[^"\s]+\.m3u8(?:\?[^"\s]+)?')
+QUALITY_RE = re.compile(r'(\d+)p')
+
 def get_best_user_agent():
     """Returns a random user agent from a predefined list."""
     user_agents = [
@@ -12,59 +41,159 @@ def get_best_user_agent():
     ]
     return user_agents[0]
 
+class IMDbClient:
+    """Pooled IMDb fetcher whose extracted results are cached on disk.
+
+    Only the small extracted values (result lists, trailer links) are
+    cached, keyed by kind and URL, so re-runs skip the page downloads.
+    """
+
+    def __init__(self, base_url=IMDB_BASE_URL, cache_path=IMDB_CACHE,
+                 workers=DEFAULT_WORKERS, timeout=15):
+        self.base_url = base_url.rstrip('/')
+        self.workers = workers
+        self.timeout = timeout
+        self.cache = SQLiteCache(cache_path, default_ttl=IMDB_CACHE_TTL, endpoint_ttls={}) if cache_path else None
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': get_best_user_agent(),
+            'Accept-Language': 'en-US,en;q=0.9'
+        })
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(1, workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _cached(self, kind, url, extract, headers=None):
+        """Return extract(page text) for url, from the cache when possible"""
+        key = make_cache_key(kind, {'url': url})
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached['value']
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        value = extract(response.text)
+        # Misses aren't cached, so a page that gains a trailer is picked up next run
+        if self.cache and value:
+            self.cache.set(key, kind, {'value': value})
+        return value
+
+    def search(self, search_term, limit=3):
+        """Search IMDb and return the top results (title, year, type and URL)."""
+        search_url = f"{self.base_url}/find?q={quote(search_term)}&s=tt&ttype=ft,tv,vg"
+        return self._cached('imdb:find', search_url, lambda text: parse_search_results(text, self.base_url))[:limit]
+
+    def trailer_page(self, title_url):
+        """Return the URL of the first video linked from a title page, or None."""
+        def extract(text):
+            match = VIDEO_RE.search(text)
+            return f"{self.base_url}/video/{match.group(1)}/" if match else None
+        return self._cached('imdb:title', title_url, extract)
+
+    def m3u_playlist(self, trailer_url):
+        """Return the best-quality M3U playlist link on a trailer page, or None."""
+        return self._cached('imdb:video', trailer_url, best_m3u_link, headers={'Referer': trailer_url})
+
+    def resolve(self, item):
+        """Run one title or trailer URL through the pipeline.
+
+        Titles go search -> first result -> its first video; URLs are
+        treated as trailer pages. Errors are reported in the result.
+        """
+        result = {'input': item, 'title_url': None, 'trailer_url': None, 'm3u8': None, 'error': None}
+        try:
+            if item.startswith(('http://', 'https://')):
+                result['trailer_url'] = item
+            else:
+                matches = self.search(item, limit=1)
+                if not matches:
+                    result['error'] = "no search results"
+                    return result
+                result['title_url'] = matches[0]['url']
+                result['trailer_url'] = self.trailer_page(result['title_url'])
+                if not result['trailer_url']:
+                    result['error'] = "no trailer on title page"
+                    return result
+            result['m3u8'] = self.m3u_playlist(result['trailer_url'])
+            if not result['m3u8']:
+                result['error'] = "no M3U playlist on trailer page"
+        except requests.exceptions.RequestException as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        return result
+
+    def resolve_many(self, items):
+        """Resolve titles/trailer URLs concurrently, returning results in order."""
+        items = list(items)
+        if not items:
+            return []
+        if self.workers == 1:
+            return [self.resolve(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as executor:
+            return list(executor.map(self.resolve, items))
+
+def parse_search_results(text, base_url=IMDB_BASE_URL):
+    """Extract (title, year, type, url) dicts from a search page with regexes."""
+    starts = [match.start() for match in RESULT_ITEM_RE.finditer(text)]
+    results = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        item = text[start:end]
+        anchor = RESULT_ANCHOR_RE.search(item)
+        href = HREF_RE.search(anchor.group(1)) if anchor else None
+        if not href:
+            continue
+        year = RESULT_YEAR_RE.search(item)
+        results.append({
+            'title': html.unescape(TAG_RE.sub('', anchor.group(2))).strip(),
+            'year': html.unescape(year.group(1)).strip() if year else "Unknown",
+            # Determine if it's a movie or TV series
+            'type': "TV Series" if "TV Series" in item else "Movie",
+            'url': base_url + href.group(1).split('?')[0],
+        })
+    return results
+
+def best_m3u_link(text):
+    """Return the highest-resolution .m3u8 link in a page, or None."""
+    def quality(link):
+        match = QUALITY_RE.search(link)
+        return int(match.group(1)) if match else 0
+    m3u_links = M3U8_RE.findall(text)
+    # Highest resolution wins; ties keep page order
+    return max(m3u_links, key=quality) if m3u_links else None
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+_client = None
+
+def get_client():
+    """Return the shared IMDb client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = IMDbClient()
+    return _client
+
 def search_imdb():
     """Searches IMDb for a movie/series and returns a list of top results (title, year, type, and URL)."""
     search_term = input("Enter movie/series name: ").strip()
-    encoded_query = quote(search_term)
-    best_ua = get_best_user_agent()
-    
-    headers = {
-        'User-Agent': best_ua,
-        'Accept-Language': 'en-US,en;q=0.9'
-    }
-    
-    search_url = f"https://www.imdb.com/find?q={encoded_query}&s=tt&ttype=ft,tv,vg"
-    
+
     try:
-        response = requests.get(search_url, headers=headers, timeout=15)
-        response.raise_for_status()
+        results = get_client().search(search_term)
     except requests.exceptions.RequestException as e:
         print(f"🚨 Connection Error: {e}")
         return None
-    
-    soup = BeautifulSoup(response.text, 'html.parser')
-    results = []
-    
-    # Extract the top 3 results
-    for item in soup.select('.ipc-metadata-list-summary-item')[:3]:
-        try:
-            title_element = item.select_one('a.ipc-metadata-list-summary-item__t')
-            title = title_element.text.strip()
-            
-            movie_url = "https://www.imdb.com" + title_element['href'].split('?')[0]
-            
-            # Determine if it's a movie or TV series
-            media_type = "Movie"
-            if "TV Series" in item.get_text():
-                media_type = "TV Series"
-            
-            # Extract the year
-            year_elem = item.find('span', class_='ipc-metadata-list-summary-item__li')
-            year = year_elem.text.strip() if year_elem else "Unknown"
-            
-            results.append({'title': title, 'year': year, 'type': media_type, 'url': movie_url})
-        except Exception as e:
-            print(f"Error processing result: {e}")
-            continue
-    
+
     if not results:
         print("No results found!")
         return None
-    
+
     print("\nTop Results:")
     for idx, result in enumerate(results, 1):
         print(f"{idx}. {result['title']} ({result['year']}) - {result['type']} - {result['url']}")
-    
+
     # Prompt user to choose one manually
     while True:
         choice = input("\nSelect a movie/series (enter number 1-3): ").strip()
@@ -76,28 +205,11 @@ def extract_m3u_playlist(trailer_url):
     """
     Loads the IMDb trailer page and extracts the M3U playlist link with the best quality.
     """
-    best_ua = get_best_user_agent()
-    headers = {
-        'User-Agent': best_ua,
-        'Referer': trailer_url,
-        'Accept-Language': 'en-US,en;q=0.9'
-    }
-    
     try:
-        response = requests.get(trailer_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Look for M3U playlist links
-        m3u_links = re.findall(r'https?://[^"\s]+\.m3u8(?:\?[^"\s]+)?', response.text)
-        if m3u_links:
-            # Sort by quality (higher resolution first)
-            m3u_links.sort(key=lambda x: int(re.search(r'(\d+)p', x).group(1)) if re.search(r'(\d+)p', x) else 0, reverse=True)
-            best_m3u = m3u_links[0]
-            return best_m3u
+        return get_client().m3u_playlist(trailer_url)
     except requests.exceptions.RequestException as e:
         print(f"❌ Error fetching M3U playlist: {e}")
-    
+
     return None
 
 def exit_prompt():
@@ -113,17 +225,18 @@ def exit_prompt():
         else:
             print("Invalid input. Please enter 'yes' or 'no'.")
 
-if __name__ == "__main__":
+def interactive():
+    """Search, pick a title and extract a trailer playlist until the user exits."""
     while True:
         # Step 1: Search IMDb for a movie/series
         movie_url = search_imdb()
         if not movie_url:
             print("Failed to retrieve movie/series URL. Exiting...")
             break
-        
+
         print("\nSelected Movie/Series URL:")
         print(movie_url)
-        
+
         # Step 2: Extract M3U playlist
         trailer_url = input("\nEnter the IMDb trailer page URL: ").strip()
         m3u_playlist = extract_m3u_playlist(trailer_url)
@@ -132,18 +245,57 @@ if __name__ == "__main__":
             print(m3u_playlist)
         else:
             print("❌ No M3U playlist found on the trailer page.")
-        
+
         # Step 3: Exit prompt
         if exit_prompt():
             break
 
+def run(items, json_path=None):
+    """Resolve items in batch (or prompt when there are none) and report the results"""
+    if not items:
+        with profiling.phase('interactive'):
+            interactive()
+        return
 
+    with profiling.phase('resolve'):
+        results = _client.resolve_many(items)
+    with profiling.phase('report'):
+        for result in results:
+            if result['m3u8']:
+                print(f"✓ {result['input']}: {result['m3u8']}")
+            else:
+                print(f"✗ {result['input']}: {result['error']}")
+        found = sum(1 for result in results if result['m3u8'])
+        print(f"\n{found}/{len(results)} trailer playlists found")
+        if json_path:
+            m3u.atomic_write(json_path, [json.dumps(results, indent=2, ensure_ascii=False)])
+    if found < len(results):
+        sys.exit(1)
 
+def main():
+    global _client
+    parser = argparse.ArgumentParser(description="Find IMDb trailer M3U playlists, interactively or in batch.")
+    parser.add_argument('items', nargs='*', help="titles or trailer page URLs (interactive prompt if none)")
+    parser.add_argument('--file', help="read titles/URLs from this file, one per line")
+    parser.add_argument('--workers', type=positive_int, default=DEFAULT_WORKERS, help="concurrent page fetches")
+    parser.add_argument('--base-url', default=IMDB_BASE_URL, help="IMDb base URL (e.g. a local fixture server)")
+    parser.add_argument('--cache', default=IMDB_CACHE, help="on-disk cache ('' to disable)")
+    parser.add_argument('--json', dest='json_path', help="also write the batch results as JSON")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
 
+    _client = IMDbClient(args.base_url, args.cache, args.workers)
 
+    items = list(args.items)
+    if args.file:
+        with open(args.file, "r", encoding='utf-8') as f:
+            items.extend(line.strip() for line in f if line.strip())
 
+    profiling.start(args, os.path.splitext(args.json_path)[0] + '.profile' if args.json_path else 'imdb.profile')
+    try:
+        run(items, args.json_path)
+    finally:
+        profiling.finish()
 
-
-
-
-
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,52 @@
-from api_utils import TMDBClient
-from config import APIConfig
+import argparse
+import threading
+import metrics
+import profiling
+from title_index import TitleIndex, pick_exact, record_match
 
-# Initialize config and client
-config = APIConfig()
-tmdb_client = TMDBClient(config.tmdb_key)
+tmdb_client = None
+title_index = TitleIndex()
+_client_lock = threading.Lock()
 
-def search_movie_or_series(query):
-    """Search for a movie or series by name."""
-    results = tmdb_client.search_multi(query)
-    
-    if results and 'results' in results:
-        for result in results['results']:
+def get_tmdb_client():
+    """Return the TMDB client, creating it (and checking the API key) on first use."""
+    global tmdb_client
+    if tmdb_client is None:
+        # Worker threads may get here first; they must all share one client,
+        # or the rate limit and request coalescing stop being shared
+        with _client_lock:
+            if tmdb_client is None:
+                from api_utils import TMDBClient
+                from config import APIConfig
+                tmdb_client = TMDBClient(APIConfig().tmdb_key)
+    return tmdb_client
+
+# Sub-resources that come back with the details in the same request
+DETAILS_APPEND = ('watch/providers',)
+EXTRA_APPEND = ('credits', 'videos')
+
+def search_results(response):
+    """Return the results of a search response, each given a 'year'."""
+    if response and 'results' in response:
+        for result in response['results']:
             year = result.get('release_date', result.get('first_air_date', 'Unknown'))[:4]
             result['year'] = year
-        return results['results']
+        return response['results']
     return None
 
-def get_detailed_info(media_type, media_id):
-    """Get detailed information about a movie or series."""
-    return tmdb_client.get_details(media_type, media_id)
+def search_movie_or_series(query):
+    """Search for a movie or series by name."""
+    return search_results(get_tmdb_client().search_multi(query))
 
-def get_streaming_platforms(media_type, media_id):
-    """Get streaming platforms for a movie or series."""
-    providers = tmdb_client.get_watch_providers(media_type, media_id)
+def get_detailed_info(media_type, media_id, extras=False):
+    """Get details and watch providers (plus credits and videos with extras) in one request."""
+    append = DETAILS_APPEND + (EXTRA_APPEND if extras else ())
+    return get_tmdb_client().get_details(media_type, media_id, append)
+
+def get_streaming_platforms(media_type, media_id, providers=None):
+    """Get streaming platforms for a movie or series, reusing appended providers if given."""
+    if providers is None:
+        providers = get_tmdb_client().get_watch_providers(media_type, media_id)
     
     if providers and 'results' in providers:
         us_providers = providers['results'].get('US', {}).get('flatrate', [])
@@ -47,8 +71,8 @@ def format_and_display_info(data, media_type):
     # Determine type: Movie or Series
     type_label = "🎥 Movie" if media_type == "movie" else "🎥 Series"
 
-    # Get streaming platforms
-    streaming_platforms = get_streaming_platforms(media_type, data.get('id'))
+    # Get streaming platforms (already appended to the details)
+    streaming_platforms = get_streaming_platforms(media_type, data.get('id'), data.get('watch/providers'))
 
     # Formatted output
     print(f"{type_label}\n")
@@ -59,8 +83,99 @@ def format_and_display_info(data, media_type):
     print(f"¤ Streaming On: {streaming_platforms}")
     print(f"¤ NFO: {movie_link}")
 
-def main():
+    # Only present when fetched with extras
+    if 'credits' in data:
+        cast = [person['name'] for person in data['credits'].get('cast', [])[:5]]
+        print(f"¤ Cast: {', '.join(cast) if cast else 'Not available'}")
+    if 'videos' in data:
+        trailers = [video for video in data['videos'].get('results', [])
+                    if video.get('site') == 'YouTube' and video.get('type') == 'Trailer']
+        trailer = f"https://www.youtube.com/watch?v={trailers[0]['key']}" if trailers else "Not available"
+        print(f"¤ Trailer: {trailer}")
+
+def pick_result(query, results):
+    """Pick (media_type, id) from search results, recording an exact match in the index."""
+    results = [result for result in (results or []) if result.get('media_type') in ('movie', 'tv')]
+    if not results:
+        return None
+    best, _ = pick_exact(results, query)
+    if best is None:
+        # TMDB's top hit answers this run only; a guess is never written to the index
+        best = results[0]
+    else:
+        record_match(title_index, query, best['media_type'], best,
+                     [result for result in results if result['media_type'] == best['media_type']])
+    return best['media_type'], best['id']
+
+def resolve_title(query):
+    """Resolve a title to (media_type, id) via the index or the best search match."""
+    indexed = title_index.lookup(query)
+    if indexed:
+        return indexed['media_type'], indexed['id']
+    return pick_result(query, search_movie_or_series(query))
+
+def lookup_title(query, extras=False):
+    """Resolve a title and fetch its details; returns (details, media_type) or None."""
+    resolved = resolve_title(query)
+    if not resolved:
+        return None
+    media_type, media_id = resolved
+    details = get_detailed_info(media_type, media_id, extras)
+    return (details, media_type) if details else None
+
+async def lookup_title_async(client, query, extras=False):
+    """lookup_title() on an AsyncTMDBClient."""
+    indexed = title_index.lookup(query)
+    if indexed:
+        resolved = indexed['media_type'], indexed['id']
+    else:
+        resolved = pick_result(query, search_results(await client.search_multi(query)))
+    if not resolved:
+        return None
+    media_type, media_id = resolved
+    details = await client.get_details(media_type, media_id, DETAILS_APPEND + (EXTRA_APPEND if extras else ()))
+    return (details, media_type) if details else None
+
+def lookup_many_async(titles, extras=False, workers=None):
+    """Look many titles up on one event loop (needs aiohttp); results in the given order."""
+    import asyncio
+    from async_api_utils import run_with_client
+    from config import APIConfig
+
+    async def lookup_all(client):
+        return await asyncio.gather(*(lookup_title_async(client, title, extras) for title in titles))
+    options = {'max_concurrency': workers} if workers else {}
+    return run_with_client(APIConfig().tmdb_key, lookup_all, **options)
+
+def show_many(titles, extras=False, workers=None, use_async=False):
+    """Look up many titles concurrently and print their info in the given order."""
+    with profiling.phase('lookup'):
+        if use_async:
+            results = lookup_many_async(titles, extras, workers)
+        else:
+            results = get_tmdb_client().map(lambda title: lookup_title(title, extras), titles, workers)
+        title_index.save()
+    with profiling.phase('display'):
+        for title, result in zip(titles, results):
+            print(f"\n=== {title} ===")
+            if result:
+                format_and_display_info(*result)
+            else:
+                print("Not found.")
+
+def interactive(extras=False):
+    """Prompt for a title, let the user pick a match and print its info."""
     query = input("Enter the name of a movie or series: ").strip()
+
+    # Titles resolved before skip the search
+    indexed = title_index.lookup(query)
+    if indexed:
+        print(f"Using indexed match: {indexed['title']} ({indexed['year']}) ({indexed['media_type']})")
+        details = get_detailed_info(indexed['media_type'], indexed['id'], extras)
+        if details:
+            format_and_display_info(details, indexed['media_type'])
+        return
+
     search_results = search_movie_or_series(query)
     if search_results:
         print("Select the exact match from the list below:")
@@ -72,11 +187,42 @@ def main():
             selected_result = search_results[selection]
             media_type = selected_result.get('media_type', 'movie')
             media_id = selected_result.get('id')
-            details = get_detailed_info(media_type, media_id)
+            if media_type in ('movie', 'tv'):
+                title_index.record(query, media_type, selected_result)
+                title_index.save()
+            details = get_detailed_info(media_type, media_id, extras)
             if details:
                 format_and_display_info(details, media_type)
         else:
             print("Invalid selection.")
 
+def main():
+    parser = argparse.ArgumentParser(description="Show details and streaming platforms for movies and series.")
+    parser.add_argument('titles', nargs='*', help="titles to look up (interactive prompt if none)")
+    parser.add_argument('--file', help="read titles from this file, one per line")
+    parser.add_argument('--extras', action='store_true', help="also fetch cast and trailer")
+    parser.add_argument('--workers', type=int, help="concurrent lookups in bulk mode")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="run bulk lookups on one event loop instead of threads (needs aiohttp)")
+    metrics.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    titles = list(args.titles)
+    if args.file:
+        with open(args.file, "r", encoding='utf-8') as f:
+            titles.extend(line.strip() for line in f if line.strip())
+
+    profiling.start(args, 'info.profile')
+    try:
+        if titles:
+            show_many(titles, args.extras, args.workers, args.use_async)
+        else:
+            with profiling.phase('interactive'):
+                interactive(args.extras)
+    finally:
+        profiling.finish()
+        metrics.emit(args)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+
+import m3u
+
+DEFAULT_CACHE = ".linkcheck_cache.json"  # url -> last result
+DEFAULT_TTL_HOURS = 6
+DEFAULT_WORKERS = 32
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 10
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# HEAD answers that only mean "try a GET instead"
+HEAD_UNSUPPORTED = {400, 403, 405, 501}
+
+
+def url_host(url):
+    """Lower-cased host[:port] of a URL, or '' when it is too malformed to split"""
+    try:
+        return urlsplit(url).netloc.lower()
+    except ValueError:
+        return ''
+
+
+class LinkChecker:
+    """Probe playlist URLs concurrently with a global cap and per-host limits.
+
+    Every worker shares one pooled session. URLs are queued per host and
+    each host gets at most per_host lanes draining its queue, so no worker
+    ever sits waiting on a busy host while other hosts have work. Results
+    are cached on disk so links verified within the TTL are skipped on the
+    next run.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, cache_path=DEFAULT_CACHE,
+                 ttl_hours=DEFAULT_TTL_HOURS):
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.ttl = ttl_hours * 3600
+        self.cache = self._load_cache()
+        self.session = self._create_session()
+
+    def _create_session(self):
+        """Create a session whose pool can hold every worker's connection"""
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=64,
+            pool_maxsize=max(self.workers, self.per_host),
+            max_retries=0,
+            pool_block=False
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _load_cache(self):
+        """Load cached results, ignoring a missing or corrupt cache file"""
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self):
+        """Atomically persist cached results, dropping entries past the TTL"""
+        if not self.cache_path:
+            return
+        now = time.time()
+        fresh = {url: result for url, result in self.cache.items()
+                 if now - result['checked'] < self.ttl}
+        m3u.atomic_write(self.cache_path, [json.dumps(fresh, separators=(',', ':'))])
+
+    def probe(self, url):
+        """Check one URL with HEAD, falling back to a one-byte ranged GET"""
+        start = time.perf_counter()
+        result = {'url': url, 'ok': False, 'status': None, 'error': None}
+        try:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            status = response.status_code
+            if status in HEAD_UNSUPPORTED:
+                response = self.session.get(
+                    url, headers={'Range': 'bytes=0-0'}, timeout=self.timeout,
+                    allow_redirects=True, stream=True
+                )
+                status = response.status_code
+                response.close()
+            result['status'] = status
+            # 416 still proves the resource exists
+            result['ok'] = status < 400 or status == 416
+        except Exception as e:
+            # Malformed URLs raise all sorts of errors; they are dead links, not a crash
+            result['error'] = f"{type(e).__name__}: {e}"
+        result['elapsed'] = round(time.perf_counter() - start, 3)
+        result['checked'] = time.time()
+        return result
+
+    def _drain(self, queue):
+        """Probe URLs from one host's queue until it is empty"""
+        results = []
+        while True:
+            try:
+                url = queue.popleft()
+            except IndexError:
+                return results
+            results.append(self.probe(url))
+
+    def cached_result(self, url):
+        """Return a still-valid cached success for url, if any"""
+        result = self.cache.get(url)
+        if result and result['ok'] and time.time() - result['checked'] < self.ttl:
+            return result
+        return None
+
+    def check(self, urls):
+        """Probe every unique URL, reusing cached successes; returns url -> result"""
+        results = {}
+        to_probe = []
+        for url in dict.fromkeys(urls):
+            cached = self.cached_result(url)
+            if cached:
+                results[url] = dict(cached, cached=True)
+            else:
+                to_probe.append(url)
+
+        queues = defaultdict(deque)
+        for url in to_probe:
+            queues[url_host(url)].append(url)
+        # Up to per_host lanes per host, submitted round-robin so every host starts early
+        lanes = [queue for lane in range(self.per_host) for queue in queues.values() if len(queue) > lane]
+        if lanes:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(lanes))) as executor:
+                for future in as_completed([executor.submit(self._drain, queue) for queue in lanes]):
+                    for result in future.result():
+                        self.cache[result['url']] = result
+                        results[result['url']] = dict(result, cached=False)
+        return results
+
+
+def collect_entries(paths):
+    """Parse every playlist, returning (source path, entry) pairs that have a URL"""
+    collected = []
+    for path in paths:
+        for entry in m3u.parse_file(path):
+            if entry.url:
+                collected.append((path, entry))
+    return collected
+
+
+def build_report(collected, results):
+    """Summarise probe results overall, per host and per entry"""
+    hosts = defaultdict(lambda: {'ok': 0, 'dead': 0})
+    for url, result in results.items():
+        hosts[url_host(url)]['ok' if result['ok'] else 'dead'] += 1
+
+    entries = []
+    for path, entry in collected:
+        result = results[entry.url]
+        entries.append({
+            'source': path,
+            'group_title': entry.group_title,
+            'title': entry.title,
+            'url': entry.url,
+            'ok': result['ok'],
+            'status': result['status'],
+            'error': result['error'],
+            'elapsed': result.get('elapsed'),
+            'cached': result['cached'],
+        })
+
+    return {
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'summary': {
+            'entries': len(collected),
+            'unique_urls': len(results),
+            'ok': sum(1 for r in results.values() if r['ok']),
+            'dead': sum(1 for r in results.values() if not r['ok']),
+            'cached': sum(1 for r in results.values() if r['cached']),
+        },
+        'hosts': dict(sorted(hosts.items())),
+        'entries': entries,
+    }
+
+
+def playlist_paths(args):
+    """Resolve the playlists to check from the command line"""
+    if args.dir:
+        return sorted(os.path.join(args.dir, f) for f in os.listdir(args.dir) if f.endswith('.m3u'))
+    return args.playlists or ["all.m3u"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every link in one or more playlists.")
+    parser.add_argument('playlists', nargs='*', help="playlists to check (default: all.m3u)")
+    parser.add_argument('--dir', help="check every .m3u file in this directory instead")
+    parser.add_argument('--report', default="linkcheck_report.json", help="JSON report to write")
+    parser.add_argument('--filtered', help="also write a playlist with only the live entries")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="global concurrency cap")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help="concurrent requests per host")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="per-request timeout in seconds")
+    parser.add_argument('--ttl-hours', type=float, default=DEFAULT_TTL_HOURS,
+                        help="skip links verified live within this many hours")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help="result cache file ('' to disable)")
+    args = parser.parse_args()
+
+    paths = playlist_paths(args)
+    collected = collect_entries(paths)
+    if not collected:
+        print("No links found.")
+        sys.exit(1)
+
+    checker = LinkChecker(args.workers, args.per_host, args.timeout, args.cache, args.ttl_hours)
+    print(f"Checking {len(collected)} entries from {len(paths)} playlist(s)...")
+    results = checker.check(entry.url for _, entry in collected)
+    checker.save_cache()
+
+    report = build_report(collected, results)
+    m3u.atomic_write(args.report, [json.dumps(report, indent=2, ensure_ascii=False)])
+    summary = report['summary']
+    print(f"{summary['ok']} live, {summary['dead']} dead, {summary['cached']} from cache "
+          f"({summary['unique_urls']} unique URLs). Report: {args.report}")
+
+    if args.filtered:
+        m3u.write_file(args.filtered, (entry for _, entry in collected if results[entry.url]['ok']))
+        print(f"Live entries written to {args.filtered}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import tempfile
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+HEADER = "#EXTM3U"
+
+# `#EXTINF:<duration> key="value" key=value, Display title`; the title starts
+# after the first comma outside quotes, whatever the attributes look like
+EXTINF_RE = re.compile(
+    r'''#EXTINF:\s*(?P<duration>-?\d+(?:\.\d+)?)?(?P<attrs>(?:[^,"']|"[^"]*"|'[^']*')*),?\s*(?P<title>.*)'''
+)
+# The shape every line we generate has; matched first to skip attribute scanning
+COMMON_EXTINF_RE = re.compile(r'#EXTINF:(-?\d+) group-title="([^"]*)" tvg-logo="([^"]*)",\s*(.*)')
+# key="double quoted", key='single quoted' or key=bare (e.g. tvg-id=foo)
+ATTR_RE = re.compile(r'''([\w-]+)=(?:"([^"]*)"|'([^']*)'|([^\s,"']+))''')
+GROUP_TITLE_RE = re.compile(r'group-title="([^"]+)"')
+# Signed CDN links carry their expiry as a Unix timestamp, e.g. `?Expires=1748683243&Signature=...`
+EXPIRES_RE = re.compile(r'[?&]Expires=(\d+)', re.IGNORECASE)
+# ` - ALT`, ` - ALT2`, ... suffix marking a mirror of the same title
+ALT_SUFFIX_RE = re.compile(r'\s+-\s+ALT(\d*)$')
+
+# Query params that vary between copies of the same file (cache busters, signatures)
+VOLATILE_PARAMS = {'hash', 'expires', 'signature', 'key-pair-id'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class M3UEntry:
+    """One playlist item: the EXTINF metadata, any extra directives and its URL.
+
+    group_title and tvg_logo are interned, since the same series name and
+    poster repeat across every episode line. Attributes other than those two
+    live in `attrs` (None when there are none); directive lines such as
+    #EXTVLCOPT live in `directives` (None when there are none).
+    """
+
+    __slots__ = ('duration', 'group_title', 'tvg_logo', 'title', 'url', 'directives', 'attrs')
+
+    def __init__(self, title: Optional[str] = None, url: Optional[str] = None,
+                 group_title: Optional[str] = None, tvg_logo: Optional[str] = None,
+                 duration: str = '-1', directives: Optional[Tuple[str, ...]] = None,
+                 attrs: Optional[Dict[str, str]] = None):
+        self.duration = duration
+        self.group_title = sys.intern(group_title) if group_title is not None else None
+        self.tvg_logo = sys.intern(tvg_logo) if tvg_logo is not None else None
+        self.title = title
+        self.url = url
+        self.directives = tuple(directives) if directives else None
+        self.attrs = attrs or None
+
+    def __repr__(self) -> str:
+        return f"M3UEntry(group_title={self.group_title!r}, title={self.title!r}, url={self.url!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, M3UEntry):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    @property
+    def sort_key(self) -> str:
+        """Key playlists are sorted by: the group-title, or "" without one"""
+        return self.group_title or ""
+
+    def extinf(self) -> Optional[str]:
+        """Render the #EXTINF line, or None for a bare URL entry"""
+        if self.title is None:
+            return None
+        parts = [f'#EXTINF:{self.duration}']
+        if self.group_title is not None:
+            parts.append(f'group-title="{self.group_title}"')
+        if self.tvg_logo is not None:
+            parts.append(f'tvg-logo="{self.tvg_logo}"')
+        if self.attrs:
+            parts.extend(f'{key}="{value}"' for key, value in self.attrs.items())
+        prefix = ' '.join(parts)
+        return f"{prefix}, {self.title}" if self.title else f"{prefix},"
+
+    def to_lines(self) -> List[str]:
+        """Render the entry as newline-terminated playlist lines"""
+        lines = []
+        extinf = self.extinf()
+        if extinf is not None:
+            lines.append(extinf + '\n')
+        if self.directives:
+            lines.extend(directive + '\n' for directive in self.directives)
+        if self.url is not None:
+            lines.append(self.url + '\n')
+        return lines
+
+
+def parse_extinf(line: str) -> M3UEntry:
+    """Build an entry (without URL) from an #EXTINF line"""
+    match = COMMON_EXTINF_RE.fullmatch(line)
+    if match:
+        duration, group_title, tvg_logo, title = match.groups()
+        return M3UEntry(title.rstrip(), None, group_title, tvg_logo, duration)
+
+    match = EXTINF_RE.match(line)
+    group_title = tvg_logo = None
+    attrs = {}
+    for key, double, single, bare in ATTR_RE.findall(match.group('attrs')):
+        value = double or single or bare
+        if key == 'group-title':
+            group_title = value
+        elif key == 'tvg-logo':
+            tvg_logo = value
+        else:
+            attrs[key] = value
+    return M3UEntry(
+        title=match.group('title').strip(),
+        group_title=group_title,
+        tvg_logo=tvg_logo,
+        duration=match.group('duration') or '-1',
+        attrs=attrs,
+    )
+
+
+def iter_entries(lines: Iterable[str]) -> Iterator[M3UEntry]:
+    """Parse playlist lines into entries in a single pass.
+
+    An #EXTINF with no URL before the next #EXTINF becomes an entry with
+    url=None instead of stealing the next entry's line, and a URL without
+    an #EXTINF becomes a bare entry with title=None. Other `#` lines are
+    kept as directives of the entry they belong to.
+    """
+    current = None
+    directives = []
+    for line in lines:
+        line = line.strip()
+        if not line or line == HEADER:
+            continue
+        if line.startswith('#EXTINF'):
+            if current is not None:
+                current.directives = tuple(directives) or None
+                yield current
+            current = parse_extinf(line)
+            directives = []
+        elif line.startswith('#'):
+            directives.append(line)
+        else:
+            entry = current if current is not None else M3UEntry()
+            entry.url = line
+            entry.directives = tuple(directives) or None
+            yield entry
+            current = None
+            directives = []
+    if current is not None:
+        current.directives = tuple(directives) or None
+        yield current
+
+
+def parse_file(path: str) -> List[M3UEntry]:
+    """Parse a playlist file into a list of entries"""
+    with open(path, "r", encoding='utf-8') as f:
+        return list(iter_entries(f))
+
+
+def parse_string(text: str) -> List[M3UEntry]:
+    """Parse playlist text into a list of entries"""
+    return list(iter_entries(text.splitlines()))
+
+
+def iter_lines(entries: Iterable[M3UEntry], header: bool = True) -> Iterator[str]:
+    """Serialize entries lazily as newline-terminated lines"""
+    if header:
+        yield HEADER + '\n'
+    for entry in entries:
+        yield from entry.to_lines()
+
+
+def dumps(entries: Iterable[M3UEntry], header: bool = True) -> str:
+    """Serialize entries to playlist text"""
+    return ''.join(iter_lines(entries, header))
+
+
+def write(f: TextIO, entries: Iterable[M3UEntry], header: bool = True) -> None:
+    """Serialize entries into an open text file"""
+    f.writelines(iter_lines(entries, header))
+
+
+def atomic_write(path: str, chunks: Iterable[str]) -> None:
+    """Write text chunks to a temp file next to path, then rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", encoding='utf-8') as outfile:
+            for chunk in chunks:
+                outfile.write(chunk)
+        # mkstemp creates 0600 files; keep the mode a plain open() would give
+        if os.path.exists(path):
+            mode = os.stat(path).st_mode & 0o777
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_file(path: str, entries: Iterable[M3UEntry], header: bool = True) -> None:
+    """Atomically write entries to a playlist file"""
+    atomic_write(path, iter_lines(entries, header))
+
+
+def url_expiry(url: Optional[str]) -> Optional[int]:
+    """Return the Unix time a signed URL expires at, or None if it isn't signed"""
+    if not url:
+        return None
+    match = EXPIRES_RE.search(url)
+    return int(match.group(1)) if match else None
+
+
+def normalize_url(url: str) -> str:
+    """Reduce a URL to the file it points at, so trivially different copies compare equal.
+
+    Scheme and host are lower-cased, default ports, fragments and volatile
+    params (hash=, Expires=, Signature=, Key-Pair-Id=) are dropped and the
+    remaining params are sorted.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in VOLATILE_PARAMS)
+    return urlunsplit((scheme, host, parts.path, urlencode(query), ''))
+
+
+def split_alt_title(title: Optional[str]) -> Tuple[Optional[str], int]:
+    """Split 'X - ALT2' into ('X', 2); the primary 'X' is ('X', 0) and 'X - ALT' is ('X', 1)"""
+    if not title:
+        return title, 0
+    match = ALT_SUFFIX_RE.search(title)
+    if not match:
+        return title, 0
+    return title[:match.start()], int(match.group(1) or 1)
+
+
+def extract_group_title(line: str) -> str:
+    """Extract group-title from an EXTINF line, or "" if it has none"""
+    match = GROUP_TITLE_RE.search(line)
+    return match.group(1) if match else ""
@@ -0,0 +1,153 @@
+"""In-process counters and latency histograms, exported as JSON or Prometheus text.
+
+    from metrics import REGISTRY
+    with REGISTRY.timer('combine_stage_seconds', stage='read'):
+        ...
+    REGISTRY.inc('tmdb_retries_total', endpoint='/movie/{id}', status='429')
+    print(REGISTRY.to_prometheus())
+
+TMDBClient and combine_all_m3u.py record into REGISTRY; the CLIs dump it at
+the end of a run with --metrics json|prometheus (see add_arguments/emit).
+"""
+import bisect
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import m3u
+
+# Upper bounds in seconds: sub-millisecond cache hits up to slow, retried requests
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FORMATS = ('json', 'prometheus')
+ID_RE = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_label(endpoint):
+    """Collapse ids so every movie shares one series: /tv/1/season/2 -> /tv/{id}/season/{id}"""
+    return ID_RE.sub('/{id}', endpoint)
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the body of a with-block into a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Return {'counters': {name: [...]}, 'histograms': {name: [...]}} with cumulative buckets"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        result = {'counters': {}, 'histograms': {}}
+        for (name, labels), value in sorted(counters.items()):
+            result['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        for (name, labels), histogram in sorted(histograms.items()):
+            counts, total = histogram[:-1], histogram[-1]
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                buckets[f"{bound:g}"] = cumulative
+            count = sum(counts)
+            buckets['+Inf'] = count
+            result['histograms'].setdefault(name, []).append({
+                'labels': dict(labels),
+                'count': count,
+                'sum': round(total, 6),
+                'mean': round(total / count, 6) if count else None,
+                'buckets': buckets,
+            })
+        return result
+
+    def to_json(self):
+        """Snapshot as indented JSON"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in snapshot['counters'].items():
+            lines.append(f"# TYPE {name} counter")
+            lines += [f"{name}{_labels(s['labels'])} {s['value']}" for s in series]
+        for name, series in snapshot['histograms'].items():
+            lines.append(f"# TYPE {name} histogram")
+            for s in series:
+                for bound, count in s['buckets'].items():
+                    lines.append(f"{name}_bucket{_labels(dict(s['labels'], le=bound))} {count}")
+                lines.append(f"{name}_sum{_labels(s['labels'])} {s['sum']}")
+                lines.append(f"{name}_count{_labels(s['labels'])} {s['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, fmt, path=None):
+        """Write the snapshot as fmt to path (atomically), or to stderr without one"""
+        text = self.to_json() + '\n' if fmt == 'json' else self.to_prometheus()
+        if path:
+            m3u.atomic_write(path, [text])
+        else:
+            sys.stderr.write(text)
+
+
+def _labels(labels):
+    """Render {'a': 'x'} as {a="x"}, escaping values the way Prometheus expects"""
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+# Shared by every client and tool in the process
+REGISTRY = Metrics()
+
+
+def add_arguments(parser):
+    """Add the --metrics/--metrics-file options to a tool's parser"""
+    parser.add_argument('--metrics', choices=FORMATS,
+                        help="print counters and latency histograms at the end of the run")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="write the --metrics summary here instead of stderr")
+
+
+def emit(args):
+    """Write the end-of-run summary if the tool was asked for one"""
+    if args.metrics:
+        REGISTRY.write(args.metrics, args.metrics_file)
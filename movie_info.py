@@ -1,31 +1,60 @@
-import time
 import os
 import re
-from api_utils import TMDBClient
+import csv
+import sys
+import json
+import argparse
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+import m3u
+import metrics
+import profiling
+from m3u import M3UEntry
+from title_index import TitleIndex, normalize_title, record_match, EPISODE_TITLE_RE
+
+# "Series | S2.E5 - Title" -> season 2, episode 5
+EPISODE_NUMBER_RE = re.compile(r'\|\s*S(\d+)\.E(\d+)\b')
+# Subdirectory of the playlists holding refreshed episodes that have no URL yet
+PENDING_DIR = 'pending'
 
 # Constants for TMDb API
-API_KEY = os.environ.get('TMDB_API_KEY').strip()  # Strip any trailing whitespace or newline characters
-if not API_KEY:
-  raise ValueError("No API KEY found. TMDB_API_KEY must be obtained and set in your shell environment")
 API_URL = 'https://api.themoviedb.org/3'
 IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'  # Base URL for images
 
-# Initialize client
-tmdb_client = TMDBClient(API_KEY)
+tmdb_client = None
+title_index = TitleIndex()
+_client_lock = threading.Lock()
+
+def get_tmdb_client():
+    """Returns the TMDB client, creating it (and checking TMDB_API_KEY) on first use."""
+    global tmdb_client
+    if tmdb_client is None:
+        # Worker threads may get here first; they must all share one client,
+        # or the rate limit and request coalescing stop being shared
+        with _client_lock:
+            if tmdb_client is None:
+                from api_utils import TMDBClient
+                from config import APIConfig
+                tmdb_client = TMDBClient(APIConfig().tmdb_key)
+    return tmdb_client
 
 def get_movie_details(movie_name):
     """Fetches movie cover URL and title for a given movie name."""
-    results = tmdb_client.request('/search/movie', {"query": movie_name})
+    results = get_tmdb_client().request('/search/movie', {"query": movie_name})
     if results and 'results' in results:
         return results['results']
     return None
 
 def parse_input_for_episode_range(user_input):
     """Parses user input to extract series name, season, and episode range."""
-    match = re.match(r"(.+?)\s+[sS](\d+)[eE](\d+)(?:\s*-\s*[eE](\d+))?", user_input)
+    match = re.match(r"(.+?)\s+[sS](\d+)(?:[eE](\d+)(?:\s*-\s*[eE]?(\d+))?)?\s*$", user_input)
     if match:
         series_name = match.group(1).strip()
         season_number = int(match.group(2))
+        if match.group(3) is None:
+            # "Series S2": the whole season
+            return series_name, season_number, 1, None
         start_episode = int(match.group(3))
         end_episode = int(match.group(4)) if match.group(4) else start_episode
         return series_name, season_number, start_episode, end_episode
@@ -34,14 +63,14 @@ def parse_input_for_episode_range(user_input):
 
 def search_series(series_name):
     """Fetches the series ID for a given series name."""
-    results = tmdb_client.request('/search/tv', {"query": series_name})
+    results = get_tmdb_client().request('/search/tv', {"query": series_name})
     if results and 'results' in results:
         return results['results']
     return None
 
 def get_episode_details(series_id, season_number, episode_number):
     """Fetches title and cover URL for a specific episode."""
-    episode_data = tmdb_client.request(
+    episode_data = get_tmdb_client().request(
         f'/tv/{series_id}/season/{season_number}/episode/{episode_number}'
     )
 
@@ -52,13 +81,25 @@ def get_episode_details(series_id, season_number, episode_number):
         return title, cover_url
     return None, None
 
+def movie_entry(title, cover_url):
+    """Builds the playlist entry for a movie."""
+    return M3UEntry(title=title, group_title=title, tvg_logo=cover_url)
+
+def episode_entry(series_name, season, episode, episode_title, cover_url):
+    """Builds the playlist entry for an episode."""
+    return M3UEntry(
+        title=f"{series_name} | S{season}.E{episode} - {episode_title}",
+        group_title=series_name,
+        tvg_logo=cover_url
+    )
+
 def generate_movie_output(title, cover_url):
     """Generates output format for movies."""
-    print(f'#EXTINF:-1 group-title="{title}" tvg-logo="{cover_url}", {title}')
+    print(movie_entry(title, cover_url).extinf())
 
 def generate_episode_output(series_name, season, episode, episode_title, cover_url):
     """Generates output format for episodes."""
-    print(f'#EXTINF:-1 group-title="{series_name}" tvg-logo="{cover_url}", {series_name} | S{season}.E{episode} - {episode_title}')
+    print(episode_entry(series_name, season, episode, episode_title, cover_url).extinf())
 
 def parse_episode_input(input_str):
     """Parse different episode input formats.
@@ -90,54 +131,101 @@ def parse_episode_input(input_str):
 
     return None, None, None
 
-def process_episodes(series_id, series_name, season, start_episode, end_episode):
-    """Process and output episode information."""
-    # For whole season, get season details first
+def get_season_episodes(series_id, season_number, fresh=False):
+    """Fetches a whole season and returns its episodes keyed by episode number."""
+    season_data = get_tmdb_client().request(f'/tv/{series_id}/season/{season_number}', fresh=fresh)
+    if not season_data or 'episodes' not in season_data:
+        return None
+    return {
+        episode['episode_number']: episode
+        for episode in season_data['episodes']
+        if episode.get('episode_number') is not None
+    }
+
+def collect_episodes(series_id, series_name, season, start_episode, end_episode):
+    """Builds (episode_number, entry) pairs for a season range.
+
+    entry is None for episodes TMDB has no details for; returns None if the
+    season itself can't be fetched for a whole-season request.
+    """
+    # One season request carries every episode's title and still
+    season_episodes = get_season_episodes(series_id, season)
+    if season_episodes is None:
+        season_episodes = {}
+        if end_episode is None:
+            return None
+
+    # For whole season, stop at the last episode the season lists
     if end_episode is None:
-        season_data = tmdb_client.request(f'/tv/{series_id}/season/{season}')
-        if season_data and 'episodes' in season_data:
-            end_episode = len(season_data['episodes'])
-        else:
-            print(f"Could not fetch season {season} details")
-            return
+        end_episode = max(season_episodes, default=0)
 
-    # Process episodes
+    episodes = []
     for episode_number in range(start_episode, (end_episode + 1)):
-        episode_title, cover_url = get_episode_details(series_id, season, episode_number)
+        episode = season_episodes.get(episode_number)
+        if episode and episode.get('name'):
+            episode_title = episode['name']
+            still_path = episode.get('still_path')
+            cover_url = f"{IMAGE_BASE_URL}{still_path}" if still_path else ""
+        else:
+            # Only episodes missing from the season payload cost a request
+            episode_title, cover_url = get_episode_details(series_id, season, episode_number)
+
+        entry = None
         if episode_title:
-            generate_episode_output(series_name, season, episode_number, episode_title, cover_url)
+            entry = episode_entry(series_name, season, episode_number, episode_title, cover_url)
+        episodes.append((episode_number, entry))
+    return episodes
+
+def process_episodes(series_id, series_name, season, start_episode, end_episode):
+    """Process and output episode information."""
+    episodes = collect_episodes(series_id, series_name, season, start_episode, end_episode)
+    if episodes is None:
+        print(f"Could not fetch season {season} details")
+        return
+
+    for episode_number, entry in episodes:
+        if entry:
+            print(entry.extinf())
         else:
             print(f"Details not found for Episode {episode_number}")
-        time.sleep(0.25)
 
 def handle_series_option():
     """Handle series search and episode processing."""
     # Step 1: Get series name
-    series_name = input("Enter series name: ").strip()
+    query = input("Enter series name: ").strip()
 
-    # Step 2: Search and display results
-    series_list = search_series(series_name)
-    if not series_list:
-        print("No series found with that name.")
-        return
-
-    print("\nSelect the series from the list:")
-    for i, series in enumerate(series_list):
-        year = series.get('first_air_date', 'Unknown')[:4]
-        series_id = series['id']
-        print(f"{i + 1}. {series['name']} ({year}) - {series_id} (tv)")
+    # Titles resolved before skip the search
+    indexed = title_index.lookup(query, media_type='tv')
+    if indexed:
+        print(f"Using indexed match: {indexed['title']} ({indexed['year']}) - {indexed['id']} (tv)")
+        selected_series = {'id': indexed['id'], 'name': indexed['title']}
+    else:
+        # Step 2: Search and display results
+        series_list = search_series(query)
+        if not series_list:
+            print("No series found with that name.")
+            return
 
-    # Step 3: Get series selection
-    try:
-        selection = int(input("\nEnter the number of your choice: ").strip()) - 1
-        if not (0 <= selection < len(series_list)):
-            print("Invalid selection.")
+        print("\nSelect the series from the list:")
+        for i, series in enumerate(series_list):
+            year = series.get('first_air_date', 'Unknown')[:4]
+            series_id = series['id']
+            print(f"{i + 1}. {series['name']} ({year}) - {series_id} (tv)")
+
+        # Step 3: Get series selection
+        try:
+            selection = int(input("\nEnter the number of your choice: ").strip()) - 1
+            if not (0 <= selection < len(series_list)):
+                print("Invalid selection.")
+                return
+        except ValueError:
+            print("Invalid input. Please enter a number.")
             return
-    except ValueError:
-        print("Invalid input. Please enter a number.")
-        return
 
-    selected_series = series_list[selection]
+        selected_series = series_list[selection]
+        title_index.record(query, 'tv', selected_series)
+        title_index.save()
+
     series_id = selected_series['id']
     series_name = selected_series['name']
 
@@ -162,6 +250,14 @@ def handle_movie_option():
     # Step 1: Get movie name
     movie_name = input("Enter movie name: ").strip()
 
+    # Titles resolved before skip the search
+    indexed = title_index.lookup(movie_name, media_type='movie')
+    if indexed:
+        print(f"Using indexed match: {indexed['title']} ({indexed['year']}) - {indexed['id']}")
+        poster_path = indexed['poster_path']
+        generate_movie_output(indexed['title'], f"{IMAGE_BASE_URL}{poster_path}" if poster_path else "")
+        return
+
     # Step 2: Search and display results
     movie_results = get_movie_details(movie_name)
     if not movie_results:
@@ -185,6 +281,8 @@ def handle_movie_option():
         return
 
     selected_movie = movie_results[selection]
+    title_index.record(movie_name, 'movie', selected_movie)
+    title_index.save()
     title = selected_movie['title']
     poster_path = selected_movie.get('poster_path', '')
     cover_url = f"{IMAGE_BASE_URL}{poster_path}" if poster_path else ""
@@ -192,7 +290,329 @@ def handle_movie_option():
     # Step 4: Generate output
     generate_movie_output(title, cover_url)
 
-def main():
+def pick_result(results, title, year=None, title_key='title', date_key='release_date'):
+    """Picks the search result that best matches title (and year, if given).
+
+    Exact title + year beats exact title beats year alone; otherwise TMDB's
+    own top result is used.
+    """
+    if not results:
+        return None
+    wanted = normalize_title(title)
+    year = str(year) if year else None
+
+    def score(result):
+        same_title = normalize_title(result.get(title_key) or '') == wanted
+        same_year = bool(year) and (result.get(date_key) or '')[:4] == year
+        return (same_title and same_year, same_title, same_year)
+
+    return max(results, key=score)  # max keeps the first of equal scores
+
+def load_manifest(path):
+    """Loads batch items from a CSV, JSON or YAML manifest.
+
+    Each item is a title string (e.g. "Reacher S2E1-8") or a mapping with
+    `title` and optional `type` (movie/tv), `year` and `urls`; the file
+    must hold a list of them. Malformed items are kept with an `error` so
+    the batch reports them as unresolved.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8') as f:
+        if ext == '.csv':
+            items = [row for row in csv.DictReader(f)]
+        elif ext in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("YAML manifests need PyYAML: pip install pyyaml")
+            items = yaml.safe_load(f) or []
+        else:
+            items = json.load(f)
+    if not isinstance(items, list):
+        # A top-level object would otherwise be read as a list of its keys
+        raise SystemExit(f"{path}: a manifest must be a list of titles or items, not {type(items).__name__}")
+
+    normalized = []
+    for item in items:
+        if isinstance(item, (str, int, float)):
+            # YAML reads a bare `- 1917` as a number
+            item = {'title': str(item)}
+        if not isinstance(item, dict):
+            normalized.append({'title': str(item), 'type': None, 'year': None, 'urls': [],
+                               'error': "not a title or a mapping"})
+            continue
+        media_type = item.get('type') or None
+        urls = item.get('urls') or item.get('url') or []
+        if isinstance(urls, str):
+            urls = urls.replace('|', ' ').split()
+        error = None
+        if media_type is not None and not isinstance(media_type, str):
+            error = f"type must be movie or tv, not {media_type!r}"
+        elif media_type is not None:
+            media_type = media_type.strip().lower() or None
+            if media_type not in (None, 'movie', 'tv'):
+                error = f"type must be movie or tv, not {media_type!r}"
+        if not isinstance(urls, list):
+            error = error or f"urls must be a list or a string, not {urls!r}"
+            urls = []
+        normalized.append({
+            'title': str(item.get('title') or '').strip(),
+            'type': None if error else media_type,
+            'year': str(item.get('year') or '').strip() or None,
+            'urls': [str(url) for url in urls],
+            'error': error,
+        })
+    return [item for item in normalized if item['title']]
+
+def resolve_item(item):
+    """Resolves one manifest item into (display title, entries) or raises LookupError."""
+    name, season, start_ep, end_ep = parse_input_for_episode_range(item['title'])
+    media_type = item['type'] or ('tv' if season is not None else 'movie')
+
+    indexed = title_index.lookup(name, item['year'], media_type)
+
+    if media_type == 'movie':
+        movie = indexed
+        if not movie:
+            results = get_movie_details(name)
+            movie = pick_result(results, name, item['year'])
+            if movie:
+                # Only an exact title match is trusted for later lookups
+                record_match(title_index, name, 'movie', movie, results)
+        if not movie:
+            raise LookupError(f"no movie found for '{name}'")
+        poster_path = movie.get('poster_path', '')
+        cover_url = f"{IMAGE_BASE_URL}{poster_path}" if poster_path else ""
+        return movie['title'], [movie_entry(movie['title'], cover_url)]
+
+    series = indexed and {'id': indexed['id'], 'name': indexed['title']}
+    if not series:
+        results = search_series(name)
+        series = pick_result(results, name, item['year'], 'name', 'first_air_date')
+        if series:
+            record_match(title_index, name, 'tv', series, results)
+    if not series:
+        raise LookupError(f"no series found for '{name}'")
+    if season is None:
+        raise LookupError(f"'{item['title']}' needs a season, e.g. '{name} S1' or '{name} S2E1-8'")
+    episodes = collect_episodes(series['id'], series['name'], season, start_ep, end_ep)
+    if episodes is None:
+        raise LookupError(f"could not fetch season {season} of '{series['name']}'")
+    missing = [number for number, entry in episodes if entry is None]
+    if missing:
+        raise LookupError(f"no details for S{season} episode(s) {', '.join(map(str, missing))}")
+    return series['name'], [entry for _, entry in episodes]
+
+def playlist_filename(title):
+    """Returns the m3u/ file name for a title (path separators replaced)."""
+    return title.replace('/', '-').replace('\\', '-') + '.m3u'
+
+def run_batch(manifest_path, out_dir='m3u', workers=8, overwrite=False):
+    """Resolves every manifest item concurrently and writes one playlist per item.
+
+    Returns a summary dict with written, skipped and unresolved items.
+    """
+    with profiling.phase('manifest'):
+        items = load_manifest(manifest_path)
+    os.makedirs(out_dir, exist_ok=True)
+    summary = {'written': [], 'skipped': [], 'unresolved': []}
+
+    def work(item):
+        if item.get('error'):
+            return item, None, item['error']
+        try:
+            return item, resolve_item(item), None
+        except LookupError as e:
+            return item, None, str(e)
+
+    with profiling.phase('resolve'), ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # Inline with one worker, so --profile sees the lookups themselves
+        results = executor.map(work, items) if workers > 1 else map(work, items)
+        for item, resolved, error in results:
+            if resolved is None:
+                summary['unresolved'].append({'title': item['title'], 'reason': error})
+                print(f"✗ {item['title']}: {error}")
+                continue
+
+            display_title, entries = resolved
+            for entry, url in zip(entries, item['urls']):
+                entry.url = url
+            path = os.path.join(out_dir, playlist_filename(display_title))
+            if os.path.exists(path) and not overwrite:
+                summary['skipped'].append({'title': item['title'], 'path': path})
+                print(f"- {item['title']}: {path} exists, skipped (use --overwrite)")
+                continue
+            m3u.write_file(path, entries)
+            summary['written'].append({'title': item['title'], 'path': path, 'entries': len(entries)})
+            print(f"✓ {item['title']} -> {path} ({len(entries)} entries)")
+
+    title_index.save()
+    print(f"\n{len(summary['written'])} written, {len(summary['skipped'])} skipped, "
+          f"{len(summary['unresolved'])} unresolved")
+    for item in summary['unresolved']:
+        print(f"  unresolved: {item['title']} ({item['reason']})")
+    return summary
+
+def series_playlists(out_dir='m3u'):
+    """Maps normalized group-title -> (path, group-title) for every series playlist."""
+    playlists = {}
+    for name in sorted(os.listdir(out_dir)):
+        if not name.endswith('.m3u'):
+            continue
+        path = os.path.join(out_dir, name)
+        for entry in m3u.parse_file(path):
+            if entry.group_title and entry.title and EPISODE_TITLE_RE.search(entry.title):
+                playlists.setdefault(normalize_title(entry.group_title), (path, entry.group_title))
+                break
+    return playlists
+
+def episode_number(entry):
+    """Returns an entry's (season, episode) pair, or None if its title has none."""
+    match = EPISODE_NUMBER_RE.search(entry.title or '')
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+def existing_episodes(entries):
+    """Returns the (season, episode) pairs a playlist already has a line for."""
+    present = {episode_number(entry) for entry in entries}
+    present.discard(None)
+    return present
+
+def resolve_series(name):
+    """Finds the TMDB series for a name via the title index, else the best search match."""
+    indexed = title_index.lookup(name, media_type='tv')
+    if indexed:
+        return {'id': indexed['id'], 'name': indexed['title']}
+    results = search_series(name)
+    series = pick_result(results, name, None, 'name', 'first_air_date')
+    if series:
+        # A fuzzy guess is used for this refresh but not reused by later ones
+        record_match(title_index, name, 'tv', series, results)
+    return series
+
+def new_episode_entries(series_id, series_name, present, seasons=None):
+    """Builds entries for aired episodes not in present, fetching only seasons that can have any.
+
+    One /tv request lists every season's episode count; only seasons with
+    more episodes than the playlist has are fetched, concurrently. Both are
+    checked with the server rather than served from a stale cache, so an
+    episode that aired since the last refresh isn't missed.
+    """
+    details = get_tmdb_client().request(f'/tv/{series_id}', fresh=True)
+    if not details:
+        return None
+    wanted = []
+    for season in details.get('seasons', []):
+        number = season.get('season_number')
+        if not number or (seasons and number not in seasons):
+            continue  # season 0 holds specials
+        have = sum(1 for s, _ in present if s == number)
+        if season.get('episode_count', 0) > have:
+            wanted.append(number)
+
+    today = date.today().isoformat()
+    season_payloads = get_tmdb_client().map(
+        lambda number: get_season_episodes(series_id, number, fresh=True), wanted
+    )
+    entries = []
+    for number, episodes in zip(wanted, season_payloads):
+        for episode_number, episode in sorted((episodes or {}).items()):
+            aired = episode.get('air_date') and episode['air_date'] <= today
+            if (number, episode_number) in present or not aired or not episode.get('name'):
+                continue
+            still_path = episode.get('still_path')
+            cover_url = f"{IMAGE_BASE_URL}{still_path}" if still_path else ""
+            entries.append(episode_entry(series_name, number, episode_number, episode['name'], cover_url))
+    return entries
+
+def pending_path(path):
+    """Returns where a playlist's episodes still waiting for URLs are kept."""
+    return os.path.join(os.path.dirname(path), PENDING_DIR, os.path.basename(path))
+
+def refresh_series(name, out_dir='m3u', seasons=None, playlists=None):
+    """Brings one series playlist up to date, creating it if needed.
+
+    Existing lines, including hand-curated URLs, are kept byte for byte.
+    New episodes go to <out_dir>/pending/<file> until they have a URL;
+    pending episodes that were given one are appended to the playlist.
+    Returns (path, appended entries, newly pending entries) or raises
+    LookupError.
+    """
+    playlists = series_playlists(out_dir) if playlists is None else playlists
+    path, group_title = playlists.get(normalize_title(name), (None, None))
+
+    series = resolve_series(group_title or name)
+    if not series:
+        raise LookupError(f"no series found for '{name}'")
+    group_title = group_title or series['name']
+    path = path or os.path.join(out_dir, playlist_filename(group_title))
+
+    original = ''
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            original = f.read()
+    present = existing_episodes(m3u.parse_string(original))
+    waiting_path = pending_path(path)
+    pending = m3u.parse_file(waiting_path) if os.path.exists(waiting_path) else []
+    # An episode the playlist gained by hand is no longer pending
+    pending = [entry for entry in pending if episode_number(entry) not in present]
+    ready = [entry for entry in pending if entry.url]
+    waiting = [entry for entry in pending if not entry.url]
+
+    entries = new_episode_entries(series['id'], group_title, present | existing_episodes(pending), seasons)
+    if entries is None:
+        raise LookupError(f"could not fetch details of '{series['name']}'")
+    if ready:
+        if original and not original.endswith('\n'):
+            original += '\n'
+        m3u.atomic_write(path, [original, m3u.dumps(ready, header=not original)])
+    waiting += entries
+    if waiting:
+        os.makedirs(os.path.dirname(waiting_path), exist_ok=True)
+        m3u.write_file(waiting_path, waiting)
+    elif os.path.exists(waiting_path):
+        os.remove(waiting_path)
+    return path, ready, entries
+
+def run_refresh(names, out_dir='m3u', workers=8, seasons=None):
+    """Refreshes several series concurrently; returns the names that failed."""
+    with profiling.phase('scan'):
+        playlists = series_playlists(out_dir)
+        if not names:
+            # Series whose every episode is still pending have no playlist yet
+            waiting_dir = os.path.join(out_dir, PENDING_DIR)
+            waiting = series_playlists(waiting_dir) if os.path.isdir(waiting_dir) else {}
+            names = [group_title for _, group_title in playlists.values()]
+            names += [group_title for key, (_, group_title) in waiting.items() if key not in playlists]
+
+    def work(name):
+        try:
+            return name, refresh_series(name, out_dir, seasons, playlists), None
+        except LookupError as e:
+            return name, None, str(e)
+
+    failed = []
+    with profiling.phase('refresh'), ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = executor.map(work, names) if workers > 1 else map(work, names)
+        for name, result, error in results:
+            if result is None:
+                failed.append(name)
+                print(f"✗ {name}: {error}")
+                continue
+            path, ready, entries = result
+            if not ready and not entries:
+                print(f"- {name}: up to date")
+                continue
+            if ready:
+                print(f"✓ {name}: {len(ready)} episode(s) with URLs appended to {path}")
+            if entries:
+                print(f"✓ {name}: {len(entries)} new episode(s) added to {pending_path(path)} (add their URLs)")
+            for entry in entries:
+                print(f"    {entry.title}")
+    title_index.save()
+    return failed
+
+def interactive():
+    """Runs the interactive movie/series menu."""
     while True:
         print("\nSelect an option:")
         print("1. Movie")
@@ -210,5 +630,47 @@ def main():
         else:
             print("Invalid choice. Please enter 1, 2, or 0.")
 
+def run(args):
+    """Dispatch the parsed command line to refresh, batch or interactive mode"""
+    if args.series or args.refresh_all:
+        if run_refresh(args.series, args.out_dir, args.workers, args.seasons):
+            sys.exit(1)
+        return
+
+    if not args.batch:
+        with profiling.phase('interactive'):
+            interactive()
+        return
+
+    summary = run_batch(args.batch, args.out_dir, args.workers, args.overwrite)
+    if args.summary:
+        m3u.atomic_write(args.summary, [json.dumps(summary, indent=2, ensure_ascii=False)])
+    if summary['unresolved']:
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate M3U entries for movies and series from TMDB.")
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help="resolve every title in a CSV/JSON/YAML manifest and write m3u/<Title>.m3u files")
+    parser.add_argument('--out-dir', default='m3u', help="where batch playlists are written")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent batch lookups")
+    parser.add_argument('--overwrite', action='store_true', help="replace playlists that already exist")
+    parser.add_argument('--summary', metavar='PATH', help="also write the batch summary as JSON")
+    parser.add_argument('--series', nargs='+', metavar='NAME',
+                        help="add every aired episode missing from these series' playlists (URL-less ones wait in <out-dir>/pending/)")
+    parser.add_argument('--refresh-all', action='store_true',
+                        help="add new episodes to every series playlist in --out-dir")
+    parser.add_argument('--seasons', type=lambda value: {int(n) for n in value.split(',')},
+                        help="with --series/--refresh-all, only these seasons (e.g. 1,2)")
+    metrics.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args, 'movie_info.profile')
+    try:
+        run(args)
+    finally:
+        profiling.finish()
+        metrics.emit(args)
+
 if __name__ == "__main__":
     main()
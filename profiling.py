@@ -0,0 +1,154 @@
+"""Opt-in CPU (cProfile) and memory (tracemalloc) profiling of a tool's main phases.
+
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start(args, 'all.profile')
+    try:
+        with profiling.phase('scan'):
+            ...
+    finally:
+        profiling.finish()
+
+Without --profile, phase() does nothing. With it, <prefix>.prof gets the
+cProfile data of every phase (python -m pstats <prefix>.prof) and
+<prefix>.txt a short summary per phase: wall time, peak memory, the
+functions with the most self time and the lines that allocated the most.
+cProfile only sees the calling thread; with --workers 1 the tools run their
+pools inline, so the profile shows the work itself rather than the wait.
+"""
+import os
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+import m3u
+
+DEFAULT_TOP = 15
+
+Phase = namedtuple('Phase', 'name seconds peak_bytes profile allocations')
+
+
+class Profiler:
+    """Collects one cProfile run and one tracemalloc diff per phase.
+
+    cProfile, pstats and tracemalloc are imported on first use, so the
+    tools don't pay for them unless --profile is given.
+    """
+
+    def __init__(self, prefix, top=DEFAULT_TOP):
+        self.prefix = prefix
+        self.top = top
+        self.phases = []
+        self._active = False
+
+    @contextmanager
+    def phase(self, name):
+        """Profile the body of a with-block as one named phase"""
+        if self._active:
+            # Nested phases are part of the outer one
+            yield
+            return
+        import cProfile
+        import pstats
+        import tracemalloc
+        self._active = True
+        # Keep the profiler's own bookkeeping out of the allocation report
+        filters = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        )
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(filters)
+            allocations = [stat for stat in after.compare_to(before, 'lineno') if stat.size_diff > 0]
+            self.phases.append(Phase(name, seconds, peak - baseline, profile, allocations[:self.top]))
+            self._active = False
+
+    def summary(self):
+        """Return the text summary of every recorded phase"""
+        import pstats
+        total = sum(phase.seconds for phase in self.phases)
+        lines = [f"Profile of {os.path.basename(sys.argv[0])} ({len(self.phases)} phases, {total:.3f}s)",
+                 f"cProfile data: {self.prefix}.prof (python -m pstats {self.prefix}.prof)"]
+        for phase in self.phases:
+            lines += ["", f"== {phase.name}: {phase.seconds:.3f}s, peak memory +{phase.peak_bytes / 1e6:.1f} MB =="]
+            lines.append("Top functions by self time:")
+            lines.append(f"  {'ncalls':>10} {'tottime':>9} {'cumtime':>9}  function")
+            stats = pstats.Stats(phase.profile).stats
+            heaviest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+            for (filename, lineno, funcname), (_, ncalls, tottime, cumtime, _) in heaviest:
+                where = funcname if filename == '~' else f"{os.path.basename(filename)}:{lineno}({funcname})"
+                lines.append(f"  {ncalls:>10} {tottime:>9.3f} {cumtime:>9.3f}  {where}")
+            lines.append("Top allocations still held at the end of the phase, by line:")
+            for stat in phase.allocations:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size_diff / 1e6:>+9.2f} MB {stat.count_diff:>+9} blocks  "
+                             f"{os.path.basename(frame.filename)}:{frame.lineno}")
+            if not phase.allocations:
+                lines.append("  (none)")
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """Write <prefix>.prof and <prefix>.txt; returns the summary path"""
+        import pstats
+        stats = pstats.Stats(self.phases[0].profile)
+        for phase in self.phases[1:]:
+            stats.add(phase.profile)
+        stats.dump_stats(f"{self.prefix}.prof")
+        m3u.atomic_write(f"{self.prefix}.txt", [self.summary()])
+        return f"{self.prefix}.txt"
+
+
+_profiler = None
+
+
+def add_arguments(parser):
+    """Add the --profile/--profile-top options to a tool's parser"""
+    parser.add_argument('--profile', nargs='?', const='', metavar='PREFIX',
+                        help="write cProfile and tracemalloc results of the main phases to PREFIX.prof "
+                             "and PREFIX.txt (default: next to the output file, else the working directory)")
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP, metavar='N',
+                        help="functions and allocation sites listed per phase")
+
+
+def start(args, default_prefix):
+    """Start profiling if --profile was given; default_prefix is used when it has no value"""
+    global _profiler
+    if args.profile is not None:
+        _profiler = Profiler(args.profile or default_prefix, args.profile_top)
+
+
+def phase(name):
+    """Context manager profiling one phase, or doing nothing when profiling is off"""
+    return _profiler.phase(name) if _profiler else nullcontext()
+
+
+def finish():
+    """Write the results (if any phase ran) and stop tracing"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    if profiler.phases:
+        try:
+            print(f"\nProfile written to {profiler.prefix}.prof, summary in {profiler.write()}")
+        except OSError as e:
+            print(f"Could not write the profile: {e}")
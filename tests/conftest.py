@@ -0,0 +1,29 @@
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import info  # noqa: E402
+import movie_info  # noqa: E402
+from stub_server import make_server  # noqa: E402
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    """Stub TMDB server; the tools build their client lazily against it"""
+    server = make_server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TMDB_API_KEY', 'test')
+    monkeypatch.setenv('TMDB_BASE_URL', f"http://127.0.0.1:{server.server_address[1]}/3")
+    monkeypatch.setattr(info, 'tmdb_client', None)
+    monkeypatch.setattr(movie_info, 'tmdb_client', None)
+    yield server
+    server.shutdown()
+    server.server_close()
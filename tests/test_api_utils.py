@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_utils import TMDBClient, parse_retry_after  # noqa: E402
+
+
+@pytest.fixture
+def rate_limited_server():
+    """Server answering every request with 429 and Retry-After: server.retry_after"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            server.hits += 1
+            self.send_response(429)
+            self.send_header('Retry-After', server.retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.hits = 0
+    server.retry_after = '0'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server, tmp_path, **kwargs):
+    return TMDBClient('key', cache_dir=str(tmp_path), requests_per_second=0,
+                      base_url=f"http://127.0.0.1:{server.server_address[1]}/3", **kwargs)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 50 < parse_retry_after(time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 60))) <= 60
+
+
+def test_retry_after_is_honored_beyond_backoff_max(tmp_path):
+    client = TMDBClient('key', cache_dir=str(tmp_path), backoff_max=30, backoff_base=0.5)
+    delay = client._retry_delay(SimpleNamespace(headers={'Retry-After': '120'}), 0)
+    assert 120 <= delay <= 120.5
+
+
+def test_retry_after_past_the_ceiling_gives_up(tmp_path):
+    client = TMDBClient('key', cache_dir=str(tmp_path), retry_after_max=60)
+    assert client._retry_delay(SimpleNamespace(headers={'Retry-After': '120'}), 0) is None
+
+
+def test_request_gives_up_at_once_on_a_long_retry_after(rate_limited_server, tmp_path):
+    rate_limited_server.retry_after = '600'
+    client = client_for(rate_limited_server, tmp_path)
+    start = time.monotonic()
+    assert client.request('/movie/1') is None
+    assert rate_limited_server.hits == 1
+    assert time.monotonic() - start < 5
+
+
+def test_short_retry_after_is_retried_up_to_max_retries(rate_limited_server, tmp_path):
+    client = client_for(rate_limited_server, tmp_path, max_retries=2, backoff_base=0.01)
+    assert client.request('/movie/1') is None
+    assert rate_limited_server.hits == 3
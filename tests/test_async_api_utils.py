@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('aiohttp')
+
+import info  # noqa: E402
+from async_api_utils import run_with_client  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from title_index import TitleIndex  # noqa: E402
+
+
+def outcomes(registry):
+    """{outcome: count} of the tmdb_request_seconds histograms"""
+    counts = {}
+    for histogram in registry.snapshot()['histograms'].get('tmdb_request_seconds', []):
+        outcome = histogram['labels']['outcome']
+        counts[outcome] = counts.get(outcome, 0) + histogram['count']
+    return counts
+
+
+def run(main, tmp_path, registry):
+    return run_with_client('test', main, cache_dir=str(tmp_path / '.cache'), metrics=registry)
+
+
+def test_identical_concurrent_requests_share_one_fetch(stub, tmp_path):
+    registry = Metrics()
+
+    async def main(client):
+        return await asyncio.gather(*(client.get_details('tv', 108978) for _ in range(10)))
+
+    results = run(main, tmp_path, registry)
+    assert stub.stats['requests'] == 1
+    assert all(result == results[0] for result in results)
+    assert results[0]['name'] == 'Reacher'
+    assert outcomes(registry) == {'network': 1, 'coalesced': 9}
+
+
+def test_repeat_requests_hit_memory_then_disk(stub, tmp_path):
+    registry = Metrics()
+
+    async def twice(client):
+        first = await client.get_details('movie', 1233413)
+        return first, await client.get_details('movie', 1233413)
+
+    first, second = run(twice, tmp_path, registry)
+    assert first == second
+    assert outcomes(registry) == {'network': 1, 'memory': 1}
+
+    # A new client starts with an empty memory cache but the same SQLite file
+    registry = Metrics()
+    assert run(lambda client: client.get_details('movie', 1233413), tmp_path, registry) == first
+    assert outcomes(registry) == {'disk': 1}
+    assert stub.stats['requests'] == 1
+
+
+def test_disk_cache_io_stays_off_the_event_loop(stub, tmp_path):
+    threads = set()
+
+    async def main(client):
+        loop_thread = threading.current_thread()
+        get_entry, set_entry = client.cache.get_entry, client.cache.set
+
+        def spy(method):
+            def wrapper(*args, **kwargs):
+                threads.add(threading.current_thread() is loop_thread)
+                return method(*args, **kwargs)
+            return wrapper
+
+        client.cache.get_entry, client.cache.set = spy(get_entry), spy(set_entry)
+        return await client.search_multi('Reacher')
+
+    run(main, tmp_path, Metrics())
+    assert threads == {False}
+
+
+def test_async_bulk_lookup_matches_the_threaded_one(stub, tmp_path, monkeypatch, capsys):
+    titles = ['Reacher', 'Sinners', 'Reacher']
+    monkeypatch.setattr(info, 'title_index', TitleIndex(str(tmp_path / 'threaded.json')))
+    info.show_many(titles)
+    threaded = capsys.readouterr().out
+
+    monkeypatch.setattr(info, 'title_index', TitleIndex(str(tmp_path / 'async.json')))
+    (tmp_path / 'async_run').mkdir()
+    monkeypatch.chdir(tmp_path / 'async_run')
+    requests = stub.stats['requests']
+    info.show_many(titles, use_async=True)
+    assert capsys.readouterr().out == threaded
+    # Fresh cache: one search and one details fetch per distinct title
+    assert stub.stats['requests'] - requests == 4
+    assert info.title_index.lookup('Reacher')['id'] == 108978
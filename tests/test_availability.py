@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability  # noqa: E402
+from availability import Availability, compact_offers  # noqa: E402
+from title_index import TitleIndex, tmdb_client  # noqa: E402
+
+NETFLIX = {'provider_id': 8, 'provider_name': 'Netflix'}
+NETFLIX_ADS = {'provider_id': 1796, 'provider_name': 'Netflix basic with Ads'}
+APPLE = {'provider_id': 2, 'provider_name': 'Apple TV'}
+
+
+def index_of(titles):
+    """Availability over {title: raw /watch/providers results}"""
+    names = {}
+    return Availability({
+        'providers': names,
+        'titles': {title: {'media_type': 'movie', 'id': n, 'offers': compact_offers({'results': results}, names)}
+                   for n, (title, results) in enumerate(titles.items())},
+    })
+
+
+def test_compact_offers_keeps_ids_and_names_once():
+    names = {}
+    offers = compact_offers({'results': {
+        'US': {'link': 'https://x', 'flatrate': [NETFLIX], 'buy': [APPLE]},
+        'GB': {'link': 'https://y', 'rent': [APPLE]},
+        'FR': {'link': 'https://z'},
+    }}, names)
+    assert offers == {'GB': {'rent': [2]}, 'US': {'flatrate': [8], 'buy': [2]}}
+    assert names == {'8': 'Netflix', '2': 'Apple TV'}
+    assert compact_offers(None, names) == {}
+
+
+def test_queries_by_provider_and_by_title():
+    index = index_of({
+        'Ash': {'US': {'flatrate': [NETFLIX], 'buy': [APPLE]}, 'GB': {'ads': [NETFLIX_ADS]}},
+        'Sinners': {'US': {'rent': [APPLE], 'buy': [APPLE]}},
+    })
+    # An exact name wins over names that merely contain it
+    assert index.provider_ids('netflix') == [8]
+    assert index.provider_ids('with ads') == [1796]
+    assert index.on_provider('Netflix') == {'Ash': ['flatrate']}
+    assert index.on_provider('Netflix', region='GB') == {}
+    assert index.on_provider('Apple TV', offer_types=('rent', 'buy')) == {'Ash': ['buy'], 'Sinners': ['rent', 'buy']}
+
+    assert index.where('ash') == {'US': {'flatrate': ['Netflix'], 'buy': ['Apple TV']},
+                                  'GB': {'ads': ['Netflix basic with Ads']}}
+    assert index.where('Ash', region='GB') == {'GB': {'ads': ['Netflix basic with Ads']}}
+    assert index.where('Sinners', region='GB') == {}
+    assert index.where('Reacher') is None
+
+
+def test_build_resolves_playlist_titles_through_the_index(stub, tmp_path):
+    library = tmp_path / 'm3u'
+    library.mkdir()
+    (library / 'Reacher.m3u').write_text(
+        '#EXTM3U\n#EXTINF:-1 group-title="Reacher" tvg-logo="", Reacher | S1.E1 - Welcome to Margrave\n'
+        'https://mirror.example.com/r1.mkv\n', encoding='utf-8')
+    (library / 'Movies.m3u').write_text(
+        '#EXTM3U\n#EXTINF:-1 group-title="Sinners" tvg-logo="", Sinners\nhttps://mirror.example.com/s.mkv\n'
+        '#EXTINF:-1 group-title="Nowhere" tvg-logo="", Nowhere\nhttps://mirror.example.com/n.mkv\n',
+        encoding='utf-8')
+
+    index = TitleIndex(str(tmp_path / 'title_index.json'))
+    data, skipped = availability.build(tmdb_client(), index, str(library))
+    # Sinners has two exact matches and Nowhere none
+    assert sorted(skipped) == ['Nowhere', 'Sinners']
+    assert list(data['titles']) == ['Reacher']
+    assert data['titles']['Reacher']['id'] == 108978
+    assert data['providers'] == {'2': 'Apple TV', '9': 'Amazon Prime Video'}
+    assert os.path.exists(tmp_path / 'title_index.json')
+
+    path = str(tmp_path / 'availability.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    loaded = Availability.load(path)
+    assert loaded.on_provider('Prime', region='GB') == {'Reacher': ['flatrate']}
+    assert loaded.where('Reacher', region='AU') == {'AU': {'flatrate': ['Amazon Prime Video'], 'buy': ['Apple TV']}}
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(data, version=0), f)
+    with pytest.raises(ValueError):
+        Availability.load(path)
@@ -0,0 +1,97 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_store  # noqa: E402
+from cache_store import SQLiteCache, make_cache_key  # noqa: E402
+
+
+def legacy_name(endpoint, params):
+    """File name the pre-SQLite client used for a request"""
+    key = f"{endpoint}_{json.dumps(params, sort_keys=True)}"
+    return key.replace('/', '_').replace('?', '_') + '.json'
+
+
+def write_legacy(directory, endpoint, params, data, timestamp=None):
+    path = directory / legacy_name(endpoint, params)
+    path.write_text(json.dumps({'timestamp': timestamp or time.time(), 'data': data}))
+    return path
+
+
+def test_legacy_files_are_imported_under_the_new_key(tmp_path):
+    path = write_legacy(tmp_path, '/search/multi', {'query': 'Reacher', 'api_key': 'abc123'}, {'results': [1]})
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), legacy_dir=str(tmp_path))
+    assert cache.get(make_cache_key('/search/multi', {'query': 'Reacher'})) == {'results': [1]}
+    assert not path.exists()
+
+
+def test_ambiguous_legacy_files_are_skipped(tmp_path):
+    # '/' in the query was written as '_', so the query can't be recovered
+    path = write_legacy(tmp_path, '/search/multi', {'query': 'AC/DC', 'api_key': 'abc123'}, {'results': [1]})
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), legacy_dir=str(tmp_path))
+    assert cache.stats()['entries'] == 0
+    assert path.exists()
+
+
+def test_migration_runs_once(tmp_path):
+    cache_path = str(tmp_path / 'cache.sqlite3')
+    SQLiteCache(cache_path, legacy_dir=str(tmp_path))
+    write_legacy(tmp_path, '/tv/1', {'api_key': 'abc123'}, {'id': 1})
+    assert SQLiteCache(cache_path, legacy_dir=str(tmp_path)).stats()['entries'] == 0
+
+
+def test_cache_key_ignores_api_key_and_param_order():
+    key = make_cache_key('/search/multi', {'query': 'Ash', 'page': 1})
+    assert key == make_cache_key('/search/multi', {'page': 1, 'query': 'Ash', 'api_key': 'secret'})
+    assert key != make_cache_key('/search/tv', {'query': 'Ash', 'page': 1})
+    assert key != make_cache_key('/search/multi', {'query': 'Ash', 'page': 2})
+    # Stable across processes and releases: existing cache files depend on it
+    assert make_cache_key('/tv/1') == make_cache_key('/tv/1', {})
+    assert len(key) == 64
+
+
+def test_endpoint_ttls_and_stale_window(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), default_ttl=100,
+                        endpoint_ttls={'*/watch/providers': 10}, stale_ttl=1000)
+    assert cache.ttl_for('/movie/1/watch/providers') == 10
+    assert cache.ttl_for('/movie/1') == 100
+
+    now = time.time()
+    cache.set('fresh', '/movie/1', {'id': 1})
+    cache.set('stale', '/movie/2', {'id': 2}, created=now - 500)
+    cache.set('gone', '/movie/3', {'id': 3}, created=now - 5000)
+    assert cache.get('fresh') == {'id': 1}
+    assert cache.get('stale') is None
+    assert cache.get_entry('stale', allow_stale=True).data == {'id': 2}
+    assert cache.get_entry('gone', allow_stale=True) is None
+
+
+def test_lru_eviction_keeps_recently_read_entries(tmp_path):
+    payload = {'blob': 'x' * 90}
+    size = len(json.dumps(payload, separators=(',', ':')))
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_bytes=size * 3)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, '/movie/1', payload)
+    # Make 'a' the most recently used, past the access-time resolution
+    conn = cache._connection()
+    conn.execute('UPDATE entries SET accessed = accessed - 1000')
+    cache.get('a')
+    cache.set('d', '/movie/1', payload)
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.stats()['bytes'] <= size * 3
+
+
+def test_reads_only_rewrite_access_time_once_per_resolution(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+    cache.set('a', '/movie/1', {'id': 1})
+    conn = cache._connection()
+    accessed = conn.execute("SELECT accessed FROM entries WHERE key = 'a'").fetchone()[0]
+    cache.get('a')
+    assert conn.execute("SELECT accessed FROM entries WHERE key = 'a'").fetchone()[0] == accessed
+    conn.execute('UPDATE entries SET accessed = accessed - ?', (cache_store.ACCESS_RESOLUTION + 1,))
+    cache.get('a')
+    assert conn.execute("SELECT accessed FROM entries WHERE key = 'a'").fetchone()[0] >= accessed
@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_all_m3u  # noqa: E402
+
+NO_EXPIRY = ('keep', 0, None)
+
+
+def run(tmp_path, stream=False):
+    output = str(tmp_path / 'all.m3u')
+    if stream:
+        combine_all_m3u.stream_combine(str(tmp_path / 'm3u'), output, NO_EXPIRY)
+    else:
+        combine_all_m3u.combine(str(tmp_path / 'm3u'), output, str(tmp_path / 'manifest.json'),
+                                expiry=NO_EXPIRY)
+    with open(output, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_entries_without_a_url_are_left_out(tmp_path, capsys, stream):
+    (tmp_path / 'm3u').mkdir()
+    (tmp_path / 'm3u' / 'Reacher.m3u').write_text(
+        '#EXTM3U\n'
+        '#EXTINF:-1 group-title="Reacher" tvg-logo="", Reacher | S1.E1 - Welcome to Margrave\n'
+        'https://cdn.example.com/reacher/s1e1.mkv\n'
+        '#EXTINF:-1 group-title="Reacher" tvg-logo="", Reacher | S1.E2 - First Dance\n',
+        encoding='utf-8')
+
+    assert run(tmp_path, stream) == (
+        '#EXTM3U\n'
+        '#EXTINF:-1 group-title="Reacher" tvg-logo="", Reacher | S1.E1 - Welcome to Margrave\n'
+        'https://cdn.example.com/reacher/s1e1.mkv\n'
+    )
+    assert ("Reacher.m3u: skipped 1 entry without a URL (first: Reacher | S1.E2 - First Dance)"
+            in capsys.readouterr().out)
+
+
+def entry(group, title, url):
+    return f'#EXTINF:-1 group-title="{group}" tvg-logo="", {title}\n{url}\n'
+
+
+LIBRARY = {
+    'a.m3u': (entry('Ash', 'Ash', 'https://cdn.example.com/ash.mp4?Expires=4000000000&Signature=a')
+              + entry('Reacher', 'Reacher | S1.E1 - Pilot', 'https://m1.example.com/r1?hash=a')),
+    'b.m3u': (entry('Reacher', 'Reacher | S1.E1 - Pilot', 'https://m1.example.com/r1?hash=b')
+              + entry('Reacher', 'Reacher | S1.E2 - Two', 'https://m1.example.com/r2')
+              + entry('Up', 'Up', 'https://m2.example.com/up.mp4')),
+    'c.m3u': entry('Zed', 'Zed', 'https://m3.example.com/zed.mp4?Expires=4000000001&Signature=z'),
+}
+
+
+def build(tmp_path, name, full, expiry=('keep', 0, None)):
+    output = str(tmp_path / f'{name}.m3u')
+    index = str(tmp_path / f'{name}.expiry.json')
+    combine_all_m3u.combine(str(tmp_path / 'm3u'), output, str(tmp_path / f'{name}.manifest.json'),
+                            full=full, expiry=(expiry[0], expiry[1], index))
+    with open(output, encoding='utf-8') as f, open(index, encoding='utf-8') as g:
+        return f.read(), json.load(g)['entries']
+
+
+def write(tmp_path, files):
+    (tmp_path / 'm3u').mkdir(exist_ok=True)
+    for name, text in files.items():
+        (tmp_path / 'm3u' / name).write_text(text, encoding='utf-8')
+
+
+def test_incremental_runs_match_a_full_rebuild(tmp_path, capsys):
+    write(tmp_path, {name: LIBRARY[name] for name in ('a.m3u', 'b.m3u')})
+    assert build(tmp_path, 'all', False) == build(tmp_path, 'full', True)
+
+    # Only the groups a changed file is in are rendered again, from every file they appear in
+    write(tmp_path, {'a.m3u': LIBRARY['a.m3u'].replace('r1?hash=a', 'r9')})
+    capsys.readouterr()
+    assert build(tmp_path, 'all', False) == build(tmp_path, 'full', True)
+    assert "(2 group(s) from 2 file(s) rebuilt)" in capsys.readouterr().out.split('Looking')[1]
+
+    write(tmp_path, {'c.m3u': LIBRARY['c.m3u']})
+    (tmp_path / 'm3u' / 'b.m3u').unlink()
+    assert build(tmp_path, 'all', False) == build(tmp_path, 'full', True)
+
+    manifest = json.loads((tmp_path / 'all.manifest.json').read_text(encoding='utf-8'))
+    assert manifest['files']['a.m3u']['groups'] == ['Ash', 'Reacher']
+    assert 'entries' not in manifest['files']['a.m3u']
+
+
+def test_a_hand_edited_output_is_rebuilt(tmp_path):
+    write(tmp_path, LIBRARY)
+    expected = build(tmp_path, 'all', False)
+    with open(tmp_path / 'all.m3u', 'a', encoding='utf-8') as f:
+        f.write('https://stray.example.com/\n')
+    assert build(tmp_path, 'all', False) == expected
+
+
+def test_dropping_reaches_links_that_expired_since_the_last_run(tmp_path, monkeypatch):
+    write(tmp_path, LIBRARY)
+    monkeypatch.setattr(combine_all_m3u.time, 'time', lambda: 3999999999.0)
+    text, _ = build(tmp_path, 'all', False, ('drop', 0, None))
+    assert 'ash.mp4' in text and 'zed.mp4' in text
+
+    # Nothing changed on disk, but Ash's link is dead by now
+    monkeypatch.setattr(combine_all_m3u.time, 'time', lambda: 4000000000.5)
+    text, index = build(tmp_path, 'all', False, ('drop', 0, None))
+    assert 'ash.mp4' not in text and 'zed.mp4' in text
+    assert [(record['title'], record['status']) for record in index] == [('Ash', 'expired'), ('Zed', 'valid')]
+    assert (text, index) == build(tmp_path, 'full', True, ('drop', 0, None))
+
+
+def test_stream_spills_report_records_and_matches_a_full_rebuild(tmp_path, monkeypatch, capsys):
+    write(tmp_path, LIBRARY)
+    write(tmp_path, {'d.m3u': (entry('Ash', 'Ash', 'https://cdn.example.com/ash.mp4?Expires=4000000002&Signature=b')
+                               + entry('Up', 'Up Again', 'https://m2.example.com/up.mp4'))})
+    expected = build(tmp_path, 'full', True)
+    full_report = capsys.readouterr().out.split('Duplicates removed')[1]
+
+    monkeypatch.setattr(combine_all_m3u, 'SPILL_LIMIT', 1)
+    output = str(tmp_path / 'stream.m3u')
+    index = str(tmp_path / 'stream.expiry.json')
+    combine_all_m3u.stream_combine(str(tmp_path / 'm3u'), output, ('keep', 0, index))
+    with open(output, encoding='utf-8') as f, open(index, encoding='utf-8') as g:
+        assert (f.read(), json.load(g)['entries']) == expected
+    report = capsys.readouterr().out.split('Duplicates removed')[1]
+    assert report.split('Expiry index')[0] == full_report.split('Expiry index')[0]
+    assert "Ash duplicates Ash" in report and "Up Again has the same link as Up" in report
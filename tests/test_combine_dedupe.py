@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combine_all_m3u  # noqa: E402
+
+OLD = "https://cdn.example.com/movie.mp4?Expires=1000&Signature=old"
+NEW = "https://cdn.example.com/movie.mp4?Expires=2000&Signature=new"
+
+
+def playlist(*urls):
+    lines = []
+    for url in urls:
+        lines += ['#EXTINF:-1 group-title="Movie",Movie\n', url + '\n']
+    return lines
+
+
+def dedupe(urls):
+    removed, shared = [], []
+    entries = combine_all_m3u.parse_file_entries(playlist(*urls))
+    kept = list(combine_all_m3u.dedupe_entries(entries, removed, shared))
+    return kept, removed
+
+
+def test_latest_signature_wins_when_it_comes_second():
+    kept, removed = dedupe([OLD, NEW])
+    assert [entry[1][-1].strip() for entry in kept] == [NEW]
+    assert removed[0][3] == OLD
+
+
+def test_latest_signature_wins_when_it_comes_first():
+    kept, removed = dedupe([NEW, OLD])
+    assert [entry[1][-1].strip() for entry in kept] == [NEW]
+    assert removed[0][3] == OLD
+
+
+def test_fresh_copy_survives_dropping_expired_links():
+    for urls in ([OLD, NEW], [NEW, OLD]):
+        removed, shared, index = [], [], []
+        entries = combine_all_m3u.parse_file_entries(playlist(*urls))
+        deduped = combine_all_m3u.dedupe_entries(entries, removed, shared)
+        live = list(combine_all_m3u.apply_expiry(deduped, 'drop', 1500, 0, index))
+        assert [entry[1][-1].strip() for entry in live] == [NEW]
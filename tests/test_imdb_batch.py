@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imdb  # noqa: E402
+
+BEST = 'https://imdb-video.media-imdb.com/vi3124020505/hls-1080p-preview.m3u8?Expires=1800000000&Signature=abc'
+
+
+def client_for(stub, tmp_path, workers=4):
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    return imdb.IMDbClient(base_url, str(tmp_path / 'imdb_cache.sqlite3'), workers=workers), base_url
+
+
+def test_batch_resolves_titles_and_urls_in_order(stub, tmp_path):
+    client, base_url = client_for(stub, tmp_path)
+    items = ['Sinners', f'{base_url}/video/vi3124020505/', 'Reacher', f'{base_url}/nothing/here']
+    results = client.resolve_many(items)
+
+    assert [result['input'] for result in results] == items
+    assert results[0] == {'input': 'Sinners', 'title_url': f'{base_url}/title/tt31070000/',
+                          'trailer_url': f'{base_url}/video/vi3124020505/', 'm3u8': BEST, 'error': None}
+    assert results[1]['m3u8'] == results[2]['m3u8'] == BEST
+    assert results[1]['title_url'] is None
+    assert results[3]['m3u8'] is None and results[3]['error'].startswith('HTTPError')
+
+
+def test_cached_results_skip_the_page_downloads(stub, tmp_path):
+    client, _ = client_for(stub, tmp_path, workers=1)
+    first = client.resolve_many(['Sinners', 'Reacher'])
+    # Two searches; the title and trailer pages are shared and fetched once
+    assert stub.stats['requests'] == 4
+
+    client, _ = client_for(stub, tmp_path)
+    assert client.resolve_many(['Sinners', 'Reacher']) == first
+    assert stub.stats['requests'] == 4
+
+
+def test_misses_are_reported_and_not_cached(stub, tmp_path):
+    title_page = stub.fixtures['imdb_title.html']
+    stub.fixtures['imdb_title.html'] = title_page.replace(b'/video/vi', b'/gallery/vi')
+    client, _ = client_for(stub, tmp_path)
+    result, = client.resolve_many(['Sinners'])
+    assert result['error'] == "no trailer on title page"
+
+    # The page gains its trailer: the cached search is reused, the title page fetched again
+    stub.fixtures['imdb_title.html'] = title_page
+    requests = stub.stats['requests']
+    result, = client.resolve_many(['Sinners'])
+    assert result['m3u8'] == BEST
+    assert stub.stats['requests'] - requests == 2
+
+
+def test_run_writes_json_and_fails_on_misses(stub, tmp_path, monkeypatch, capsys):
+    client, base_url = client_for(stub, tmp_path)
+    monkeypatch.setattr(imdb, '_client', client)
+    json_path = str(tmp_path / 'trailers.json')
+
+    imdb.run(['Sinners'], json_path)
+    with open(json_path, encoding='utf-8') as f:
+        assert json.load(f)[0]['m3u8'] == BEST
+    assert "1/1 trailer playlists found" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exit_info:
+        imdb.run(['Sinners', f'{base_url}/nothing/here'], json_path)
+    assert exit_info.value.code == 1
+    assert "1/2 trailer playlists found" in capsys.readouterr().out
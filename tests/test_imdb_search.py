@@ -0,0 +1,33 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import imdb  # noqa: E402
+
+with open(os.path.join(ROOT, 'benchmarks', 'fixtures', 'imdb_find.html'), encoding='utf-8') as f:
+    FIND_PAGE = f.read()
+
+ITEM_CLASS = 'class="ipc-metadata-list-summary-item ipc-metadata-list-summary-item--click find-result-item"'
+
+
+def test_fixture_results():
+    results = imdb.parse_search_results(FIND_PAGE)
+    assert len(results) == 8
+    assert results[0] == {'title': 'Sinners', 'year': '2025', 'type': 'Movie',
+                          'url': 'https://www.imdb.com/title/tt31070000/'}
+
+
+def test_class_token_anywhere_in_attribute():
+    page = FIND_PAGE.replace(ITEM_CLASS, 'data-id="x" class="find-result-item ipc-metadata-list-summary-item"')
+    page = page.replace('class="ipc-metadata-list-summary-item__t"',
+                        "class='ipc-link ipc-metadata-list-summary-item__t'")
+    page = page.replace('class="ipc-metadata-list-summary-item__li"',
+                        'class="ipc-btn ipc-metadata-list-summary-item__li"')
+    assert imdb.parse_search_results(page) == imdb.parse_search_results(FIND_PAGE)
+
+
+def test_modifier_classes_are_not_items():
+    page = FIND_PAGE.replace(ITEM_CLASS, 'class="ipc-metadata-list-summary-item--click find-result-item"')
+    assert imdb.parse_search_results(page) == []
@@ -0,0 +1,43 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import info  # noqa: E402
+import movie_info  # noqa: E402
+from title_index import TitleIndex  # noqa: E402
+
+
+def test_interactive_indexed_title_builds_the_client(stub, tmp_path, monkeypatch, capsys):
+    index = TitleIndex(str(tmp_path / 'title_index.json'))
+    index.record('Reacher', 'tv', {'id': 108978, 'name': 'Reacher', 'first_air_date': '2022-02-04'})
+    monkeypatch.setattr(info, 'title_index', index)
+    monkeypatch.setattr('builtins.input', lambda prompt: 'Reacher')
+
+    info.interactive()
+
+    out = capsys.readouterr().out
+    assert "Using indexed match: Reacher (2022) (tv)" in out
+    assert "¤ Title: Reacher" in out
+    assert "¤ Streaming On:" in out
+
+
+@pytest.mark.parametrize('tool', [info, movie_info])
+def test_threads_share_one_lazily_built_client(stub, tool):
+    clients = []
+    barrier = threading.Barrier(8)
+
+    def build():
+        barrier.wait()
+        clients.append(tool.get_tmdb_client())
+
+    threads = [threading.Thread(target=build) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(clients) == 8
+    assert len({id(client) for client in clients}) == 1
@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from linkcheck import LinkChecker  # noqa: E402
+
+
+@pytest.fixture
+def mirror():
+    """Mirror stub: /ok answers HEAD, /nohead only a ranged GET, /gone is 404.
+
+    Each request takes server.delay seconds; server.active/peak track requests
+    in flight overall and per Host header, server.log the (method, path) seen.
+    """
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def answer(self, method):
+            host = self.headers['Host']
+            with lock:
+                server.log.append((method, self.path))
+                for key in (None, host):
+                    server.active[key] = server.active.get(key, 0) + 1
+                    server.peak[key] = max(server.peak.get(key, 0), server.active[key])
+            time.sleep(server.delay)
+            with lock:
+                for key in (None, host):
+                    server.active[key] -= 1
+
+            if self.path.startswith('/gone'):
+                status = 404
+            elif self.path.startswith('/nohead') and method == 'HEAD':
+                status = 405
+            elif method == 'GET' and self.headers.get('Range') == 'bytes=0-0':
+                status = 206
+            else:
+                status = 200
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_HEAD(self):
+            self.answer('HEAD')
+
+        def do_GET(self):
+            self.answer('GET')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.delay = 0.0
+    server.log, server.active, server.peak = [], {}, {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def urls_on(host, port, names):
+    return [f"http://{host}:{port}/{name}" for name in names]
+
+
+def test_head_falls_back_to_a_ranged_get(mirror, tmp_path):
+    port = mirror.server_address[1]
+    ok, nohead, gone = urls_on('127.0.0.1', port, ['ok', 'nohead', 'gone'])
+    checker = LinkChecker(workers=4, per_host=1, cache_path=str(tmp_path / 'cache.json'))
+    results = checker.check([ok, nohead, gone, 'http://[bad'])
+
+    assert (results[ok]['ok'], results[ok]['status']) == (True, 200)
+    assert (results[nohead]['ok'], results[nohead]['status']) == (True, 206)
+    assert (results[gone]['ok'], results[gone]['status']) == (False, 404)
+    assert results['http://[bad']['ok'] is False and results['http://[bad']['error']
+    assert sorted(mirror.log) == [('GET', '/nohead'), ('HEAD', '/gone'), ('HEAD', '/nohead'), ('HEAD', '/ok')]
+
+
+def test_lanes_respect_per_host_and_global_caps(mirror, tmp_path):
+    mirror.delay = 0.05
+    port = mirror.server_address[1]
+    urls = (urls_on('127.0.0.1', port, [f'ok/{n}' for n in range(8)])
+            + urls_on('localhost', port, [f'ok/{n}' for n in range(8)]))
+
+    LinkChecker(workers=8, per_host=2, cache_path='').check(urls)
+    assert mirror.peak[f'127.0.0.1:{port}'] == 2
+    assert mirror.peak[f'localhost:{port}'] == 2
+    # Both hosts are drained side by side, not one after the other
+    assert mirror.peak[None] == 4
+
+    mirror.peak.clear()
+    LinkChecker(workers=3, per_host=2, cache_path='').check(urls)
+    assert mirror.peak[None] == 3
+    assert len(mirror.log) == 32
+
+
+def test_live_links_are_cached_and_dead_ones_rechecked(mirror, tmp_path):
+    port = mirror.server_address[1]
+    ok, gone = urls_on('127.0.0.1', port, ['ok', 'gone'])
+    cache_path = str(tmp_path / 'cache.json')
+    checker = LinkChecker(cache_path=cache_path)
+    checker.check([ok, gone, ok])
+    checker.save_cache()
+    assert len(mirror.log) == 2
+
+    results = LinkChecker(cache_path=cache_path).check([ok, gone])
+    assert results[ok]['cached'] is True and results[gone]['cached'] is False
+    assert mirror.log[2:] == [('HEAD', '/gone')]
+
+    # Past the TTL the live link is probed again
+    results = LinkChecker(cache_path=cache_path, ttl_hours=0).check([ok])
+    assert results[ok]['cached'] is False
+    assert len(mirror.log) == 4
@@ -0,0 +1,76 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import m3u  # noqa: E402
+
+
+def test_unquoted_and_single_quoted_attributes_are_kept():
+    entry = m3u.parse_extinf("#EXTINF:-1 tvg-id=foo group-title=\"Love, Death\" tvg-logo='http://x/y.jpg',Pilot, Part 1")
+    assert entry.group_title == 'Love, Death'
+    assert entry.tvg_logo == 'http://x/y.jpg'
+    assert entry.attrs == {'tvg-id': 'foo'}
+    assert entry.title == 'Pilot, Part 1'
+    assert m3u.parse_extinf(entry.extinf()) == entry
+
+
+def test_malformed_attributes_keep_the_ones_that_parse():
+    entry = m3u.parse_extinf('#EXTINF:-1 tvg-id=foo stray group-title="X",Title')
+    assert (entry.group_title, entry.attrs, entry.title) == ('X', {'tvg-id': 'foo'}, 'Title')
+
+
+PLAYLIST = """#EXTM3U
+#EXTINF:-1 group-title="Reacher" tvg-logo="https://image.tmdb.org/t/p/w500/a.jpg", Reacher | S2.E1 - ATM
+https://mirror.example.com/532164/Reacher.S02E01.mkv?hash=AgAD9h
+#EXTINF:-1 group-title="Ash" tvg-logo="https://image.tmdb.org/t/p/w500/b.jpg" tvg-id="ash", Ash
+#EXTVLCOPT:http-user-agent=Mozilla/5.0
+https://mirror.example.com/ash.mkv
+#EXTINF:-1 group-title="Pending" tvg-logo="", Pending | S1.E1 - Pilot
+https://mirror.example.com/bare.mkv
+"""
+
+
+def test_generated_lines_round_trip_byte_for_byte():
+    assert m3u.dumps(m3u.parse_string(PLAYLIST)) == PLAYLIST
+
+
+def test_directives_and_missing_urls_keep_their_pairing():
+    text = ('#EXTINF:-1 group-title="A" tvg-logo="", A\n'
+            '#EXTINF:-1 group-title="B" tvg-logo="", B\n'
+            '#EXTVLCOPT:network-caching=1000\n'
+            'https://b.example.com/b.mkv\n'
+            'https://c.example.com/c.mkv\n')
+    first, second, bare = m3u.parse_string(text)
+    assert (first.title, first.url) == ('A', None)
+    assert (second.title, second.directives, second.url) == ('B', ('#EXTVLCOPT:network-caching=1000',),
+                                                             'https://b.example.com/b.mkv')
+    assert (bare.title, bare.url) == (None, 'https://c.example.com/c.mkv')
+    assert m3u.dumps([first, second, bare], header=False) == text
+
+
+def test_write_file_round_trip(tmp_path):
+    path = tmp_path / 'Reacher.m3u'
+    entries = m3u.parse_string(PLAYLIST)
+    m3u.write_file(str(path), entries)
+    assert path.read_text(encoding='utf-8') == PLAYLIST
+    assert m3u.parse_file(str(path)) == entries
+    assert [name for name in os.listdir(tmp_path)] == ['Reacher.m3u']
+
+
+def test_url_helpers():
+    signed = "https://CDN.example.com:443/movie.mp4?b=2&Expires=1748683243&Signature=x&a=1#t"
+    assert m3u.url_expiry(signed) == 1748683243
+    assert m3u.url_expiry("https://cdn.example.com/movie.mp4") is None
+    assert m3u.normalize_url(signed) == "https://cdn.example.com/movie.mp4?a=1&b=2"
+    assert m3u.split_alt_title("Ash - ALT2") == ("Ash", 2)
+    assert m3u.split_alt_title("Ash - ALT") == ("Ash", 1)
+    assert m3u.split_alt_title("Ash") == ("Ash", 0)
+
+
+def test_library_playlists_round_trip():
+    library = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'm3u')
+    for name in sorted(os.listdir(library)):
+        with open(os.path.join(library, name), encoding='utf-8') as f:
+            lines = [line.strip() + '\n' for line in f if line.strip() and line.strip() != m3u.HEADER]
+        assert m3u.dumps(m3u.iter_entries(lines), header=False) == ''.join(lines), name
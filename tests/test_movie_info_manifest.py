@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import movie_info  # noqa: E402
+
+
+def load(tmp_path, items):
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(items), encoding='utf-8')
+    return movie_info.load_manifest(str(path))
+
+
+def test_valid_items_are_normalized(tmp_path):
+    items = load(tmp_path, ["Reacher S2E1-8", 1917, {"title": "Up", "type": " Movie ", "year": 2009, "url": "a|b"}])
+    assert [(item['title'], item['type'], item['year'], item['urls'], item['error']) for item in items] == [
+        ('Reacher S2E1-8', None, None, [], None),
+        ('1917', None, None, [], None),
+        ('Up', 'movie', '2009', ['a', 'b'], None),
+    ]
+
+
+def test_malformed_items_carry_an_error(tmp_path):
+    items = load(tmp_path, [{"title": "Dune", "type": 5}, {"title": "Heat", "type": "series"},
+                            {"title": "X", "urls": 7}, [1], {"title": ""}])
+    assert [item['title'] for item in items] == ['Dune', 'Heat', 'X', '[1]']
+    assert all(item['error'] for item in items)
+
+
+def test_top_level_object_is_rejected(tmp_path):
+    with pytest.raises(SystemExit, match="must be a list"):
+        load(tmp_path, {"Dune": {"type": "movie"}, "Heat": {}})
@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import m3u  # noqa: E402
+import movie_info  # noqa: E402
+from title_index import TitleIndex  # noqa: E402
+
+
+def serve_show(stub, episodes):
+    """Make the stub's Reacher season 1 have these (number, air_date) episodes"""
+    stub.fixtures['tmdb_tv.json'] = json.dumps({
+        'id': 108978, 'name': 'Reacher',
+        'seasons': [{'season_number': 1, 'episode_count': len(episodes)}],
+    }).encode()
+    stub.fixtures['tmdb_season.json'] = json.dumps({'season_number': 1, 'episodes': [
+        {'episode_number': number, 'name': f"Episode {number}", 'air_date': air_date}
+        for number, air_date in episodes
+    ]}).encode()
+
+
+def refresh(tmp_path, monkeypatch):
+    index = TitleIndex(str(tmp_path / 'title_index.json'))
+    index.record('Reacher', 'tv', {'id': 108978, 'name': 'Reacher', 'first_air_date': '2022-02-04'})
+    monkeypatch.setattr(movie_info, 'title_index', index)
+    return movie_info.refresh_series('Reacher', str(tmp_path / 'm3u'))
+
+
+def test_refresh_sees_an_episode_that_aired_within_the_cache_ttl(stub, tmp_path, monkeypatch):
+    (tmp_path / 'm3u').mkdir()
+    serve_show(stub, [(1, '2022-02-04'), (2, '2999-01-01')])
+    _, _, entries = refresh(tmp_path, monkeypatch)
+    assert [entry.title for entry in entries] == ['Reacher | S1.E1 - Episode 1']
+
+    # Nothing changed: the cached copies are confirmed with 304s
+    _, _, entries = refresh(tmp_path, monkeypatch)
+    assert entries == []
+    assert stub.stats['not_modified'] == 2
+
+    serve_show(stub, [(1, '2022-02-04'), (2, '2022-02-11'), (3, '2999-01-01')])
+    _, _, entries = refresh(tmp_path, monkeypatch)
+    assert [entry.title for entry in entries] == ['Reacher | S1.E2 - Episode 2']
+
+
+def test_new_episodes_wait_in_pending_until_they_have_a_url(stub, tmp_path, monkeypatch):
+    playlist = tmp_path / 'm3u' / 'Reacher.m3u'
+    pending = tmp_path / 'm3u' / 'pending' / 'Reacher.m3u'
+    playlist.parent.mkdir()
+    original = ('#EXTM3U\n'
+                '#EXTINF:-1 group-title="Reacher" tvg-logo="", Reacher | S1.E1 - Episode 1\n'
+                'https://cdn.example.com/reacher/s1e1.mkv\n')
+    playlist.write_text(original, encoding='utf-8')
+    serve_show(stub, [(1, '2022-02-04'), (2, '2022-02-11'), (3, '2022-02-18')])
+
+    path, ready, entries = refresh(tmp_path, monkeypatch)
+    assert path == str(playlist) and ready == []
+    assert [entry.title for entry in entries] == ['Reacher | S1.E2 - Episode 2', 'Reacher | S1.E3 - Episode 3']
+    assert playlist.read_text(encoding='utf-8') == original
+    assert [entry.url for entry in m3u.parse_file(str(pending))] == [None, None]
+
+    # Pending episodes aren't added twice; one given a URL moves to the playlist
+    lines = pending.read_text(encoding='utf-8').splitlines(keepends=True)
+    lines.insert(2, 'https://cdn.example.com/reacher/s1e2.mkv\n')
+    pending.write_text(''.join(lines), encoding='utf-8')
+    _, ready, entries = refresh(tmp_path, monkeypatch)
+    assert [entry.title for entry in ready] == ['Reacher | S1.E2 - Episode 2'] and entries == []
+    assert playlist.read_text(encoding='utf-8') == original + ''.join(lines[1:3])
+    assert [entry.title for entry in m3u.parse_file(str(pending))] == ['Reacher | S1.E3 - Episode 3']
+
+    # Once nothing is pending the file goes away
+    lines = pending.read_text(encoding='utf-8').splitlines(keepends=True)
+    pending.write_text(''.join(lines) + 'https://cdn.example.com/reacher/s1e3.mkv\n', encoding='utf-8')
+    refresh(tmp_path, monkeypatch)
+    assert not pending.exists()
+    assert [entry.url for entry in m3u.parse_file(str(playlist))] == [
+        'https://cdn.example.com/reacher/s1e1.mkv',
+        'https://cdn.example.com/reacher/s1e2.mkv',
+        'https://cdn.example.com/reacher/s1e3.mkv',
+    ]
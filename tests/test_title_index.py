@@ -0,0 +1,88 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import info  # noqa: E402
+import title_index  # noqa: E402
+from title_index import TitleIndex, normalize_title, record_match  # noqa: E402
+
+SINNERS = {'id': 1233413, 'title': 'Sinners', 'release_date': '2025-04-16'}
+SINNERS_1990 = {'id': 99001, 'title': 'Sinners', 'release_date': '1990-05-01'}
+REACHER = {'id': 108978, 'name': 'Reacher', 'first_air_date': '2022-02-03'}
+
+
+def test_records_survive_a_reload_under_both_titles(tmp_path):
+    path = str(tmp_path / 'title_index.json')
+    index = TitleIndex(path)
+    index.record("reacher (tv)", 'tv', REACHER)
+    index.save()
+
+    index = TitleIndex(path)
+    assert normalize_title("Reacher: (TV)") == "reacher tv"
+    assert index.lookup("Reacher (TV)")['id'] == 108978
+    assert index.lookup("REACHER", year=2022, media_type='tv')['title'] == 'Reacher'
+    assert index.lookup("Reacher", year=2019) is None
+    assert index.lookup("Reacher", media_type='movie') is None
+
+
+def test_ambiguous_and_loose_records_need_a_pin(tmp_path):
+    index = TitleIndex(str(tmp_path / 'title_index.json'))
+    record_match(index, 'Sinners', 'movie', SINNERS, [SINNERS, SINNERS_1990])
+    assert index.lookup('Sinners') is None
+    assert index.lookup('Sinners', year=2025) is None
+
+    # A pick that isn't an exact title match is only filed under what was typed
+    record_match(index, 'Sinnerz', 'movie', SINNERS, [SINNERS])
+    assert index.lookup('Sinnerz') is None
+    assert [key for key, _ in index.ambiguous()] == ['sinners', 'sinnerz']
+
+    index.record('Sinners', 'movie', SINNERS_1990, pinned=True)
+    assert index.lookup('Sinners')['id'] == 99001
+    # Searches don't override a pin
+    index.record('Sinners', 'movie', SINNERS)
+    assert index.lookup('Sinners')['id'] == 99001
+    assert [key for key, _ in index.ambiguous()] == ['sinnerz']
+
+    # Without the pin the title is ambiguous again
+    assert index.unpin('Sinners') == 1
+    assert index.lookup('Sinners') is None
+    assert [key for key, _ in index.ambiguous()] == ['sinners', 'sinnerz']
+
+
+def test_seed_records_the_playlist_titles(stub, tmp_path, monkeypatch):
+    library = tmp_path / 'm3u'
+    library.mkdir()
+    (library / 'Reacher.m3u').write_text(
+        '#EXTM3U\n#EXTINF:-1 group-title="Reacher" tvg-logo="", Reacher | S1.E1 - Welcome to Margrave\n'
+        'https://mirror.example.com/r1.mkv\n', encoding='utf-8')
+    (library / 'Movies.m3u').write_text(
+        '#EXTM3U\n#EXTINF:-1 group-title="Sinners" tvg-logo="", Sinners\nhttps://mirror.example.com/s.mkv\n'
+        '#EXTINF:-1 group-title="Nowhere" tvg-logo="", Nowhere\nhttps://mirror.example.com/n.mkv\n',
+        encoding='utf-8')
+    assert title_index.playlist_groups(str(library)) == {'Sinners': 'movie', 'Nowhere': 'movie', 'Reacher': 'tv'}
+
+    index = TitleIndex(str(tmp_path / 'title_index.json'))
+    client = title_index.tmdb_client()
+    assert title_index.seed(index, client, str(library)) == (['Reacher'], ['Sinners'], ['Nowhere'])
+    assert index.lookup('Reacher', media_type='tv')['id'] == 108978
+
+    # Known titles, ambiguous ones included, are not searched again
+    searched = []
+    request = client.request
+    monkeypatch.setattr(client, 'request', lambda endpoint, params: searched.append(params['query'])
+                        or request(endpoint, params))
+    assert title_index.seed(index, client, str(library)) == ([], [], ['Nowhere'])
+    assert searched == ['Nowhere']
+
+
+def test_indexed_titles_skip_the_search(stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(info, 'title_index', TitleIndex(str(tmp_path / 'title_index.json')))
+    searched = []
+    search = info.search_movie_or_series
+    monkeypatch.setattr(info, 'search_movie_or_series', lambda query: searched.append(query) or search(query))
+
+    assert info.resolve_title('Reacher') == ('tv', 108978)
+    assert info.resolve_title('Reacher') == ('tv', 108978)
+    assert info.resolve_title('reacher!') == ('tv', 108978)
+    assert searched == ['Reacher']
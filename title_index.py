@@ -0,0 +1,300 @@
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+
+import m3u
+
+DEFAULT_INDEX = "title_index.json"  # normalized title -> resolved TMDB records
+INDEX_VERSION = 1
+
+# Episode lines we generate: "Series | S1.E2 - Title"
+EPISODE_TITLE_RE = re.compile(r'\|\s*S\d+\.E\d+\b')
+
+
+def normalize_title(title):
+    """Normalizes a title for matching: lower-case, punctuation and spacing collapsed."""
+    return re.sub(r'[\W_]+', ' ', title).strip().lower()
+
+
+def result_year(result):
+    """Returns the release/first-air year of a TMDB result, or "" if unknown."""
+    return (result.get('release_date') or result.get('first_air_date') or '')[:4]
+
+
+class TitleIndex:
+    """Local map from titles we've already resolved to their TMDB id and media type.
+
+    Records live under the normalized title (and year, when known) so later
+    lookups skip the search round trip. Pinned records win over anything a
+    search or seed run records, which is how ambiguous titles get settled.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        self.entries = self._load()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _load(self):
+        """Load the index, ignoring a missing, corrupt or outdated file"""
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != INDEX_VERSION:
+            return {}
+        return data.get('titles', {})
+
+    def save(self):
+        """Atomically persist the index if anything changed"""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = {'version': INDEX_VERSION, 'titles': dict(sorted(self.entries.items()))}
+            m3u.atomic_write(self.path, [json.dumps(data, indent=1, ensure_ascii=False), '\n'])
+            self._dirty = False
+
+    def lookup(self, title, year=None, media_type=None):
+        """Return the indexed record for title, or None if unknown or ambiguous.
+
+        A pinned record always wins; otherwise exactly one record may match
+        the media type and year (records without a year match any year), and
+        it must not be ambiguous or a loose match.
+        """
+        year = str(year) if year else None
+        with self._lock:
+            records = self.entries.get(normalize_title(title), [])
+            matches = [
+                record for record in records
+                if (media_type is None or record['media_type'] == media_type)
+                and (year is None or not record['year'] or record['year'] == year)
+            ]
+        pinned = [record for record in matches if record.get('pinned')]
+        if pinned:
+            return dict(pinned[0])
+        if len(matches) == 1 and not matches[0].get('candidates') and not matches[0].get('loose'):
+            return dict(matches[0])
+        return None
+
+    def has(self, title, media_type=None):
+        """Whether title has any record, including ambiguous ones"""
+        with self._lock:
+            return any(media_type is None or record['media_type'] == media_type
+                       for record in self.entries.get(normalize_title(title), []))
+
+    def record(self, title, media_type, result, pinned=False, candidates=None, loose=False):
+        """Remember that title resolved to a TMDB search/details result.
+
+        The record is stored under both the title as typed and TMDB's own
+        title. It replaces older records of the same media type and year,
+        except pinned ones, which only another pin replaces. loose marks a
+        best guess whose title didn't match exactly; like an ambiguous
+        record, lookup() won't return it until it is pinned.
+        """
+        record = {
+            'id': result['id'],
+            'media_type': media_type,
+            'title': result.get('title') or result.get('name') or title,
+            'year': result_year(result),
+            'poster_path': result.get('poster_path') or '',
+        }
+        if pinned:
+            record['pinned'] = True
+        if candidates:
+            record['candidates'] = candidates
+        if loose:
+            record['loose'] = True
+
+        # A guess is only filed under the title as typed, not under TMDB's title
+        keys = dict.fromkeys([normalize_title(title)] + ([] if loose else [normalize_title(record['title'])]))
+        with self._lock:
+            for key in keys:
+                records = self.entries.setdefault(key, [])
+                if any(r.get('pinned') and not pinned and r['media_type'] == media_type
+                       for r in records):
+                    continue
+                records[:] = [
+                    r for r in records
+                    if r['media_type'] != media_type
+                    or (r['id'] != record['id'] and r['year'] and record['year'] and r['year'] != record['year'])
+                ]
+                records.append(record)
+            self._dirty = True
+        return dict(record)
+
+    def unpin(self, title, media_type=None):
+        """Drop the pinned records for title; returns how many were removed"""
+        key = normalize_title(title)
+        with self._lock:
+            records = self.entries.get(key, [])
+            kept = [r for r in records
+                    if not (r.get('pinned') and (media_type is None or r['media_type'] == media_type))]
+            removed = len(records) - len(kept)
+            if kept:
+                self.entries[key] = kept
+            else:
+                self.entries.pop(key, None)
+            if removed:
+                self._dirty = True
+        return removed
+
+    def ambiguous(self):
+        """Return (key, record) pairs with several equally good matches, or only a loose one"""
+        with self._lock:
+            return [(key, dict(record)) for key, records in sorted(self.entries.items())
+                    for record in records if (record.get('candidates') or record.get('loose'))
+                    and not any(r.get('pinned') for r in records)]
+
+
+def playlist_groups(directory="m3u"):
+    """Map every group-title in the playlists to 'tv' or 'movie'.
+
+    A group with episode-shaped entry titles ("| S1.E2") is a series.
+    """
+    groups = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.m3u'):
+            continue
+        for entry in m3u.parse_file(os.path.join(directory, name)):
+            if not entry.group_title:
+                continue
+            is_episode = bool(entry.title and EPISODE_TITLE_RE.search(entry.title))
+            if is_episode or entry.group_title not in groups:
+                groups[entry.group_title] = 'tv' if is_episode else 'movie'
+    return groups
+
+
+def pick_exact(results, title):
+    """Return (best result, other exact matches) for title among search results.
+
+    Only results whose title normalizes to the same string count; TMDB's
+    ordering decides between several of them.
+    """
+    wanted = normalize_title(title)
+    exact = [r for r in results or []
+             if normalize_title(r.get('title') or r.get('name') or '') == wanted]
+    if not exact:
+        return None, []
+    return exact[0], exact[1:]
+
+
+def record_match(index, title, media_type, chosen, results):
+    """Record a result picked from search results, trusting only exact title matches.
+
+    Same rule as seed: an exact match is recorded, with the other exact
+    matches as candidates (ambiguous) if there are any. A chosen result
+    that isn't an exact match is a guess and is only recorded as loose.
+    """
+    best, others = pick_exact(results, title)
+    exact = [best] + others if best is not None else []
+    if not any(result['id'] == chosen['id'] for result in exact):
+        candidates = [{'id': r['id'], 'year': result_year(r)} for r in results or [] if r['id'] != chosen['id']]
+        return index.record(title, media_type, chosen, candidates=candidates[:5], loose=True)
+    candidates = [{'id': r['id'], 'year': result_year(r)} for r in exact if r['id'] != chosen['id']]
+    return index.record(title, media_type, chosen, candidates=candidates)
+
+
+def seed(index, client, directory="m3u", workers=8):
+    """Resolve every group-title in the playlists that the index doesn't know yet.
+
+    Returns (recorded, ambiguous, unresolved) title lists.
+    """
+    todo = [(title, media_type) for title, media_type in playlist_groups(directory).items()
+            if not index.has(title, media_type)]
+
+    def resolve(item):
+        title, media_type = item
+        results = client.request(f'/search/{media_type}', {'query': title})
+        return item, pick_exact((results or {}).get('results'), title)
+
+    recorded, ambiguous, unresolved = [], [], []
+    for (title, media_type), (best, others) in client.map(resolve, todo, workers):
+        if best is None:
+            unresolved.append(title)
+            continue
+        candidates = [{'id': r['id'], 'year': result_year(r)} for r in others]
+        index.record(title, media_type, best, candidates=candidates)
+        (ambiguous if candidates else recorded).append(title)
+    return recorded, ambiguous, unresolved
+
+
+def tmdb_client():
+    """Build a TMDB client from the environment (only needed for seed/pin)"""
+    from api_utils import TMDBClient
+    from config import APIConfig
+    return TMDBClient(APIConfig().tmdb_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local title -> TMDB id index.")
+    parser.add_argument('--index', default=DEFAULT_INDEX, help="index file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help="resolve the group-titles found in the playlists")
+    seed_parser.add_argument('--dir', default="m3u", help="playlist directory")
+    seed_parser.add_argument('--workers', type=int, default=8, help="concurrent searches")
+
+    pin_parser = commands.add_parser('pin', help="pin a title to a TMDB id")
+    pin_parser.add_argument('title')
+    pin_parser.add_argument('id', type=int)
+    pin_parser.add_argument('--type', choices=['movie', 'tv'], default='movie', dest='media_type')
+
+    unpin_parser = commands.add_parser('unpin', help="remove a title's pin")
+    unpin_parser.add_argument('title')
+
+    lookup_parser = commands.add_parser('lookup', help="show what a title resolves to")
+    lookup_parser.add_argument('title')
+    lookup_parser.add_argument('--year')
+    lookup_parser.add_argument('--type', choices=['movie', 'tv'], dest='media_type')
+
+    commands.add_parser('ambiguous', help="list seeded titles with several exact matches")
+    args = parser.parse_args()
+
+    index = TitleIndex(args.index)
+
+    if args.command == 'seed':
+        recorded, ambiguous, unresolved = seed(index, tmdb_client(), args.dir, args.workers)
+        index.save()
+        print(f"{len(recorded)} recorded, {len(ambiguous)} ambiguous, {len(unresolved)} unresolved")
+        for title in ambiguous:
+            print(f"  ambiguous: {title} (settle with: python title_index.py pin \"{title}\" <id>)")
+        for title in unresolved:
+            print(f"  unresolved: {title}")
+
+    elif args.command == 'pin':
+        details = tmdb_client().get_details(args.media_type, args.id)
+        if not details:
+            print(f"No {args.media_type} found with id {args.id}")
+            sys.exit(1)
+        record = index.record(args.title, args.media_type, details, pinned=True)
+        index.save()
+        print(f"Pinned '{args.title}' to {record['title']} ({record['year']}) - {record['id']} ({args.media_type})")
+
+    elif args.command == 'unpin':
+        removed = index.unpin(args.title)
+        index.save()
+        print(f"Removed {removed} pin(s) for '{args.title}'")
+
+    elif args.command == 'lookup':
+        record = index.lookup(args.title, args.year, args.media_type)
+        if not record:
+            print(f"'{args.title}' is not indexed (or is ambiguous)")
+            sys.exit(1)
+        print(f"{record['title']} ({record['year']}) - {record['id']} ({record['media_type']})")
+
+    elif args.command == 'ambiguous':
+        for key, record in index.ambiguous():
+            others = ', '.join(f"{c['id']} ({c['year']})" for c in record.get('candidates', []))
+            label = "loose match" if record.get('loose') else "exact"
+            print(f"{key}: {record['id']} ({record['year']}) [{record['media_type']}, {label}]"
+                  + (f", also {others}" if others else ""))
+
+
+if __name__ == "__main__":
+    main()
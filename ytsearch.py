@@ -1,4 +1,11 @@
-from googleapiclient.discovery import build
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+import m3u
+from cache_store import SQLiteCache, make_cache_key
 from config import APIConfig
 
 # Initialize config
@@ -6,20 +13,67 @@ config = APIConfig()
 YOUTUBE_API_SERVICE_NAME = 'youtube'
 YOUTUBE_API_VERSION = 'v3'
 
-def search_youtube_trailers(query):
-    youtube = build(
-        YOUTUBE_API_SERVICE_NAME, 
-        YOUTUBE_API_VERSION, 
-        developerKey=config.youtube_key
-    )
+YOUTUBE_CACHE = os.path.join(".cache", "youtube_cache.sqlite3")
+YOUTUBE_CACHE_TTL = 30 * 24 * 60 * 60  # official trailers don't move
+QUOTA_FILE = os.path.join(".cache", "youtube_quota.json")
+DAILY_QUOTA = 10000  # default YouTube Data API allowance
+SEARCH_COST = 100  # units per search.list call
+BATCH_SIZE = 50  # requests per batched HTTP call
 
-    search_response = youtube.search().list(
-        q=query + ' official trailer',
-        part='id,snippet',
-        maxResults=3,
-        type='video'
-    ).execute()
+_youtube = None
+_cache = None
+
+def get_youtube():
+    """Return the YouTube client, building it once per process.
+
+    The discovery document comes from the copy bundled with
+    google-api-python-client, so building needs no network round trip.
+    """
+    global _youtube
+    if _youtube is None:
+        from googleapiclient.discovery import build
+        _youtube = build(
+            YOUTUBE_API_SERVICE_NAME,
+            YOUTUBE_API_VERSION,
+            developerKey=config.youtube_key,
+            static_discovery=True,
+            cache_discovery=False
+        )
+    return _youtube
+
+def get_cache():
+    """Return the on-disk search result cache."""
+    global _cache
+    if _cache is None:
+        _cache = SQLiteCache(YOUTUBE_CACHE, default_ttl=YOUTUBE_CACHE_TTL, endpoint_ttls={})
+    return _cache
 
+def quota_day():
+    """The current quota day; YouTube resets quotas at midnight Pacific time."""
+    try:
+        from zoneinfo import ZoneInfo
+        now = datetime.now(ZoneInfo('America/Los_Angeles'))
+    except Exception:  # no tz database available
+        now = datetime.now(timezone(timedelta(hours=-8)))
+    return now.strftime('%Y-%m-%d')
+
+def quota_used():
+    """Units spent today according to the local counter."""
+    try:
+        with open(QUOTA_FILE, "r", encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    return data.get('units', 0) if data.get('day') == quota_day() else 0
+
+def record_quota(units):
+    """Add units to today's counter."""
+    os.makedirs(os.path.dirname(QUOTA_FILE), exist_ok=True)
+    data = {'day': quota_day(), 'units': quota_used() + units, 'updated': time.time()}
+    m3u.atomic_write(QUOTA_FILE, [json.dumps(data)])
+
+def parse_search_response(search_response):
+    """Extract (title, link, thumbnail) tuples from a search.list response."""
     videos = []
 
     for search_result in search_response.get('items', []):
@@ -32,18 +86,124 @@ def search_youtube_trailers(query):
 
     return videos
 
-def main():
+def search_request(query):
+    """Build (but don't send) the search.list request for a title's trailers."""
+    return get_youtube().search().list(
+        q=query + ' official trailer',
+        part='id,snippet',
+        maxResults=3,
+        type='video'
+    )
+
+def search_many(queries, daily_quota=DAILY_QUOTA):
+    """Search trailers for many titles, returning {query: [(title, link, thumbnail)]}.
+
+    Cached results are reused; the rest go out in batched HTTP requests of
+    up to BATCH_SIZE searches, as long as today's quota allows. Titles that
+    fail or don't fit the remaining quota are missing from the result.
+    """
+    cache = get_cache()
+    results = {}
+    pending = []
+    for query in dict.fromkeys(queries):
+        cached = cache.get(make_cache_key('youtube:search', {'q': query}))
+        if cached is not None:
+            results[query] = [tuple(video) for video in cached]
+        else:
+            pending.append(query)
+
+    affordable = max(0, (daily_quota - quota_used()) // SEARCH_COST)
+    if len(pending) > affordable:
+        print(f"Quota left for {affordable} of {len(pending)} searches today; skipping the rest.")
+        pending = pending[:affordable]
+
+    def on_response(request_id, response, exception):
+        query = pending[int(request_id)]
+        if exception is not None:
+            print(f"Error searching '{query}': {exception}")
+            return
+        videos = parse_search_response(response)
+        cache.set(make_cache_key('youtube:search', {'q': query}), 'youtube:search', videos)
+        results[query] = videos
+
+    if not pending:
+        return results
+    from googleapiclient.errors import HttpError
+    youtube = get_youtube()
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = youtube.new_batch_http_request(callback=on_response)
+        chunk = range(start, min(start + BATCH_SIZE, len(pending)))
+        for index in chunk:
+            batch.add(search_request(pending[index]), request_id=str(index))
+        try:
+            batch.execute()
+        except HttpError as e:
+            print(f"Batch request failed: {e}")
+        finally:
+            # Every search sent costs quota, whatever its outcome
+            record_quota(len(chunk) * SEARCH_COST)
+
+    return results
+
+def search_youtube_trailers(query):
+    return search_many([query]).get(query, [])
+
+def playlist_titles(path):
+    """Unique group-titles of a playlist, in order."""
+    return list(dict.fromkeys(entry.group_title for entry in m3u.parse_file(path) if entry.group_title))
+
+def print_results(results):
+    for idx, (title, link, thumbnail) in enumerate(results, start=1):
+        print(f"{idx}. {title}")
+        print(f"   Link: {link}")
+        print(f"   Thumbnail: {thumbnail}\n")
+
+def interactive():
     query = input("Enter the name of the movie to search for official trailers: ").strip()
     results = search_youtube_trailers(query)
 
     if results:
         print("Top 3 official trailer results:")
-        for idx, (title, link, thumbnail) in enumerate(results, start=1):
-            print(f"{idx}. {title}")
-            print(f"   Link: {link}")
-            print(f"   Thumbnail: {thumbnail}\n")
+        print_results(results)
     else:
         print("No official trailers found.")
 
+def main():
+    parser = argparse.ArgumentParser(description="Search YouTube for official trailers.")
+    parser.add_argument('titles', nargs='*', help="titles to search (interactive prompt if none)")
+    parser.add_argument('--file', help="read titles from this file, one per line")
+    parser.add_argument('--playlist', help="search every group-title in this playlist")
+    parser.add_argument('--daily-quota', type=int, default=DAILY_QUOTA, help="units available per day")
+    parser.add_argument('--json', dest='json_path', help="also write the results as JSON")
+    parser.add_argument('--quota', action='store_true', help="show today's quota usage and exit")
+    args = parser.parse_args()
+
+    if args.quota:
+        print(f"{quota_used()} of {args.daily_quota} units used on {quota_day()} (Pacific)")
+        return
+
+    titles = list(args.titles)
+    if args.file:
+        with open(args.file, "r", encoding='utf-8') as f:
+            titles.extend(line.strip() for line in f if line.strip())
+    if args.playlist:
+        titles.extend(playlist_titles(args.playlist))
+    if not titles:
+        interactive()
+        return
+
+    results = search_many(titles, args.daily_quota)
+    for title in dict.fromkeys(titles):
+        print(f"=== {title} ===")
+        if results.get(title):
+            print_results(results[title])
+        else:
+            print("No official trailers found.\n")
+    print(f"{quota_used()} of {args.daily_quota} units used today")
+    if args.json_path:
+        m3u.atomic_write(args.json_path, [json.dumps(results, indent=2, ensure_ascii=False)])
+    if len(results) < len(set(titles)):
+        sys.exit(1)
+
 if __name__ == '__main__':
     main()